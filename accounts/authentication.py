@@ -1,6 +1,10 @@
+from rest_framework import exceptions
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken
 
+from core.db_routers import SAFE_METHODS, set_current_shard
+from core.sharding import shard_for_company
+
 class CookieJWTAuthentication(JWTAuthentication):
     """
     Classe de autenticação personalizada que extrai o JWT do cookie 'access_token'.
@@ -14,9 +18,17 @@ class CookieJWTAuthentication(JWTAuthentication):
         try:
             # Valida o token
             validated_token = self.get_validated_token(raw_token)
-            # Retorna o usuário e o token validado, conforme esperado pelo DRF
-            return self.get_user(validated_token), validated_token
+            user = self.get_user(validated_token)
         except InvalidToken:
             # Se o token for inválido, tenta usar o refresh token para obter um novo
             # (Lógica de refresh pode ser adicionada aqui no futuro)
-            return None
\ No newline at end of file
+            return None
+
+        # Ativa o shard da empresa para o restante da requisição (ver core.sharding)
+        shard, is_moving = shard_for_company(user.company_id)
+        if is_moving and request.method not in SAFE_METHODS:
+            raise exceptions.PermissionDenied('Os dados da empresa estão sendo migrados. Tente novamente em instantes.')
+        set_current_shard(shard)
+
+        # Retorna o usuário e o token validado, conforme esperado pelo DRF
+        return user, validated_token
\ No newline at end of file
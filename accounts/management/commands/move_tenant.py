@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company
+from core.sharding import MOVE_CHUNK_SIZE, move_company, shard_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Move os dados de uma empresa (finance, cadastros) para outro shard e troca o mapeamento. '
+        'Escritas da empresa ficam bloqueadas durante a cópia.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('company_id', type=int)
+        parser.add_argument('target', help='Alias do banco de destino (DATABASE_SHARDING["SHARDS"]).')
+        parser.add_argument('--chunk-size', type=int, default=MOVE_CHUNK_SIZE)
+        parser.add_argument('--keep-source', action='store_true', help='Não remove as linhas do shard de origem.')
+
+    def handle(self, *args, **options):
+        if options['target'] not in shard_aliases():
+            raise CommandError(f"Shard desconhecido: {options['target']}. Disponíveis: {', '.join(shard_aliases())}.")
+        try:
+            company = Company.objects.get(pk=options['company_id'])
+        except Company.DoesNotExist:
+            raise CommandError('Empresa não encontrada.')
+
+        try:
+            copied = move_company(
+                company,
+                options['target'],
+                chunk_size=options['chunk_size'],
+                keep_source=options['keep_source'],
+                log=lambda message: self.stdout.write(message),
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Empresa '{company.name}' movida para {options['target']} ({sum(copied.values())} linhas)."
+        ))
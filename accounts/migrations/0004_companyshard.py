@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_currency_user_language_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyShard',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='accounts.company')),
+                ('database', models.CharField(default='default', max_length=64, verbose_name='Banco de Dados')),
+                ('is_moving', models.BooleanField(default=False, verbose_name='Em Migração')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -34,6 +34,17 @@ class User(AbstractUser):
     notify_weekly_goals = models.BooleanField(default=True, verbose_name="Notificar metas semanais")
     notify_large_transactions = models.BooleanField(default=True, verbose_name="Notificar grandes transações")
     notify_bills_reminder = models.BooleanField(default=True, verbose_name="Lembrete de contas a pagar")
-   
 
 
+class CompanyShard(models.Model):
+    """
+    Banco de dados (alias em DATABASE_SHARDING['SHARDS']) onde ficam os dados da
+    empresa. Empresas sem registro ficam no 'default'. Mantido sempre no 'default'.
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='shard')
+    database = models.CharField(max_length=64, default='default', verbose_name="Banco de Dados")
+    is_moving = models.BooleanField(default=False, verbose_name="Em Migração")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.company} -> {self.database}"
@@ -1,13 +1,19 @@
 from django.urls import reverse
 from django_rest_passwordreset.signals import reset_password_token_created
-from django.core.mail import send_mail
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from core.sharding import replicate_instance, shard_for_company, sharding_enabled
+from notifications.outbox import queue_email
+from .models import Company, User
+
 @receiver(reset_password_token_created)
 def password_reset_token_created(sender, instance, reset_password_token, *args, **kwargs):
     """
     Manipulador para o sinal reset_password_token_created.
-    Envia um e-mail para o usuário quando um token de reset de senha é criado.
+    Coloca na caixa de saída o e-mail para o usuário quando um token de reset
+    de senha é criado (o envio é feito pelo worker, fora da requisição).
     """
     # Monta a URL para o frontend.
     # O link que o usuário receberá no e-mail.
@@ -24,14 +30,29 @@ def password_reset_token_created(sender, instance, reset_password_token, *args,
         "Obrigado,\nEquipe FinançaPlus"
     )
 
-    # Envia o e-mail (que será impresso no console)
-    send_mail(
+    # Enfileira o e-mail (com o backend de console, é impresso pelo worker)
+    queue_email(
+        # E-mail de destino
+        reset_password_token.user.email,
         # Título do e-mail
         "Redefinição de Senha para FinançaPlus",
         # Mensagem
         email_plaintext_message,
         # E-mail de origem
-        "noreply@financaplus.com",
-        # E-mail de destino
-        [reset_password_token.user.email]
-    )
\ No newline at end of file
+        from_email="noreply@financaplus.com",
+    )
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=User)
+def replicate_to_company_shard(sender, instance, using, raw=False, **kwargs):
+    """
+    Empresa e usuários são gravados no 'default'; quando a empresa está em outro
+    shard, a cópia de lá é atualizada para manter as FKs dos dados financeiros.
+    """
+    if raw or using != DEFAULT_DB_ALIAS or not sharding_enabled():
+        return
+    company_id = instance.pk if sender is Company else instance.company_id
+    shard, _ = shard_for_company(company_id)
+    if shard != DEFAULT_DB_ALIAS:
+        replicate_instance(instance, shard)
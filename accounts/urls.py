@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserCreateView, CompanyUserViewSet, CurrentUserView, MyTokenObtainPairView, LogoutView, ChangePasswordView, DeleteAccountView 
+from .views import UserCreateView, CompanyUserViewSet, CurrentUserView, MyTokenObtainPairView, LogoutView, ChangePasswordView, DeleteAccountView, TenantOverviewView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 
@@ -18,5 +18,7 @@ urlpatterns = [
 
     path('change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('delete-account/', DeleteAccountView.as_view(), name='delete-account'),
+
+    path('admin/tenants/', TenantOverviewView.as_view(), name='tenant-overview'),
    
 ]
\ No newline at end of file
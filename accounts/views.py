@@ -1,11 +1,15 @@
 from django.contrib.auth.models import Group, User
 from rest_framework import generics, viewsets, permissions, status
 from rest_framework.response import Response
-from .models import User
+from .models import User, Company, CompanyShard
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser
 from .serializers import UserSerializer, CompanyUserSerializer, CurrentUserSerializer, GroupSerializer, ChangePasswordSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework.views import APIView
+from django.db import DEFAULT_DB_ALIAS
+from core.sharding import fan_out, shard_aliases
+from finance.analytics import tenant_activity
 
 
 # --------------------------------------------------------------------------
@@ -171,4 +175,46 @@ class DeleteAccountView(generics.DestroyAPIView):
         response = Response({"detail": "Conta excluída com sucesso."}, status=status.HTTP_204_NO_CONTENT)
         response.delete_cookie('access_token')
         response.delete_cookie('refresh_token')
-        return response
\ No newline at end of file
+        return response
+
+
+class TenantOverviewView(APIView):
+    """
+    Visão administrativa de todas as empresas: consulta cada shard em paralelo
+    e junta o resultado com o cadastro das empresas (no 'default').
+    Ex: /api/accounts/admin/tenants/?limit=50
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 100)), 1000))
+        except ValueError:
+            return Response({'error': 'limit deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = fan_out(tenant_activity)
+        mapping = dict(CompanyShard.objects.using(DEFAULT_DB_ALIAS).values_list('company_id', 'database'))
+
+        shards = []
+        tenants = []
+        for alias, activity in results.items():
+            if 'error' in activity:
+                shards.append({'database': alias, 'error': activity['error']})
+                continue
+            # Só conta as empresas que o mapeamento aponta para este shard (ignora sobras de migrações)
+            activity = {
+                company_id: item for company_id, item in activity.items()
+                if mapping.get(company_id, DEFAULT_DB_ALIAS) == alias
+            }
+            shards.append({'database': alias, 'companies': len(activity)})
+            tenants.extend({'company_id': company_id, 'database': alias, **item} for company_id, item in activity.items())
+
+        tenants.sort(key=lambda item: item['transactions'], reverse=True)
+        tenants = tenants[:limit]
+        names = dict(Company.objects.using(DEFAULT_DB_ALIAS).filter(
+            id__in=[item['company_id'] for item in tenants]
+        ).values_list('id', 'name'))
+        for item in tenants:
+            item['company_name'] = names.get(item['company_id'])
+
+        return Response({'shards': shards, 'tenants': tenants}, status=status.HTTP_200_OK)
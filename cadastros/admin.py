@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Address, Customer, Supplier
+from .models import Address, Customer, ImportBatch, Supplier
 
 admin.site.register(Address)
 admin.site.register(Customer)
 admin.site.register(Supplier)
+admin.site.register(ImportBatch)
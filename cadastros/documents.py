@@ -0,0 +1,176 @@
+"""
+CPF/CNPJ normalizado: validação, busca exata e fusão de cadastros duplicados.
+
+Customer.document e Supplier.document guardam o documento como foi digitado
+('123.456.789-09', '12345678909'...). A chave document_key tem só os dígitos
+e só é preenchida quando os dígitos verificadores conferem (CPF com 11
+dígitos, CNPJ com 14). Ela é recalculada a cada save (cadastros/signals.py)
+e o par (empresa, document_key) tem índice único, usado na busca por
+documento e na conferência de duplicados.
+
+merge_duplicates() acha os duplicados de uma empresa em uma única consulta
+agrupada nesse índice e funde cada grupo no cadastro mais antigo: as contas a
+receber passam para ele (com o saldo em aberto), o endereço e os dados
+bancários que ele não tiver são aproveitados de um duplicado, e os demais
+cadastros são excluídos. A fusão só é feita pelo comando dedup_documents
+(revise antes com --dry-run): se houver duplicados, a migração 0008, que cria
+o índice único, para e pede para rodar o comando.
+"""
+import re
+from collections import defaultdict
+
+from django.db.models import Case, Count, Min, Value, When
+
+from core.sharding import tenant_atomic
+from finance.changelog import record_changes
+from finance.ledger import apply_open_balance_deltas
+from finance.models import Receivable
+from .models import Address, Customer, Supplier, SupplierAddress, SupplierBankAccount
+
+CPF_LENGTH = 11
+CNPJ_LENGTH = 14
+
+CPF_WEIGHTS = (range(10, 1, -1), range(11, 1, -1))
+CNPJ_WEIGHTS = ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def only_digits(value):
+    return _NON_DIGITS.sub('', str(value or ''))
+
+
+def _check_digit(digits, weights):
+    remainder = sum(digit * weight for digit, weight in zip(digits, weights)) % 11
+    return 0 if remainder < 2 else 11 - remainder
+
+
+def _has_valid_check_digits(digits, weights):
+    numbers = [int(char) for char in digits]
+    # 000.000.000-00, 111.111.111-11... passam na conta mas não são documentos
+    if len(set(numbers)) == 1:
+        return False
+    body = len(digits) - 2
+    for position, weight in enumerate(weights):
+        if _check_digit(numbers[:body + position], weight) != numbers[body + position]:
+            return False
+    return True
+
+
+def is_valid_cpf(value):
+    digits = only_digits(value)
+    return len(digits) == CPF_LENGTH and _has_valid_check_digits(digits, CPF_WEIGHTS)
+
+
+def is_valid_cnpj(value):
+    digits = only_digits(value)
+    return len(digits) == CNPJ_LENGTH and _has_valid_check_digits(digits, CNPJ_WEIGHTS)
+
+
+def document_key(value):
+    """Dígitos do CPF/CNPJ se os verificadores conferirem; None se o documento for inválido."""
+    digits = only_digits(value)
+    if is_valid_cpf(digits) or is_valid_cnpj(digits):
+        return digits
+    return None
+
+
+def format_document(key):
+    """'12345678909' -> '123.456.789-09'; '12345678000195' -> '12.345.678/0001-95'."""
+    if len(key) == CPF_LENGTH:
+        return f'{key[:3]}.{key[3:6]}.{key[6:9]}-{key[9:]}'
+    return f'{key[:2]}.{key[2:5]}.{key[5:8]}/{key[8:12]}-{key[12:]}'
+
+
+# --- Fusão de duplicados ---
+
+# modelo -> (entidade do log de alterações, [(modelo OneToOne, campo)])
+MERGE_SPECS = {
+    Customer: ('customer', [(Address, 'customer')]),
+    Supplier: ('supplier', [(SupplierAddress, 'supplier'), (SupplierBankAccount, 'supplier')]),
+}
+
+
+def duplicate_groups(model, company_id):
+    """
+    {cadastro mantido: [duplicados]} da empresa. Uma consulta agrupada no
+    índice (empresa, document_key) acha as chaves repetidas; outra traz os ids
+    só dessas chaves. O cadastro mantido é o mais antigo (menor id).
+    """
+    keys = list(
+        model.objects.filter(company_id=company_id, document_key__isnull=False)
+        .order_by()
+        .values('document_key')
+        .annotate(total=Count('id'), keep=Min('id'))
+        .filter(total__gt=1)
+        .values_list('document_key', 'keep')
+    )
+    if not keys:
+        return {}
+    keep_by_key = dict(keys)
+    groups = defaultdict(list)
+    rows = model.objects.filter(company_id=company_id, document_key__in=list(keep_by_key)).values_list(
+        'id', 'document_key',
+    )
+    for pk, key in rows.order_by('id'):
+        if pk != keep_by_key[key]:
+            groups[keep_by_key[key]].append(pk)
+    return dict(groups)
+
+
+def _survivor_case(field_name, groups):
+    """CASE que troca o id de cada duplicado pelo do cadastro mantido."""
+    return Case(
+        *[When(**{field_name: duplicate}, then=Value(keep)) for keep, duplicates in groups.items() for duplicate in duplicates],
+    )
+
+
+def _move_nested(nested_model, field_name, groups):
+    """Passa ao cadastro mantido o registro OneToOne que ele não tem, vindo do primeiro duplicado que tiver."""
+    owner_field = f'{field_name}_id'
+    members = [pk for keep, duplicates in groups.items() for pk in (keep, *duplicates)]
+    owners = dict(nested_model.objects.filter(**{f'{owner_field}__in': members}).values_list(owner_field, 'id'))
+    moves = {}
+    for keep, duplicates in groups.items():
+        if keep in owners:
+            continue
+        donor = next((duplicate for duplicate in duplicates if duplicate in owners), None)
+        if donor is not None:
+            moves[donor] = keep
+    if moves:
+        nested_model.objects.filter(**{f'{owner_field}__in': list(moves)}).update(
+            **{owner_field: _survivor_case(owner_field, {keep: [donor] for donor, keep in moves.items()})},
+        )
+    return len(moves)
+
+
+def merge_duplicates(model, company_id, dry_run=False):
+    """
+    Funde os cadastros da empresa com o mesmo document_key. Retorna
+    {cadastro mantido: [duplicados]}; com dry_run=True só os encontra.
+    """
+    groups = duplicate_groups(model, company_id)
+    if dry_run or not groups:
+        return groups
+
+    entity, nested = MERGE_SPECS[model]
+    duplicates = [pk for members in groups.values() for pk in members]
+    with tenant_atomic():
+        if model is Customer:
+            receivables = list(Receivable.objects.filter(customer_id__in=duplicates).values_list('id', flat=True))
+            if receivables:
+                Receivable.objects.filter(pk__in=receivables).update(
+                    customer_id=_survivor_case('customer_id', groups),
+                )
+                record_changes(company_id, 'receivable', receivables)
+            # O saldo em aberto dos duplicados vai junto com as contas
+            balances = dict(Customer.objects.filter(pk__in=duplicates).values_list('id', 'open_balance'))
+            apply_open_balance_deltas(company_id, {
+                keep: sum(balances[pk] for pk in members) for keep, members in groups.items()
+            })
+        for nested_model, field_name in nested:
+            _move_nested(nested_model, field_name, groups)
+        # A exclusão dispara os signals do log de alterações (e remove os endereços que sobraram)
+        model.objects.filter(pk__in=duplicates).delete()
+        record_changes(company_id, entity, list(groups))
+    return groups
@@ -0,0 +1,524 @@
+"""
+Importação em massa de clientes e fornecedores por planilha (CSV ou XLSX).
+
+O arquivo é lido em streaming, linha a linha. O CSV usa o módulo csv. O
+XLSX é lido direto do zip com iterparse, sem carregar a planilha inteira.
+As linhas são processadas em blocos de CHUNK_SIZE. Em cada bloco:
+
+- cada linha é validada pelo serializer do cadastro, com endereço e dados
+  bancários aninhados e sem a consulta de unicidade por linha;
+- os documentos do bloco são conferidos com uma única consulta IN no
+  índice único (empresa, document_key), e os repetidos dentro da planilha
+  também são rejeitados, em qualquer formato ('123.456.789-09' ou
+  '12345678909');
+- os cadastros válidos são gravados com bulk_create, e depois os endereços
+  e contas bancárias, também com bulk_create, já com as FKs preenchidas.
+
+Cada bloco é gravado em uma transação própria, então uma planilha grande
+não segura um lock do começo ao fim. As linhas rejeitadas ficam em
+ImportBatch.errors, com o número da linha e os erros de cada campo. O
+progresso é atualizado a cada bloco e publicado em tempo real
+('import_progress', core.events). A importação roda no worker (tarefa
+'cadastros.import_batch'); o comando import_cadastros executa direto.
+"""
+import codecs
+import csv
+import itertools
+import posixpath
+import re
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from xml.etree.ElementTree import ParseError, iterparse
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from core.events import publish
+from core.search import normalize_text
+from core.sharding import tenant_atomic
+from finance.changelog import record_changes
+from jobs.queue import enqueue
+from .documents import document_key
+from .models import Address, Customer, ImportBatch, Supplier, SupplierAddress, SupplierBankAccount
+from .serializers import CustomerSerializer, SupplierSerializer
+
+IMPORT_TASK = 'cadastros.import_batch'
+
+DEFAULTS = {
+    # Linhas validadas e gravadas por vez (uma consulta IN e um bulk_create por bloco)
+    'CHUNK_SIZE': 1000,
+    # Linhas rejeitadas guardadas com os erros (as demais só entram na contagem)
+    'MAX_ERRORS': 1000,
+    'MAX_FILE_MB': 100,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'CADASTROS_IMPORT', {}).get(name, DEFAULTS[name])
+
+
+class ImportFileError(Exception):
+    """Arquivo ilegível ou sem as colunas obrigatórias: a importação inteira é interrompida."""
+
+
+# --- Validação sem a consulta de unicidade por linha (feita em lote, por bloco) ---
+
+class CustomerImportSerializer(CustomerSerializer):
+    check_document_unique = False
+
+
+class SupplierImportSerializer(SupplierSerializer):
+    check_document_unique = False
+
+
+# --- Colunas aceitas (cabeçalhos sem acento, minúsculos, com '_' no lugar de espaços) ---
+
+ADDRESS_ALIASES = {
+    'cep': ('cep', 'zip_code'),
+    'street': ('logradouro', 'endereco', 'rua', 'street'),
+    'number': ('numero', 'number'),
+    'complement': ('complemento', 'complement'),
+    'neighborhood': ('bairro', 'neighborhood'),
+    'city': ('cidade', 'municipio', 'city'),
+    'state': ('uf', 'estado', 'state'),
+    'country': ('pais', 'country'),
+}
+
+
+def _columns(*sections):
+    columns = {}
+    for section, aliases in sections:
+        for field_name, names in aliases.items():
+            for name in names:
+                columns[name] = (section, field_name)
+    return columns
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    model: type
+    serializer_class: type
+    entity: str
+    type_field: str
+    columns: dict
+    # seção aninhada -> modelo (OneToOne com o cadastro pelo campo parent_field)
+    nested: dict = field(default_factory=dict)
+    parent_field: str = ''
+
+
+SPECS = {
+    ImportBatch.KindChoices.CUSTOMERS: ImportSpec(
+        model=Customer,
+        serializer_class=CustomerImportSerializer,
+        entity='customer',
+        type_field='customer_type',
+        columns=_columns(
+            (None, {
+                'name': ('nome', 'razao_social', 'name'),
+                'customer_type': ('tipo', 'tipo_pessoa', 'customer_type'),
+                'document': ('documento', 'cpf_cnpj', 'cpf', 'cnpj', 'document'),
+                'email': ('email', 'e_mail'),
+                'phone': ('telefone', 'celular', 'phone'),
+                'birth_date': ('data_nascimento', 'nascimento', 'birth_date'),
+                'status': ('status', 'situacao'),
+                'notes': ('observacoes', 'obs', 'notes'),
+            }),
+            ('address', ADDRESS_ALIASES),
+        ),
+        nested={'address': Address},
+        parent_field='customer',
+    ),
+    ImportBatch.KindChoices.SUPPLIERS: ImportSpec(
+        model=Supplier,
+        serializer_class=SupplierImportSerializer,
+        entity='supplier',
+        type_field='supplier_type',
+        columns=_columns(
+            (None, {
+                'name': ('nome', 'razao_social', 'name'),
+                'trade_name': ('nome_fantasia', 'fantasia', 'trade_name'),
+                'supplier_type': ('tipo', 'tipo_pessoa', 'supplier_type'),
+                'document': ('documento', 'cpf_cnpj', 'cpf', 'cnpj', 'document'),
+                'state_registration': ('inscricao_estadual', 'ie', 'state_registration'),
+                'municipal_registration': ('inscricao_municipal', 'im', 'municipal_registration'),
+                'contact_name': ('contato', 'contact_name'),
+                'phone': ('telefone', 'phone'),
+                'cellphone': ('celular', 'cellphone'),
+                'email': ('email', 'e_mail'),
+                'category': ('categoria', 'category'),
+                'status': ('status', 'situacao'),
+                'notes': ('observacoes', 'obs', 'notes'),
+            }),
+            ('address', ADDRESS_ALIASES),
+            ('bank_account', {
+                'bank': ('banco', 'bank'),
+                'agency': ('agencia', 'agency'),
+                'account': ('conta', 'account'),
+                'account_type': ('tipo_conta', 'account_type'),
+                'pix_key': ('pix', 'chave_pix', 'pix_key'),
+            }),
+        ),
+        nested={'address': SupplierAddress, 'bank_account': SupplierBankAccount},
+        parent_field='supplier',
+    ),
+}
+
+REQUIRED_COLUMNS = ('name', 'document')
+
+
+def normalize_header(value):
+    return re.sub(r'[^a-z0-9]+', '_', normalize_text(str(value or '')).strip()).strip('_')
+
+
+def map_columns(header, spec):
+    """{índice da coluna: (seção, campo)}. Colunas desconhecidas são ignoradas."""
+    mapping = {}
+    for index, name in enumerate(header):
+        target = spec.columns.get(normalize_header(name))
+        if target is not None and target not in mapping.values():
+            mapping[index] = target
+    found = {field_name for section, field_name in mapping.values() if section is None}
+    missing = [name for name in REQUIRED_COLUMNS if name not in found]
+    if missing:
+        raise ImportFileError(f"Colunas obrigatórias ausentes: {', '.join(missing)}.")
+    return mapping
+
+
+# --- Leitura em streaming ---
+
+def iter_csv_rows(stream):
+    """Linhas do CSV (',' ou ';'). UTF-8, com ou sem BOM; se não for, Windows-1252 (Excel)."""
+    sample = stream.read(65536)
+    stream.seek(0)
+    try:
+        sample.decode('utf-8')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError as exc:
+        # O bloco pode ter cortado um caractere de vários bytes no final
+        encoding = 'utf-8-sig' if exc.start >= len(sample) - 3 else 'cp1252'
+    text = codecs.getreader(encoding)(stream)
+    first = text.readline()
+    delimiter = ';' if first.count(';') > first.count(',') else ','
+    yield from csv.reader(itertools.chain([first], text), delimiter=delimiter)
+
+
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+_CELL_REF = re.compile(r'([A-Z]+)')
+
+
+def _first_sheet_path(archive):
+    """Caminho da primeira planilha do workbook (normalmente xl/worksheets/sheet1.xml)."""
+    try:
+        with archive.open('xl/workbook.xml') as workbook:
+            sheet = next(elem for _, elem in iterparse(workbook) if elem.tag == f'{_XLSX_NS}sheet')
+        relation_id = sheet.get(f'{_REL_NS}id')
+        with archive.open('xl/_rels/workbook.xml.rels') as rels:
+            target = next(
+                elem.get('Target') for _, elem in iterparse(rels)
+                if elem.tag == f'{_PKG_REL_NS}Relationship' and elem.get('Id') == relation_id
+            )
+    except (KeyError, StopIteration):
+        return 'xl/worksheets/sheet1.xml'
+    return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    strings = []
+    with archive.open('xl/sharedStrings.xml') as source:
+        for _, elem in iterparse(source):
+            if elem.tag == f'{_XLSX_NS}si':
+                strings.append(''.join(text.text or '' for text in elem.iter(f'{_XLSX_NS}t')))
+                elem.clear()
+    return strings
+
+
+def _column_index(reference):
+    letters = _CELL_REF.match(reference).group(1)
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _cell_value(cell, strings):
+    cell_type = cell.get('t')
+    if cell_type == 'inlineStr':
+        return ''.join(text.text or '' for text in cell.iter(f'{_XLSX_NS}t'))
+    value = cell.find(f'{_XLSX_NS}v')
+    text = value.text if value is not None and value.text is not None else ''
+    if cell_type == 's':
+        return strings[int(text)] if text else ''
+    if cell_type in (None, 'n') and text:
+        # Documentos e telefones digitados como número: 1.2345678000190E13 -> '12345678000190'
+        try:
+            number = Decimal(text)
+        except InvalidOperation:
+            return text
+        if number == number.to_integral_value():
+            return str(int(number))
+    return text
+
+
+def iter_xlsx_rows(stream):
+    """Linhas da primeira planilha, lidas do zip com iterparse (as strings compartilhadas ficam em memória)."""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        raise ImportFileError('Arquivo XLSX inválido.')
+    with archive:
+        strings = _shared_strings(archive)
+        with archive.open(_first_sheet_path(archive)) as sheet:
+            for _, elem in iterparse(sheet):
+                if elem.tag != f'{_XLSX_NS}row':
+                    continue
+                values = []
+                for cell in elem.iter(f'{_XLSX_NS}c'):
+                    reference = cell.get('r')
+                    if reference:
+                        values.extend([''] * (_column_index(reference) - len(values)))
+                    values.append(_cell_value(cell, strings))
+                yield values
+                elem.clear()
+
+
+READERS = {
+    ImportBatch.FormatChoices.CSV: iter_csv_rows,
+    ImportBatch.FormatChoices.XLSX: iter_xlsx_rows,
+}
+
+
+# --- Normalização dos valores antes do serializer ---
+
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y')
+EXCEL_EPOCH = date(1899, 12, 30)
+
+TYPE_VALUES = {'pf': 'PF', 'fisica': 'PF', 'pessoa_fisica': 'PF', 'pj': 'PJ', 'juridica': 'PJ', 'pessoa_juridica': 'PJ'}
+STATUS_VALUES = {'ativo': 'active', 'active': 'active', 'inativo': 'inactive', 'inactive': 'inactive'}
+ACCOUNT_TYPE_VALUES = {'corrente': 'corrente', 'conta_corrente': 'corrente', 'poupanca': 'poupanca', 'pj': 'pj'}
+
+
+def _parse_date(value):
+    if value.isdigit() and len(value) <= 5:
+        # Data gravada como número de série do Excel
+        return (EXCEL_EPOCH + timedelta(days=int(value))).isoformat()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return value  # o serializer reporta o formato inválido
+
+
+def _clean(field_name, value):
+    if field_name in ('customer_type', 'supplier_type'):
+        return TYPE_VALUES.get(normalize_header(value), value)
+    if field_name == 'status':
+        return STATUS_VALUES.get(normalize_header(value), value)
+    if field_name == 'account_type':
+        return ACCOUNT_TYPE_VALUES.get(normalize_header(value), value)
+    if field_name == 'birth_date':
+        return _parse_date(value)
+    if field_name == 'state':
+        return value.upper()
+    return value
+
+
+def row_data(values, mapping, spec):
+    """Dados da linha no formato do serializer, com as seções aninhadas só se preenchidas."""
+    data = {}
+    for index, (section, field_name) in mapping.items():
+        value = str(values[index]).strip() if index < len(values) and values[index] is not None else ''
+        if not value:
+            continue
+        target = data if section is None else data.setdefault(section, {})
+        target[field_name] = _clean(field_name, value)
+    # Sem o tipo, deduz pelo tamanho do documento (11 dígitos: CPF, 14: CNPJ)
+    if spec.type_field not in data and 'document' in data:
+        digits = re.sub(r'\D', '', data['document'])
+        if len(digits) in (11, 14):
+            data[spec.type_field] = 'PF' if len(digits) == 11 else 'PJ'
+    return data
+
+
+# --- Gravação ---
+
+@dataclass
+class ImportProgress:
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def reject(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < get_setting('MAX_ERRORS'):
+            self.errors.append({'line': line, 'errors': errors})
+
+
+def _existing_documents(spec, company_id, keys):
+    """Chaves de documento do bloco que a empresa já tem: uma consulta IN no índice único."""
+    if not keys:
+        return set()
+    return set(
+        spec.model.objects.filter(company_id=company_id, document_key__in=keys).values_list('document_key', flat=True)
+    )
+
+
+def _save_chunk(batch, spec, rows, progress, seen_documents):
+    """Valida e grava um bloco de (linha, valores)."""
+    valid = []
+    for line, data in rows:
+        serializer = spec.serializer_class(data=data)
+        if serializer.is_valid():
+            valid.append((line, serializer.validated_data))
+        else:
+            progress.reject(line, serializer.errors)
+
+    # Duas tentativas: se outro processo gravar um dos documentos entre a
+    # consulta e o INSERT, o bloco é conferido de novo e só os novos entram
+    for attempt in range(2):
+        existing = _existing_documents(spec, batch.company_id, [document_key(data['document']) for _, data in valid])
+        accepted, rejected = [], []
+        in_chunk = {}
+        for line, data in valid:
+            document = document_key(data['document'])
+            if document in existing:
+                rejected.append((line, {'document': ['Já existe um cadastro com este documento.']}))
+            elif document in in_chunk or document in seen_documents:
+                first_line = in_chunk.get(document) or seen_documents[document]
+                rejected.append((line, {'document': [f'Documento repetido na planilha (linha {first_line}).']}))
+            else:
+                in_chunk[document] = line
+                accepted.append(data)
+        try:
+            with tenant_atomic():
+                _insert(batch, spec, accepted)
+        except IntegrityError:
+            if attempt:
+                raise
+            continue
+        break
+
+    for line, errors in sorted(rejected):
+        progress.reject(line, errors)
+    seen_documents.update(in_chunk)
+    progress.imported += len(accepted)
+    progress.processed += len(rows)
+
+
+def _insert(batch, spec, accepted):
+    parents, nested = [], {section: [] for section in spec.nested}
+    for data in accepted:
+        values = dict(data)
+        sections = {section: values.pop(section, None) for section in spec.nested}
+        # bulk_create não dispara o pre_save que preenche a chave do documento
+        parent = spec.model(
+            company_id=batch.company_id, user_id=batch.user_id, document_key=document_key(values['document']), **values,
+        )
+        parents.append(parent)
+        for section, section_data in sections.items():
+            if section_data:
+                nested[section].append((parent, section_data))
+
+    created = spec.model.objects.bulk_create(parents)
+    for section, items in nested.items():
+        if items:
+            spec.nested[section].objects.bulk_create([
+                spec.nested[section](**{spec.parent_field: parent}, **section_data) for parent, section_data in items
+            ])
+    # bulk_create não dispara os signals do log de alterações
+    record_changes(batch.company_id, spec.entity, [parent.pk for parent in created])
+
+
+def _report(batch, progress, **changes):
+    changes.update(
+        processed_rows=progress.processed, imported_rows=progress.imported, failed_rows=progress.failed,
+        errors=progress.errors,
+    )
+    ImportBatch.objects.filter(pk=batch.pk).update(**changes)
+    for name, value in changes.items():
+        setattr(batch, name, value)
+    publish(batch.company_id, 'import_progress', {
+        'id': batch.pk, 'status': batch.status, 'processed': progress.processed,
+        'imported': progress.imported, 'failed': progress.failed,
+    })
+
+
+def run_import(batch, on_progress=None):
+    """
+    Processa o arquivo do lote do começo ao fim, gravando bloco a bloco.
+    on_progress(batch) é chamado depois de cada bloco (usado pelo comando).
+    """
+    spec = SPECS[batch.kind]
+    chunk_size = get_setting('CHUNK_SIZE')
+    progress = ImportProgress()
+    seen_documents = {}
+    _report(batch, progress, status=ImportBatch.StatusChoices.RUNNING, started_at=timezone.now(), error='')
+
+    try:
+        with batch.file.open('rb') as stream:
+            rows = READERS[batch.file_format](stream)
+            header = next(rows, None)
+            if header is None:
+                raise ImportFileError('O arquivo está vazio.')
+            mapping = map_columns(header, spec)
+
+            chunk = []
+            for line, values in enumerate(rows, start=2):
+                if not any(str(value).strip() for value in values if value is not None):
+                    continue
+                chunk.append((line, row_data(values, mapping, spec)))
+                if len(chunk) >= chunk_size:
+                    _save_chunk(batch, spec, chunk, progress, seen_documents)
+                    chunk = []
+                    _report(batch, progress)
+                    if on_progress:
+                        on_progress(batch)
+            if chunk:
+                _save_chunk(batch, spec, chunk, progress, seen_documents)
+    except (ImportFileError, UnicodeDecodeError, csv.Error, ParseError) as exc:
+        message = str(exc) if isinstance(exc, ImportFileError) else f'Arquivo ilegível: {exc}'
+        _report(batch, progress, status=ImportBatch.StatusChoices.FAILED, error=message, finished_at=timezone.now())
+    except Exception as exc:
+        _report(
+            batch, progress, status=ImportBatch.StatusChoices.FAILED, finished_at=timezone.now(),
+            error=f'Erro inesperado: {type(exc).__name__}.',
+        )
+        raise
+    else:
+        _report(batch, progress, status=ImportBatch.StatusChoices.DONE, finished_at=timezone.now())
+    finally:
+        # As linhas já estão no banco: o arquivo enviado não é mais necessário
+        batch.file.delete(save=False)
+    if on_progress:
+        on_progress(batch)
+    return batch
+
+
+def file_format_for(name):
+    extension = posixpath.splitext(name or '')[1].lower().lstrip('.')
+    if extension not in ImportBatch.FormatChoices.values:
+        raise ImportFileError('Envie um arquivo .csv ou .xlsx.')
+    return extension
+
+
+def start_import(company, user, kind, upload):
+    """Grava o arquivo e o lote e enfileira o processamento no worker. Retorna o ImportBatch."""
+    if upload.size > get_setting('MAX_FILE_MB') * 1024 * 1024:
+        raise ImportFileError(f"O arquivo passa do limite de {get_setting('MAX_FILE_MB')} MB.")
+    batch = ImportBatch(
+        company=company, user=user, kind=kind,
+        file_name=upload.name[:255], file_format=file_format_for(upload.name),
+    )
+    with tenant_atomic():
+        batch.file.save(posixpath.basename(upload.name), upload, save=False)
+        batch.save()
+        enqueue(IMPORT_TASK, {'batch_id': batch.pk}, company=company)
+    return batch
@@ -0,0 +1,10 @@
+"""Tarefas em segundo plano do app cadastros (ver jobs/registry.py)."""
+from jobs.registry import task
+from .importers import run_import
+from .models import ImportBatch
+
+
+# Sem novas tentativas: os blocos já gravados não devem ser importados de novo
+@task('cadastros.import_batch', max_attempts=1)
+def import_batch(batch_id):
+    run_import(ImportBatch.objects.get(pk=batch_id))
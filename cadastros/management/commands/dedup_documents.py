@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Company
+from core.sharding import for_company
+from cadastros.documents import merge_duplicates
+from cadastros.models import Customer, Supplier
+
+MODELS = {'customers': Customer, 'suppliers': Supplier}
+
+
+class Command(BaseCommand):
+    help = (
+        'Funde os clientes e fornecedores com o mesmo CPF/CNPJ na mesma empresa (em qualquer formato) no '
+        'cadastro mais antigo, passando para ele as contas a receber. Necessário antes da migração cadastros '
+        '0008 (índice único) quando houver duplicados; revise antes com --dry-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: todas).')
+        parser.add_argument('--kind', choices=sorted(MODELS), help='Só clientes ou só fornecedores (padrão: os dois).')
+        parser.add_argument('--dry-run', action='store_true', help='Só lista os duplicados, sem fundir.')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id').values_list('id', flat=True)
+        if options['company']:
+            companies = [options['company']]
+        models = [MODELS[options['kind']]] if options['kind'] else list(MODELS.values())
+
+        total = 0
+        for company_id in companies:
+            with for_company(company_id):
+                for model in models:
+                    groups = merge_duplicates(model, company_id, dry_run=options['dry_run'])
+                    for keep, duplicates in groups.items():
+                        self.stdout.write(
+                            f"Empresa {company_id}: {model._meta.model_name} {keep} <- {', '.join(map(str, duplicates))}"
+                        )
+                        total += len(duplicates)
+
+        verb = 'encontrado(s)' if options['dry_run'] else 'fundido(s)'
+        self.stdout.write(self.style.SUCCESS(f'{total} cadastro(s) duplicado(s) {verb}.'))
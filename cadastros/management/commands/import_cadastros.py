@@ -0,0 +1,55 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company, User
+from cadastros.importers import ImportFileError, file_format_for, run_import
+from cadastros.models import ImportBatch
+from core.sharding import for_company
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa clientes ou fornecedores de uma planilha CSV/XLSX (com endereço e dados bancários), '
+        'em blocos, sem passar pelo worker. Mostra o progresso e as linhas rejeitadas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .xlsx.')
+        parser.add_argument('--company', type=int, required=True, help='Id da empresa.')
+        parser.add_argument('--kind', choices=ImportBatch.KindChoices.values, default=ImportBatch.KindChoices.CUSTOMERS)
+        parser.add_argument('--user', type=int, help='Id do usuário responsável (padrão: o primeiro da empresa).')
+        parser.add_argument('--show-errors', type=int, default=20, help='Linhas rejeitadas listadas ao final.')
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+            file_format = file_format_for(options['path'])
+        except Company.DoesNotExist:
+            raise CommandError('Empresa não encontrada.')
+        except ImportFileError as exc:
+            raise CommandError(str(exc))
+        users = User.objects.filter(company=company).order_by('id')
+        user = users.filter(pk=options['user']).first() if options['user'] else users.first()
+
+        def report(batch):
+            self.stdout.write(
+                f'{batch.processed_rows} linha(s) lida(s): {batch.imported_rows} importada(s), '
+                f'{batch.failed_rows} rejeitada(s)'
+            )
+
+        with for_company(company), open(options['path'], 'rb') as source:
+            batch = ImportBatch(
+                company=company, user=user, kind=options['kind'],
+                file_name=os.path.basename(options['path']), file_format=file_format,
+            )
+            batch.file.save(batch.file_name, File(source), save=False)
+            batch.save()
+            run_import(batch, on_progress=report)
+
+        for item in batch.errors[:options['show_errors']]:
+            self.stdout.write(f"  linha {item['line']}: {item['errors']}")
+        if batch.status == ImportBatch.StatusChoices.FAILED:
+            raise CommandError(batch.error)
+        self.stdout.write(self.style.SUCCESS(f'Importação #{batch.pk} concluída.'))
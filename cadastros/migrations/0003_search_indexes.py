@@ -0,0 +1,49 @@
+from django.db import migrations
+
+# Índices trigram só existem no PostgreSQL; nos demais bancos a migração não faz nada.
+# Requer permissão para CREATE EXTENSION (pg_trgm e unaccent).
+FORWARD_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE EXTENSION IF NOT EXISTS unaccent',
+    """
+    CREATE OR REPLACE FUNCTION finaplus_normalize(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, $1)) $$
+    """,
+    'CREATE INDEX IF NOT EXISTS cadastros_customer_name_trgm ON cadastros_customer USING gin (finaplus_normalize(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS cadastros_customer_email_trgm ON cadastros_customer USING gin (finaplus_normalize(email) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS cadastros_customer_document_trgm ON cadastros_customer USING gin (finaplus_normalize(document) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS cadastros_supplier_name_trgm ON cadastros_supplier USING gin (finaplus_normalize(name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS cadastros_supplier_trade_name_trgm ON cadastros_supplier USING gin (finaplus_normalize(trade_name) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS cadastros_supplier_document_trgm ON cadastros_supplier USING gin (finaplus_normalize(document) gin_trgm_ops)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS cadastros_customer_name_trgm',
+    'DROP INDEX IF EXISTS cadastros_customer_email_trgm',
+    'DROP INDEX IF EXISTS cadastros_customer_document_trgm',
+    'DROP INDEX IF EXISTS cadastros_supplier_name_trgm',
+    'DROP INDEX IF EXISTS cadastros_supplier_trade_name_trgm',
+    'DROP INDEX IF EXISTS cadastros_supplier_document_trgm',
+    'DROP FUNCTION IF EXISTS finaplus_normalize(text)',
+]
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0002_supplier_supplieraddress_supplierbankaccount'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('cadastros', '0005_import_batch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='document_key',
+            field=models.CharField(blank=True, editable=False, max_length=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='document_key',
+            field=models.CharField(blank=True, editable=False, max_length=14, null=True),
+        ),
+        migrations.AlterField(
+            model_name='customer',
+            name='document',
+            field=models.CharField(help_text='CPF ou CNPJ', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='supplier',
+            name='document',
+            field=models.CharField(help_text='CPF ou CNPJ', max_length=20),
+        ),
+    ]
@@ -0,0 +1,47 @@
+import re
+
+from django.db import migrations
+
+MODELS = ('Customer', 'Supplier')
+
+CPF_WEIGHTS = (range(10, 1, -1), range(11, 1, -1))
+CNPJ_WEIGHTS = ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+
+
+def document_key(value):
+    """Cópia de cadastros.documents.document_key: dígitos do CPF/CNPJ válido, ou None."""
+    digits = re.sub(r'\D', '', str(value or ''))
+    weights = {11: CPF_WEIGHTS, 14: CNPJ_WEIGHTS}.get(len(digits))
+    if weights is None or len(set(digits)) == 1:
+        return None
+    numbers = [int(char) for char in digits]
+    body = len(digits) - 2
+    for position, weight in enumerate(weights):
+        remainder = sum(digit * factor for digit, factor in zip(numbers[:body + position], weight)) % 11
+        if (0 if remainder < 2 else 11 - remainder) != numbers[body + position]:
+            return None
+    return digits
+
+
+def fill_document_keys(apps, schema_editor):
+    """Preenche document_key (só dígitos, nulo se o CPF/CNPJ for inválido) dos cadastros existentes."""
+    alias = schema_editor.connection.alias
+    for model_name in MODELS:
+        model = apps.get_model('cadastros', model_name)
+        batch = []
+        for pk, document in model.objects.using(alias).values_list('id', 'document').iterator(chunk_size=2000):
+            key = document_key(document)
+            if key:
+                batch.append(model(pk=pk, document_key=key))
+        model.objects.using(alias).bulk_update(batch, ['document_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0006_document_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_document_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    """
+    Não funde cadastros automaticamente: se a mesma empresa tiver o mesmo
+    CPF/CNPJ em mais de um cadastro, o índice único não pode ser criado e a
+    migração para com instruções para revisar e fundir pelo comando.
+    """
+    alias = schema_editor.connection.alias
+    found = []
+    for model_name in ('Customer', 'Supplier'):
+        model = apps.get_model('cadastros', model_name)
+        repeated = (
+            model.objects.using(alias).filter(document_key__isnull=False)
+            .order_by().values('company_id', 'document_key').annotate(total=Count('id')).filter(total__gt=1)
+            .count()
+        )
+        if repeated:
+            found.append(f'{repeated} documento(s) repetido(s) em {model._meta.db_table}')
+    if found:
+        raise RuntimeError(
+            f"Há cadastros duplicados no banco '{alias}' ({'; '.join(found)}). "
+            'Revise com "manage.py dedup_documents --dry-run", funda com "manage.py dedup_documents" '
+            'e rode o migrate de novo.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    # O comando dedup_documents usa as tabelas de finance (contas a receber, log de
+    # alterações) e a fila de jobs: se a verificação parar a migração, elas já existem
+    dependencies = [
+        ('cadastros', '0007_fill_document_key'),
+        ('finance', '0018_customer_open_balance'),
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customer',
+            constraint=models.UniqueConstraint(fields=('company', 'document_key'), name='customer_unique_document_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='supplier',
+            constraint=models.UniqueConstraint(fields=('company', 'document_key'), name='supplier_unique_document_key'),
+        ),
+    ]
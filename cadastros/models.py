@@ -17,18 +17,29 @@ class Customer(models.Model):
     # Informações Básicas
     name = models.CharField(max_length=255, help_text="Nome completo ou Razão Social")
     customer_type = models.CharField(max_length=2, choices=CustomerType.choices, default=CustomerType.PESSOA_FISICA)
-    document = models.CharField(max_length=20, unique=True, help_text="CPF ou CNPJ")
+    document = models.CharField(max_length=20, help_text="CPF ou CNPJ")
+    # Só os dígitos, se o documento for válido; preenchido no save (ver cadastros/documents.py)
+    document_key = models.CharField(max_length=14, null=True, blank=True, editable=False)
     email = models.EmailField(max_length=255)
     phone = models.CharField(max_length=20)
     birth_date = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=StatusType.choices, default=StatusType.ACTIVE)
     notes = models.TextField(blank=True, null=True)
+    # Total das contas a receber em aberto, mantido pelos signals/lotes de finance (ver finance/ledger.py)
+    open_balance = models.DecimalField(max_digits=15, decimal_places=2, default=0, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        pass
+        indexes = [
+            # Listagem ordenada pela exposição (?ordering=-open_balance)
+            models.Index(fields=['company', 'open_balance'], name='customer_open_balance_idx'),
+        ]
+        constraints = [
+            # Um cliente por CPF/CNPJ em cada empresa; também atende a busca exata por documento
+            models.UniqueConstraint(fields=['company', 'document_key'], name='customer_unique_document_key'),
+        ]
 
     def __str__(self):
         return self.name
@@ -66,7 +77,9 @@ class Supplier(models.Model):
     name = models.CharField(max_length=255, help_text="Nome completo ou Razão Social")
     trade_name = models.CharField(max_length=255, blank=True, null=True, help_text="Nome Fantasia")
     supplier_type = models.CharField(max_length=2, choices=SupplierType.choices, default=SupplierType.PESSOA_JURIDICA)
-    document = models.CharField(max_length=20, unique=True, help_text="CPF ou CNPJ")
+    document = models.CharField(max_length=20, help_text="CPF ou CNPJ")
+    # Só os dígitos, se o documento for válido; preenchido no save (ver cadastros/documents.py)
+    document_key = models.CharField(max_length=14, null=True, blank=True, editable=False)
     state_registration = models.CharField(max_length=20, blank=True, null=True)
     municipal_registration = models.CharField(max_length=20, blank=True, null=True)
     
@@ -84,6 +97,11 @@ class Supplier(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'document_key'], name='supplier_unique_document_key'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -117,4 +135,47 @@ class SupplierBankAccount(models.Model):
     pix_key = models.CharField(max_length=255, blank=True, null=True)
 
     def __str__(self):
-        return f"Conta de {self.supplier.name}"
\ No newline at end of file
+        return f"Conta de {self.supplier.name}"
+
+class ImportBatch(models.Model):
+    """Importação de clientes ou fornecedores por planilha (CSV/XLSX), processada em segundo plano. Ver cadastros/importers.py."""
+    class KindChoices(models.TextChoices):
+        CUSTOMERS = 'customers', 'Clientes'
+        SUPPLIERS = 'suppliers', 'Fornecedores'
+
+    class FormatChoices(models.TextChoices):
+        CSV = 'csv', 'CSV'
+        XLSX = 'xlsx', 'XLSX'
+
+    class StatusChoices(models.TextChoices):
+        QUEUED = 'pendente', 'Pendente'
+        RUNNING = 'processando', 'Processando'
+        DONE = 'concluido', 'Concluído'
+        FAILED = 'falhou', 'Falhou'
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='import_batches')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='import_batches')
+    kind = models.CharField(max_length=10, choices=KindChoices.choices)
+    file = models.FileField(upload_to='imports/%Y/%m/', blank=True)
+    file_name = models.CharField(max_length=255, blank=True)
+    file_format = models.CharField(max_length=4, choices=FormatChoices.choices)
+    status = models.CharField(max_length=12, choices=StatusChoices.choices, default=StatusChoices.QUEUED)
+    # Progresso: linhas lidas, gravadas e rejeitadas até agora
+    processed_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    # [{'line': n, 'errors': {...}}] das linhas rejeitadas (até MAX_ERRORS)
+    errors = models.JSONField(default=list, blank=True)
+    # Erro que interrompeu a importação inteira (arquivo ilegível, colunas faltando...)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Importação de Cadastros"
+        verbose_name_plural = "Importações de Cadastros"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.file_name} ({self.get_status_display()})"
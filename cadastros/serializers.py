@@ -1,14 +1,37 @@
 from rest_framework import serializers
-from .models import Customer, Address, Supplier, SupplierAddress, SupplierBankAccount
+from .models import Customer, Address, Supplier, SupplierAddress, SupplierBankAccount, ImportBatch
+from .documents import document_key
+
+class DocumentValidationMixin:
+    """
+    Confere os dígitos verificadores do CPF/CNPJ e se a empresa já tem outro
+    cadastro com o mesmo documento (pela chave normalizada, em qualquer formato).
+    """
+    # A importação em lote confere a unicidade de uma vez por bloco (ver importers.py)
+    check_document_unique = True
+    document_taken_message = 'Já existe um cadastro com este documento.'
+
+    def validate_document(self, value):
+        key = document_key(value)
+        if key is None:
+            raise serializers.ValidationError('CPF ou CNPJ inválido.')
+        if self.check_document_unique:
+            queryset = self.Meta.model.objects.filter(company=self.context['request'].user.company, document_key=key)
+            if self.instance is not None:
+                queryset = queryset.exclude(pk=self.instance.pk)
+            if queryset.exists():
+                raise serializers.ValidationError(self.document_taken_message)
+        return value
 
 class AddressSerializer(serializers.ModelSerializer):
     class Meta:
         model = Address
         exclude = ('customer',)
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(DocumentValidationMixin, serializers.ModelSerializer):
     # Usamos o AddressSerializer para lidar com o endereço de forma aninhada
     address = AddressSerializer(required=False, allow_null=True)
+    document_taken_message = 'Já existe um cliente com este documento.'
 
     class Meta:
         model = Customer
@@ -17,12 +40,14 @@ class CustomerSerializer(serializers.ModelSerializer):
             'name',
             'customer_type',
             'document',
+            'document_key', # Só os dígitos do CPF/CNPJ
             'email',
             'phone',
             'birth_date',
             'status',
             'notes',
             'address', # Campo aninhado
+            'open_balance', # Total em aberto, mantido pelas contas a receber
             'created_at',
             'updated_at'
         ]
@@ -61,10 +86,11 @@ class SupplierBankAccountSerializer(serializers.ModelSerializer):
         model = SupplierBankAccount
         exclude = ('id', 'supplier')
 
-class SupplierSerializer(serializers.ModelSerializer):
+class SupplierSerializer(DocumentValidationMixin, serializers.ModelSerializer):
     # Serializers aninhados para lidar com os dados relacionados em uma única requisição
     address = SupplierAddressSerializer(required=False, allow_null=True)
     bank_account = SupplierBankAccountSerializer(required=False, allow_null=True)
+    document_taken_message = 'Já existe um fornecedor com este documento.'
 
     class Meta:
         model = Supplier
@@ -100,4 +126,17 @@ class SupplierSerializer(serializers.ModelSerializer):
         if bank_account_data:
             SupplierBankAccount.objects.update_or_create(supplier=instance, defaults=bank_account_data)
 
-        return instance
\ No newline at end of file
+        return instance
+
+class ImportBatchSerializer(serializers.ModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = ImportBatch
+        fields = [
+            'id', 'kind', 'kind_display', 'file_name', 'file_format', 'status', 'status_display',
+            'processed_rows', 'imported_rows', 'failed_rows', 'errors', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
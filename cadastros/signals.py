@@ -0,0 +1,12 @@
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+
+from .documents import document_key
+from .models import Customer, Supplier
+
+
+@receiver(pre_save, sender=Customer)
+@receiver(pre_save, sender=Supplier)
+def set_document_key(sender, instance, **kwargs):
+    """Recalcula a chave do CPF/CNPJ (só dígitos, nula se inválido) usada na busca e na unicidade por empresa."""
+    instance.document_key = document_key(instance.document)
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CustomerViewSet, SupplierViewSet
+from .views import CustomerViewSet, ImportBatchViewSet, SupplierViewSet
 
 router = DefaultRouter()
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'suppliers', SupplierViewSet, basename='supplier')
+router.register(r'imports', ImportBatchViewSet, basename='import-batch')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,9 +1,48 @@
-from rest_framework import viewsets, permissions
-from .models import Customer, Supplier
-from .serializers import CustomerSerializer, SupplierSerializer
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .models import Customer, ImportBatch, Supplier
+from .serializers import CustomerSerializer, ImportBatchSerializer, SupplierSerializer
+from .importers import ImportFileError, start_import
+from .documents import document_key
 from accounts.permissions import CanEditCadastros
+from core.search import search_queryset
+from core.db_routers import use_replica
+from core.sharding import TenantAtomicWritesMixin
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from finance.ledger import DEFAULT_PAGE_SIZE, customer_statement
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class DocumentLookupMixin:
+    """
+    Busca exata por CPF/CNPJ em qualquer formato, pelo índice único
+    (empresa, document_key). Ex: /api/cadastros/customers/lookup/?document=123.456.789-09
+    """
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        key = document_key(request.query_params.get('document'))
+        if key is None:
+            return Response({'error': 'Informe um CPF ou CNPJ válido em ?document=.'}, status=status.HTTP_400_BAD_REQUEST)
+        instance = self.get_queryset().filter(document_key=key).first()
+        if instance is None:
+            return Response({'error': 'Nenhum cadastro com este documento.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(instance).data, status=status.HTTP_200_OK)
+
+
+def filter_search(queryset, search, fields):
+    """?search=: um CPF/CNPJ válido vai direto ao índice do documento; o resto, à busca textual."""
+    key = document_key(search)
+    if key is not None:
+        return queryset.filter(document_key=key)
+    return search_queryset(queryset, search, fields)
+
+
+# Campos aceitos em ?ordering= na listagem de clientes (prefixo '-' para decrescente)
+CUSTOMER_ORDERING = {'name', 'created_at', 'open_balance'}
+
+@method_decorator(use_replica, name='dispatch')
+class CustomerViewSet(DocumentLookupMixin, TenantAtomicWritesMixin, viewsets.ModelViewSet):
     """
     API endpoint que permite que clientes sejam visualizados ou editados.
     """
@@ -13,8 +52,22 @@ class CustomerViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Garante que o usuário só possa ver os clientes da sua própria empresa.
+        Aceita ?search= (nome, e-mail ou documento, sem acentos; um CPF/CNPJ
+        válido é buscado pela chave normalizada) e ?ordering=
+        (name, created_at ou open_balance; ex.: -open_balance para os maiores
+        saldos em aberto primeiro).
         """
-        return Customer.objects.filter(company=self.request.user.company)
+        queryset = Customer.objects.filter(company=self.request.user.company)
+
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = filter_search(queryset, search, ['name', 'email', 'document'])
+
+        ordering = self.request.query_params.get('ordering', '')
+        if ordering.lstrip('-') in CUSTOMER_ORDERING:
+            queryset = queryset.order_by(ordering, 'id')
+
+        return queryset
 
     def perform_create(self, serializer):
         """
@@ -25,7 +78,47 @@ class CustomerViewSet(viewsets.ModelViewSet):
             user=self.request.user
         )
 
-class SupplierViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        Extrato do cliente: cobranças (vencimento) e recebimentos em ordem de
+        data, com saldo acumulado. Paginado por cursor: passe o next_cursor da
+        resposta em ?cursor= para a próxima página.
+        Ex: /api/cadastros/customers/1/statement/?start_date=2026-01-01&limit=50
+        """
+        customer = self.get_object()
+        dates = {}
+        for name in ('start_date', 'end_date'):
+            value = request.query_params.get(name)
+            if not value:
+                dates[name] = None
+                continue
+            # parse_date devolve None fora do formato e levanta ValueError em datas impossíveis (2026-02-30)
+            try:
+                dates[name] = parse_date(value)
+            except ValueError:
+                dates[name] = None
+            if dates[name] is None:
+                return Response({'error': 'Data inválida. Use o formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return Response({'error': 'limit deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page = customer_statement(
+                customer.company_id, customer.pk, dates['start_date'], dates['end_date'],
+                cursor=request.query_params.get('cursor'), limit=limit,
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'customer': {'id': customer.pk, 'name': customer.name, 'open_balance': customer.open_balance},
+            **page,
+        }, status=status.HTTP_200_OK)
+
+@method_decorator(use_replica, name='dispatch')
+class SupplierViewSet(DocumentLookupMixin, TenantAtomicWritesMixin, viewsets.ModelViewSet):
     """
     API endpoint para visualizar e editar Fornecedores.
     """
@@ -35,8 +128,16 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Filtra os fornecedores para mostrar apenas os da empresa do usuário logado.
+        Aceita ?search= (razão social, nome fantasia ou documento, sem acentos;
+        um CPF/CNPJ válido é buscado pela chave normalizada).
         """
-        return Supplier.objects.filter(company=self.request.user.company)
+        queryset = Supplier.objects.filter(company=self.request.user.company)
+
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = filter_search(queryset, search, ['name', 'trade_name', 'document'])
+
+        return queryset
 
     def perform_create(self, serializer):
         """
@@ -45,4 +146,31 @@ class SupplierViewSet(viewsets.ModelViewSet):
         serializer.save(
             company=self.request.user.company,
             user=self.request.user
-        )
\ No newline at end of file
+        )
+
+
+class ImportBatchViewSet(mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Importação de clientes ou fornecedores por planilha (ver cadastros/importers.py).
+    POST (multipart): file (.csv ou .xlsx) e kind (customers ou suppliers).
+    A resposta (202) traz o id; o progresso e os erros por linha ficam em
+    GET /api/cadastros/imports/<id>/ (e no evento 'import_progress').
+    """
+    serializer_class = ImportBatchSerializer
+    permission_classes = [CanEditCadastros]
+
+    def get_queryset(self):
+        return ImportBatch.objects.filter(company=self.request.user.company)
+
+    def create(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        kind = request.data.get('kind')
+        if upload is None:
+            return Response({'file': ['Envie o arquivo da planilha.']}, status=status.HTTP_400_BAD_REQUEST)
+        if kind not in ImportBatch.KindChoices.values:
+            return Response({'kind': ['Use customers ou suppliers.']}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            batch = start_import(request.user.company, request.user, kind, upload)
+        except ImportFileError as exc:
+            return Response({'file': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(batch).data, status=status.HTTP_202_ACCEPTED)
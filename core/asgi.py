@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+O endpoint de eventos em tempo real (finance/events/) precisa deste app: cada
+conexão SSE é um gerador assíncrono, sem ocupar uma thread do servidor.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
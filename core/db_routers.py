@@ -0,0 +1,227 @@
+"""
+Roteadores de banco: sharding por empresa e leituras na réplica.
+
+ShardRouter envia os modelos dos apps por empresa (DATABASE_SHARDING['APPS'])
+para o banco da empresa ativa no contexto (ver core/sharding.py); empresas sem
+shard próprio continuam no 'default' e passam pelo ReplicaRouter.
+
+Views marcadas com use_replica (relatórios, gráficos e listagens) fazem as
+leituras de requisições GET na réplica configurada em DATABASE_REPLICA['ALIAS'].
+Escritas sempre vão para o 'default'.
+
+Leitura das próprias escritas: depois de uma requisição de escrita bem-sucedida,
+ReplicaPinningMiddleware grava um cookie por alguns segundos (o atraso de
+replicação esperado); enquanto ele existir, as leituras daquele cliente
+continuam no 'default'.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+DEFAULTS = {
+    'ALIAS': 'replica',
+    # Tempo (s) em que o cliente fica preso ao 'default' após uma escrita
+    'STICKY_SECONDS': 15,
+    'COOKIE_NAME': 'db_primary_pin',
+}
+
+SHARDING_DEFAULTS = {
+    'SHARDS': [DEFAULT_DB_ALIAS],
+    'APPS': ['finance', 'cadastros'],
+}
+
+_current_shard = contextvars.ContextVar('finaplus_current_shard', default=None)
+_read_alias = contextvars.ContextVar('finaplus_read_alias', default=None)
+_pinned = contextvars.ContextVar('finaplus_primary_pinned', default=False)
+
+
+def get_setting(name):
+    return getattr(settings, 'DATABASE_REPLICA', {}).get(name, DEFAULTS[name])
+
+
+def get_sharding_setting(name):
+    return getattr(settings, 'DATABASE_SHARDING', {}).get(name, SHARDING_DEFAULTS[name])
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+def set_current_shard(alias):
+    """Define o shard do contexto atual; devolve o token para reset_current_shard()."""
+    return _current_shard.set(alias)
+
+
+def reset_current_shard(token):
+    _current_shard.reset(token)
+
+
+def replica_alias():
+    """Alias da réplica, ou None se não houver réplica configurada."""
+    alias = get_setting('ALIAS')
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def reading_from_replica():
+    """Envia as leituras do bloco para a réplica (se existir e o cliente não estiver preso ao primário)."""
+    alias = replica_alias()
+    if alias is None or _pinned.get():
+        yield
+        return
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(view_func):
+    """
+    Decorator de view: leituras de requisições seguras (GET/HEAD/OPTIONS) vão
+    para a réplica. Em class-based views use method_decorator(use_replica, name='dispatch').
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        with reading_from_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ShardRouter:
+    """
+    Modelos dos apps por empresa vão para o shard ativo no contexto (ou para o
+    banco de onde a instância foi carregada). Sem shard ativo, ou com o shard
+    'default', a decisão fica com os próximos roteadores.
+    """
+
+    def _shard_for(self, model, hints):
+        if model._meta.app_label not in get_sharding_setting('APPS'):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._meta.app_label in get_sharding_setting('APPS') and instance._state.db:
+            alias = instance._state.db
+        else:
+            alias = _current_shard.get()
+        if alias == DEFAULT_DB_ALIAS:
+            return None
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Empresa e usuários são copiados para o shard, então as FKs continuam válidas
+        shards = get_sharding_setting('SHARDS')
+        if len(shards) > 1 and obj1._state.db in shards and obj2._state.db in shards:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ShardMiddleware:
+    """Garante que o shard ativado durante a autenticação não vaze para a próxima requisição da thread."""
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_shard.set(_current_shard.get())
+        try:
+            return self.get_response(request)
+        finally:
+            _current_shard.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_shard.set(_current_shard.get())
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_shard.reset(token)
+
+
+class ReplicaRouter:
+    """Leituras na réplica apenas dentro de use_replica; escritas e migrações no 'default'."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None:
+            return None
+        # Dentro de uma transação no primário, a leitura precisa enxergar o que foi escrito nela
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, get_setting('ALIAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema por replicação, não por migrate
+        if db == get_setting('ALIAS'):
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Prende o cliente ao banco primário por alguns segundos depois de uma escrita."""
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _pinned.set(get_setting('COOKIE_NAME') in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        return self._pin(request, response)
+
+    async def __acall__(self, request):
+        token = _pinned.set(get_setting('COOKIE_NAME') in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        return self._pin(request, response)
+
+    def _pin(self, request, response):
+        cookie_name = get_setting('COOKIE_NAME')
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_alias():
+            response.set_cookie(
+                cookie_name, '1',
+                max_age=get_setting('STICKY_SECONDS'),
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
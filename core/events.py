@@ -0,0 +1,179 @@
+"""
+Eventos em tempo real por empresa, entregues por server-sent events (SSE).
+
+publish(company_id, event, data) envia o evento a todas as conexões abertas
+da empresa (ver finance.views.event_stream_view). O transporte entre quem publica
+e as conexões é um backend plugável (EVENTS['BACKEND']): o padrão,
+InProcessBackend, não depende de nenhum serviço externo e entrega às conexões
+do próprio processo; com vários workers, um backend com pub/sub (ex.: Redis)
+implementa a mesma interface de BaseBackend.
+
+Cada conexão custa uma asyncio.Queue limitada e um gerador assíncrono, sem
+thread. A mensagem é codificada uma vez e o mesmo objeto bytes é enfileirado
+para todas as conexões; conexões lentas perdem as mensagens mais antigas em
+vez de acumular memória.
+"""
+import asyncio
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('finaplus.events')
+
+DEFAULTS = {
+    'BACKEND': 'core.events.InProcessBackend',
+    # Mensagens pendentes por conexão antes de descartar as mais antigas
+    'QUEUE_SIZE': 16,
+    # Comentário enviado periodicamente para manter proxies e balanceadores abertos
+    'HEARTBEAT_SECONDS': 25,
+    # Intervalo de reconexão sugerido ao navegador (campo retry do SSE)
+    'RETRY_MS': 5000,
+}
+
+HEARTBEAT = b': ping\n\n'
+
+
+def get_setting(name):
+    return getattr(settings, 'EVENTS', {}).get(name, DEFAULTS[name])
+
+
+def company_channel(company_id):
+    return f'company:{company_id}'
+
+
+def encode_event(event, data, event_id=None):
+    """Mensagem no formato text/event-stream."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class Subscription:
+    """Uma conexão aberta: a fila fica no event loop que a criou."""
+    __slots__ = ('channel', 'queue', 'loop', 'dropped')
+
+    def __init__(self, channel, loop=None, maxsize=None):
+        self.channel = channel
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize or get_setting('QUEUE_SIZE'))
+        self.dropped = 0
+
+    def deliver(self, message):
+        """Pode ser chamado de qualquer thread (ex.: on_commit de uma view síncrona)."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # Event loop já encerrado: a conexão não existe mais
+            pass
+
+    def _put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class BaseBackend(ABC):
+    """
+    Interface dos backends: ligam quem publica às assinaturas abertas. Um
+    backend incompleto falha ao ser instanciado, não no primeiro publish().
+    """
+
+    @abstractmethod
+    def subscribe(self, subscription):
+        """Passa a entregar à assinatura as mensagens do canal dela."""
+
+    @abstractmethod
+    def unsubscribe(self, subscription):
+        """Para de entregar à assinatura (conexão fechada)."""
+
+    @abstractmethod
+    def publish(self, channel, message):
+        """Entrega a mensagem (bytes já codificados) às assinaturas do canal. Retorna quantas."""
+
+    @abstractmethod
+    def subscription_count(self, channel=None):
+        """Assinaturas abertas no canal, ou em todos."""
+
+
+class InProcessBackend(BaseBackend):
+    """Entrega às conexões do próprio processo. Sem dependências externas."""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscription):
+        with self._lock:
+            self._channels.setdefault(subscription.channel, set()).add(subscription)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return len(subscribers)
+
+    def subscription_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._channels.get(channel, ()))
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(get_setting('BACKEND'))()
+    return _backend
+
+
+def publish(company_id, event, data, event_id=None):
+    """Publica um evento para as conexões da empresa. Retorna quantas receberam (no processo, se local)."""
+    try:
+        return get_backend().publish(company_channel(company_id), encode_event(event, data, event_id))
+    except Exception:
+        # Notificação em tempo real nunca deve derrubar a escrita que a originou
+        logger.exception('Falha ao publicar o evento %s da empresa %s', event, company_id)
+        return 0
+
+
+async def event_stream(company_id, initial=(), heartbeat=None):
+    """Gerador assíncrono de uma conexão SSE: `initial`, depois os eventos da empresa e heartbeats."""
+    heartbeat = heartbeat or get_setting('HEARTBEAT_SECONDS')
+    backend = get_backend()
+    subscription = Subscription(company_channel(company_id))
+    backend.subscribe(subscription)
+    try:
+        yield f"retry: {get_setting('RETRY_MS')}\n\n".encode()
+        for message in initial:
+            yield message
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                message = HEARTBEAT
+            yield message
+    finally:
+        backend.unsubscribe(subscription)
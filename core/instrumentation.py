@@ -0,0 +1,194 @@
+"""
+Instrumentação por requisição: quantidade e tempo de SQL, tempo de renderização
+da resposta e tempo total, agregados por view em histogramas mantidos em memória.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Limites (em ms) dos buckets dos histogramas de latência
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Limites dos buckets do histograma de quantidade de queries
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Quantidade máxima de queries guardadas por requisição para o log de lentidão
+MAX_RECORDED_QUERIES = 500
+
+DEFAULTS = {
+    'SERVER_TIMING_HEADER': True,
+    'SLOW_REQUEST_MS': None,
+    'METRICS_TOKEN': None,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(name, DEFAULTS[name])
+
+
+class RequestStats:
+    """Acumula as medições de uma única requisição."""
+
+    def __init__(self, record_queries=False):
+        self.started = time.perf_counter()
+        self.total_time = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.render_time = 0.0
+        self.record_queries = record_queries
+        self.queries = []
+
+    def add_query(self, sql, elapsed):
+        self.sql_count += 1
+        self.sql_time += elapsed
+        if self.record_queries and len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append({'sql': sql, 'ms': round(elapsed * 1000, 3)})
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_time * 1000, 3),
+            'sql_ms': round(self.sql_time * 1000, 3),
+            'sql_count': self.sql_count,
+            'render_ms': round(self.render_time * 1000, 3),
+        }
+
+
+_current_stats = ContextVar('finaplus_request_stats', default=None)
+
+
+def current_stats():
+    return _current_stats.get()
+
+
+def activate(stats):
+    return _current_stats.set(stats)
+
+
+def deactivate(token):
+    _current_stats.reset(token)
+
+
+def record_query(execute, sql, params, many, context, stats=None):
+    """
+    Wrapper de execução de SQL (connection.execute_wrapper) que contabiliza
+    cada query na requisição ativa, ou em `stats` quando informado (respostas
+    em streaming continuam gerando queries depois que a view retorna).
+    """
+    stats = stats or _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - start)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Histogramas agregados no processo, indexados por nome da métrica e labels.
+    Exportados no formato texto do Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._help = {}
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS_MS, help_text='', **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+                self._help.setdefault(name, help_text)
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._help.clear()
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            by_name = {}
+            for (name, labels), histogram in self._histograms.items():
+                by_name.setdefault(name, []).append((labels, histogram))
+
+            for name in sorted(by_name):
+                if self._help.get(name):
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(by_name[name], key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_format_labels(labels, le=bound)} {cumulative}')
+                    lines.append(f'{name}_bucket{_format_labels(labels, le="+Inf")} {histogram.count}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum:.3f}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + '}'
+
+
+registry = MetricsRegistry()
+
+
+def observe_request(view_name, stats):
+    """Registra as medições de uma requisição finalizada nos histogramas."""
+    registry.observe(
+        'finaplus_request_duration_ms', stats.total_time * 1000,
+        help_text='Tempo total da requisição (ms)', view=view_name,
+    )
+    registry.observe(
+        'finaplus_request_sql_duration_ms', stats.sql_time * 1000,
+        help_text='Tempo gasto em SQL por requisição (ms)', view=view_name,
+    )
+    registry.observe(
+        'finaplus_request_sql_queries', stats.sql_count, buckets=QUERY_COUNT_BUCKETS,
+        help_text='Quantidade de queries SQL por requisição', view=view_name,
+    )
+    registry.observe(
+        'finaplus_request_render_duration_ms', stats.render_time * 1000,
+        help_text='Tempo de renderização da resposta (ms)', view=view_name,
+    )
+
+
+def server_timing_header(stats):
+    app_time = max(stats.total_time - stats.sql_time - stats.render_time, 0.0)
+    return ', '.join([
+        f'sql;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} queries"',
+        f'render;dur={stats.render_time * 1000:.1f}',
+        f'app;dur={app_time * 1000:.1f}',
+        f'total;dur={stats.total_time * 1000:.1f}',
+    ])
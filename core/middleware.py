@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from . import instrumentation
+
+logger = logging.getLogger('finaplus.instrumentation')
+
+
+class RequestTimingMiddleware:
+    """
+    Mede cada requisição (SQL, renderização e tempo total) e expõe o resultado
+    no cabeçalho Server-Timing, em uma linha de log estruturada (JSON) e nos
+    histogramas de core.instrumentation.
+
+    Em respostas em streaming (exportações, SSE) o conteúdo é gerado depois
+    que a view retorna: o cabeçalho leva o que foi medido até ali, e a
+    contagem de SQL continua até o servidor fechar a resposta, quando são
+    feitos o log e os histogramas.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Em ASGI a cadeia continua assíncrona (conexões SSE não ocupam uma thread)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = self._start()
+        wrappers = self._query_wrappers(stats)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            wrappers.close()
+            raise
+        finally:
+            instrumentation.deactivate(token)
+        return self._finish(request, response, stats, wrappers)
+
+    async def __acall__(self, request):
+        stats, token = self._start()
+        wrappers = self._query_wrappers(stats)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            wrappers.close()
+            raise
+        finally:
+            instrumentation.deactivate(token)
+        return self._finish(request, response, stats, wrappers)
+
+    def _start(self):
+        slow_request_ms = instrumentation.get_setting('SLOW_REQUEST_MS')
+        stats = instrumentation.RequestStats(record_queries=slow_request_ms is not None)
+        return stats, instrumentation.activate(stats)
+
+    @staticmethod
+    def _query_wrappers(stats):
+        # Presos a `stats` (e não ao contexto da requisição) para valerem também durante o streaming
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(partial(instrumentation.record_query, stats=stats)))
+        return stack
+
+    def _finish(self, request, response, stats, wrappers):
+        stats.finish()
+        if instrumentation.get_setting('SERVER_TIMING_HEADER'):
+            response['Server-Timing'] = instrumentation.server_timing_header(stats)
+
+        if response.streaming:
+            def close():
+                wrappers.close()
+                stats.finish()
+                self._record(request, response, stats)
+            # Chamado pelo response.close() do servidor, depois de enviado o conteúdo
+            response._resource_closers.append(close)
+        else:
+            wrappers.close()
+            self._record(request, response, stats)
+        return response
+
+    def _record(self, request, response, stats):
+        slow_request_ms = instrumentation.get_setting('SLOW_REQUEST_MS')
+        view_name = self._view_name(request)
+        instrumentation.observe_request(view_name, stats)
+
+        log_data = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            **stats.as_dict(),
+        }
+        if slow_request_ms is not None and stats.total_time * 1000 >= slow_request_ms:
+            log_data['event'] = 'slow_request'
+            log_data['queries'] = stats.queries
+            logger.warning(json.dumps(log_data, default=str))
+        else:
+            logger.info(json.dumps(log_data, default=str))
+
+    def process_template_response(self, request, response):
+        """
+        Renderiza a resposta do DRF aqui para medir o tempo de renderização
+        (JSON, CSV...). A validação e o to_representation dos serializers rodam
+        dentro da view e entram em 'app'. A renderização é idempotente, então o
+        Django não a repete depois.
+        """
+        stats = instrumentation.current_stats()
+        if stats is not None:
+            start = time.perf_counter()
+            response.render()
+            stats.render_time += time.perf_counter() - start
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unresolved'
+        return match.view_name or match._func_path
@@ -0,0 +1,103 @@
+"""
+Busca textual indexada, insensível a acentos e maiúsculas.
+
+No PostgreSQL, finaplus_normalize(text) é uma função IMMUTABLE (lower + unaccent)
+criada pelas migrações, com índices GIN trigram (pg_trgm) sobre
+finaplus_normalize(coluna); o filtro LIKE '%termo%' e a ordenação por
+similarity() usam esses índices. No SQLite (testes e benchmarks locais) as
+mesmas funções são registradas em Python a cada nova conexão.
+"""
+import re
+import unicodedata
+
+from django.db.models import F, FloatField, Func, Q, TextField, Value
+from django.db.models.functions import Greatest
+
+MAX_SEARCH_WORDS = 5
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_text(value):
+    """Remove acentos e converte para minúsculas ('São João' -> 'sao joao')."""
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def trigrams(value):
+    """Conjunto de trigramas do texto normalizado, como o pg_trgm (palavras com '  ' e ' ')."""
+    grams = set()
+    for word in _WORD_RE.findall(normalize_text(value) or ''):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_similarity(left, right):
+    """Mesma definição do similarity() do pg_trgm: |A ∩ B| / |A ∪ B| dos trigramas."""
+    if left is None or right is None:
+        return None
+    return set_similarity(trigrams(left), trigrams(right))
+
+
+def set_similarity(left_grams, right_grams):
+    """Similaridade entre conjuntos de trigramas já calculados (evita recalcular em laços)."""
+    if not left_grams or not right_grams:
+        return 0.0
+    return len(left_grams & right_grams) / len(left_grams | right_grams)
+
+
+def install_sqlite_functions(connection):
+    """Registra as funções de busca em uma conexão SQLite."""
+    connection.connection.create_function('finaplus_normalize', 1, normalize_text, deterministic=True)
+    connection.connection.create_function('similarity', 2, trigram_similarity, deterministic=True)
+
+
+class Normalize(Func):
+    function = 'finaplus_normalize'
+    output_field = TextField()
+
+
+class TrigramSimilarity(Func):
+    function = 'similarity'
+    output_field = FloatField()
+
+
+def search_words(term):
+    """Quebra o termo em palavras normalizadas (no máximo MAX_SEARCH_WORDS)."""
+    return _WORD_RE.findall(normalize_text(term or ''))[:MAX_SEARCH_WORDS]
+
+
+def search_queryset(queryset, term, fields, extra=None, rank=False, rank_fields=None):
+    """
+    Filtra o queryset para que cada palavra do termo apareça em pelo menos um
+    dos campos. `extra(word)` pode devolver um Q adicional por palavra (ex.: um
+    filtro por subquery em outra tabela). Com rank=True, anota `search_rank`
+    com a maior similaridade entre o termo e os campos (ou rank_fields).
+    """
+    words = search_words(term)
+    if not words:
+        return queryset
+
+    aliases = {f"_search_{field.replace('__', '_')}": Normalize(F(field)) for field in fields}
+    queryset = queryset.alias(**aliases)
+
+    for word in words:
+        condition = Q()
+        for alias in aliases:
+            condition |= Q(**{f'{alias}__contains': word})
+        if extra is not None:
+            condition |= extra(word)
+        queryset = queryset.filter(condition)
+
+    if rank:
+        normalized_term = ' '.join(words)
+        scores = [
+            TrigramSimilarity(Normalize(F(field)), Value(normalized_term))
+            for field in (rank_fields or fields)
+        ]
+        queryset = queryset.annotate(search_rank=Greatest(*scores) if len(scores) > 1 else scores[0])
+
+    return queryset
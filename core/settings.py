@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -38,11 +39,16 @@ INSTALLED_APPS = [
     'accounts.apps.AccountsConfig',
     'finance.apps.FinanceConfig', 
     'cadastros.apps.CadastrosConfig',
+    'jobs.apps.JobsConfig',
+    'notifications.apps.NotificationsConfig',
     
 ]
     
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.db_routers.ShardMiddleware',
+    'core.db_routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,6 +95,59 @@ DATABASES = {
     }
 }
 
+# Permite rodar localmente (benchmarks, testes) com SQLite: FINAPLUS_DB=sqlite
+if os.environ.get('FINAPLUS_DB') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('FINAPLUS_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+    }
+
+# Réplica de leitura opcional para relatórios e listagens (ver core/db_routers.py).
+# PostgreSQL: FINAPLUS_DB_REPLICA_HOST aponta para o servidor réplica.
+# SQLite: FINAPLUS_DB_REPLICA=1 cria o alias usando FINAPLUS_SQLITE_REPLICA_PATH
+# (uma cópia do arquivo principal) ou o próprio arquivo principal.
+if os.environ.get('FINAPLUS_DB_REPLICA_HOST') or os.environ.get('FINAPLUS_DB_REPLICA') == '1':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        # Nos testes a réplica espelha o default em vez de ter um banco próprio
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES['replica']['NAME'] = os.environ.get('FINAPLUS_SQLITE_REPLICA_PATH', DATABASES['default']['NAME'])
+    elif os.environ.get('FINAPLUS_DB_REPLICA_HOST'):
+        DATABASES['replica']['HOST'] = os.environ['FINAPLUS_DB_REPLICA_HOST']
+
+# Sharding por empresa (ver core/sharding.py): cada alias em SHARDS recebe o schema
+# completo (migrate --database <alias>) e o mapeamento fica em accounts.CompanyShard.
+# PostgreSQL: FINAPLUS_SHARD_HOSTS=host1,host2 cria shard1, shard2 com as mesmas credenciais.
+# SQLite: FINAPLUS_SHARDS=3 cria shard1..shard3 em FINAPLUS_SQLITE_SHARD_DIR.
+DATABASE_SHARDING = {
+    'SHARDS': ['default'],
+    # Apps cujos dados ficam no shard da empresa
+    'APPS': ['finance', 'cadastros'],
+}
+if os.environ.get('FINAPLUS_SHARD_HOSTS'):
+    for number, host in enumerate(os.environ['FINAPLUS_SHARD_HOSTS'].split(','), start=1):
+        DATABASES[f'shard{number}'] = {**DATABASES['default'], 'HOST': host.strip()}
+        DATABASE_SHARDING['SHARDS'].append(f'shard{number}')
+elif os.environ.get('FINAPLUS_SHARDS') and DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    shard_dir = os.environ.get('FINAPLUS_SQLITE_SHARD_DIR', BASE_DIR)
+    for number in range(1, int(os.environ['FINAPLUS_SHARDS']) + 1):
+        DATABASES[f'shard{number}'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(shard_dir, f'shard{number}.sqlite3'),
+        }
+        DATABASE_SHARDING['SHARDS'].append(f'shard{number}')
+
+DATABASE_ROUTERS = ['core.db_routers.ShardRouter', 'core.db_routers.ReplicaRouter']
+
+DATABASE_REPLICA = {
+    'ALIAS': 'replica',
+    # Segundos em que o cliente lê do primário depois de uma escrita (atraso de replicação)
+    'STICKY_SECONDS': 15,
+    'COOKIE_NAME': 'db_primary_pin',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,6 +185,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Arquivos enviados (ex.: planilhas de importação de cadastros). Com vários
+# servidores/workers, configure em STORAGES um storage compartilhado.
+MEDIA_ROOT = os.environ.get('FINAPLUS_MEDIA_ROOT', BASE_DIR / 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -153,6 +216,109 @@ REST_FRAMEWORK = {
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+EMAIL_OUTBOX = {
+    # E-mails são gravados na caixa de saída e enviados pelo worker (ver notifications/outbox.py)
+    'BATCH_SIZE': 100,
+    'RATE_PER_SECOND': float(os.environ.get('FINAPLUS_EMAIL_RATE', 10)),
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF_SECONDS': 60,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'MAX_RUN_SECONDS': 300,
+    'TIMEOUT_SECONDS': 600,
+    'KEEP_SENT_DAYS': 30,
+}
+
+INSTRUMENTATION = {
+    # Adiciona o cabeçalho Server-Timing (sql, render, app, total) às respostas
+    'SERVER_TIMING_HEADER': True,
+    # Requisições mais lentas que este limite (ms) registram a lista completa de queries.
+    # None desativa o registro.
+    'SLOW_REQUEST_MS': None,
+    # Token exigido em /metrics/ (Authorization: Bearer <token>).
+    # Sem token, o endpoint só responde com DEBUG ativo.
+    'METRICS_TOKEN': None,
+}
+
+FINANCE_PARTITIONING = {
+    # Particiona finance_transaction e finance_payable por data (somente PostgreSQL).
+    # Lido pela migração finance.0011; depois, use o comando maintain_partitions.
+    'ENABLED': os.environ.get('FINAPLUS_PARTITIONING') == '1',
+    # Intervalo de cada partição: 'year' ou 'month'
+    'INTERVAL': os.environ.get('FINAPLUS_PARTITION_INTERVAL', 'year'),
+    # Intervalos futuros mantidos criados pelo maintain_partitions
+    'AHEAD': 2,
+}
+
+FINANCE_CHANGELOG = {
+    # Log de alterações usado pelo endpoint changes/ (ver finance/changelog.py).
+    # Clientes com cursor mais antigo que a retenção recarregam as listas.
+    'RETENTION_DAYS': int(os.environ.get('FINAPLUS_CHANGELOG_RETENTION_DAYS', 30)),
+    'COMPACT_EVERY': 5000,
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 5000,
+}
+
+LARGE_TRANSACTIONS = {
+    # Alerta de transações acima do padrão da categoria (User.notify_large_transactions), ver finance/outliers.py
+    'MIN_SAMPLES': 20,
+    'Z_THRESHOLD': 3.0,
+    'MIN_AMOUNT': 0,
+}
+
+BILL_REMINDERS = {
+    # Resumo diário de contas a pagar (User.notify_bills_reminder), ver finance/reminders.py.
+    # Agendado pelo comando bill_reminders e executado pelo worker.
+    'DAYS_AHEAD': 3,
+    'OVERDUE_DAYS': 30,
+    'MAX_ITEMS': 20,
+    'SEND_HOUR': 8,
+}
+
+JOBS = {
+    # Fila de tarefas em segundo plano no banco (ver jobs/queue.py), executada
+    # pelo comando run_worker.
+    'BATCH_SIZE': 10,
+    'POLL_SECONDS': 1.0,
+    'MAX_POLL_SECONDS': 10.0,
+    'TIMEOUT_SECONDS': 900,
+    'RETRY_BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    'KEEP_DONE_DAYS': 7,
+}
+
+EVENTS = {
+    # Eventos em tempo real (SSE) do endpoint events/, servido pelo app ASGI (ver core/events.py).
+    # O backend padrão entrega só às conexões do próprio processo; com vários
+    # workers, aponte para um backend com pub/sub que implemente BaseBackend.
+    'BACKEND': os.environ.get('FINAPLUS_EVENTS_BACKEND', 'core.events.InProcessBackend'),
+    'QUEUE_SIZE': 16,
+    'HEARTBEAT_SECONDS': 25,
+    'RETRY_MS': 5000,
+}
+
+CADASTROS_IMPORT = {
+    # Importação de clientes/fornecedores por planilha (ver cadastros/importers.py)
+    'CHUNK_SIZE': 1000,
+    'MAX_ERRORS': 1000,
+    'MAX_FILE_MB': 100,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'finaplus': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 SIMPLE_JWT = {
     # Define o tempo de vida do token de acesso
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
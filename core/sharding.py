@@ -0,0 +1,330 @@
+"""
+Sharding por empresa.
+
+Os dados dos apps por empresa (DATABASE_SHARDING['APPS']) de cada empresa
+ficam em um único banco, indicado por accounts.CompanyShard (sem registro, o
+'default'). Empresa e usuários continuam no 'default', que é a fonte da
+verdade para login e permissões; uma cópia deles é mantida no shard para que
+as FKs funcionem.
+
+O shard é ativado na autenticação (CookieJWTAuthentication) e, fora de
+requisições (comandos, jobs), com `for_company(company)`.
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ContextDecorator, contextmanager
+from graphlib import TopologicalSorter
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.dispatch import Signal
+
+from .db_routers import current_shard, get_sharding_setting, reset_current_shard, set_current_shard
+
+logger = logging.getLogger('finaplus.sharding')
+
+MOVE_CHUNK_SIZE = 2000
+
+# Enviado depois que os dados de uma empresa mudam de shard (sender=None, company_id, source, target)
+company_moved = Signal()
+
+_commit_hooks = contextvars.ContextVar('finaplus_commit_hooks', default=None)
+
+
+def shard_aliases():
+    return list(get_sharding_setting('SHARDS'))
+
+
+def sharding_enabled():
+    return len(shard_aliases()) > 1
+
+
+def shard_for_company(company_id):
+    """Retorna (alias, em_migração) da empresa. Consulta sempre o 'default'."""
+    if not sharding_enabled() or company_id is None:
+        return DEFAULT_DB_ALIAS, False
+    from accounts.models import CompanyShard
+
+    row = CompanyShard.objects.using(DEFAULT_DB_ALIAS).filter(company_id=company_id).values_list(
+        'database', 'is_moving'
+    ).first()
+    return row or (DEFAULT_DB_ALIAS, False)
+
+
+def tenant_database():
+    """Banco da empresa ativa no contexto."""
+    return current_shard() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def for_company(company):
+    """Ativa o shard da empresa no bloco (comandos, jobs, benchmarks)."""
+    company_id = getattr(company, 'pk', company)
+    alias, _ = shard_for_company(company_id)
+    token = set_current_shard(alias)
+    try:
+        yield alias
+    finally:
+        reset_current_shard(token)
+
+
+class _CommitHooks:
+    def __init__(self, using):
+        self.using = using
+        self.callbacks = []
+        self.data = {}
+
+
+class tenant_atomic(ContextDecorator):
+    """
+    transaction.atomic() no banco da empresa ativa. Uso: `with tenant_atomic():` ou `@tenant_atomic()`.
+    No bloco mais externo, as funções registradas com before_commit() rodam no
+    fim, ainda dentro da transação.
+    """
+
+    def _recreate_cm(self):
+        return tenant_atomic()
+
+    def __enter__(self):
+        using = tenant_database()
+        self._atomic = transaction.atomic(using=using)
+        self._hooks_token = None
+        outermost = not connections[using].in_atomic_block
+        result = self._atomic.__enter__()
+        if outermost:
+            self._hooks_token = _commit_hooks.set(_CommitHooks(using))
+        return result
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._hooks_token is not None:
+            hooks = _commit_hooks.get()
+            _commit_hooks.reset(self._hooks_token)
+            if exc_type is None:
+                try:
+                    # Um callback pode registrar outros
+                    index = 0
+                    while index < len(hooks.callbacks):
+                        hooks.callbacks[index]()
+                        index += 1
+                except Exception as exc:
+                    self._atomic.__exit__(type(exc), exc, exc.__traceback__)
+                    raise
+        return self._atomic.__exit__(exc_type, exc_value, traceback)
+
+
+def _active_hooks(using=None):
+    hooks = _commit_hooks.get()
+    if hooks is not None and hooks.using == (using or tenant_database()):
+        return hooks
+    return None
+
+
+def before_commit(func, using=None):
+    """
+    Executa func no fim do tenant_atomic() mais externo em andamento, dentro da
+    transação (antes do commit; descartada se houver rollback). Fora de um
+    tenant_atomic(), executa na hora.
+    """
+    hooks = _active_hooks(using)
+    if hooks is None:
+        func()
+    else:
+        hooks.callbacks.append(func)
+
+
+def commit_scope(using=None):
+    """Dicionário associado ao tenant_atomic() mais externo em andamento, ou None fora dele."""
+    hooks = _active_hooks(using)
+    return hooks.data if hooks is not None else None
+
+
+class TenantAtomicWritesMixin:
+    """
+    Executa create/update/destroy de um ViewSet em tenant_atomic(): a escrita
+    e o que os signals gravam junto (saldos, log de alterações) entram na
+    mesma transação.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with tenant_atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with tenant_atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with tenant_atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+def fan_out(func, aliases=None):
+    """
+    Executa func(alias) em paralelo em cada shard e devolve {alias: resultado}.
+    Erros de um shard não derrubam os demais: o resultado vira {'error': ...}.
+    """
+    aliases = aliases or shard_aliases()
+
+    def run(alias):
+        try:
+            return func(alias)
+        except Exception as exc:
+            logger.exception('Falha ao consultar o shard %s', alias)
+            return {'error': str(exc)}
+        finally:
+            # Cada thread abre as próprias conexões
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+        return dict(zip(aliases, executor.map(run, aliases)))
+
+
+def _company_path(model, paths, company_model):
+    """Caminho de lookup do modelo até a empresa, direto ou por um pai já resolvido."""
+    relations = [
+        field for field in model._meta.concrete_fields
+        if field.is_relation and (field.many_to_one or field.one_to_one)
+    ]
+    for field in relations:
+        if field.related_model is company_model:
+            return field.name
+    for field in relations:
+        if field.related_model in paths and field.related_model is not model:
+            return f'{field.name}__{paths[field.related_model]}'
+    return None
+
+
+def company_scoped_models():
+    """
+    Modelos dos apps por empresa que chegam à empresa por alguma cadeia de FKs,
+    em ordem topológica (pais antes dos filhos): [(modelo, caminho_até_a_empresa)].
+    """
+    company_model = apps.get_model('accounts', 'Company')
+    candidates = [model for model in apps.get_models() if model._meta.app_label in get_sharding_setting('APPS')]
+
+    paths = {}
+    pending = list(candidates)
+    while pending:
+        resolved = [model for model in pending if _company_path(model, paths, company_model)]
+        if not resolved:
+            break
+        for model in resolved:
+            paths[model] = _company_path(model, paths, company_model)
+            pending.remove(model)
+
+    graph = {
+        model: {
+            field.related_model for field in model._meta.concrete_fields
+            if field.is_relation and field.related_model in paths and field.related_model is not model
+        }
+        for model in paths
+    }
+    return [(model, paths[model]) for model in TopologicalSorter(graph).static_order()]
+
+
+def replicate_instance(instance, target):
+    """Copia (upsert) uma linha do 'default' para o shard, mantendo a chave primária."""
+    fields = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields if not field.primary_key
+    }
+    instance.__class__._base_manager.using(target).update_or_create(pk=instance.pk, defaults=fields)
+
+
+def copy_directory_rows(company, target):
+    """Copia a empresa e seus usuários do 'default' para o shard."""
+    Company = apps.get_model('accounts', 'Company')
+    User = apps.get_model('accounts', 'User')
+
+    replicate_instance(Company._base_manager.using(DEFAULT_DB_ALIAS).get(pk=company.pk), target)
+    for user in User._base_manager.using(DEFAULT_DB_ALIAS).filter(company_id=company.pk):
+        replicate_instance(user, target)
+
+
+def _copy_model_rows(model, path, company_id, source, target, id_maps, chunk_size):
+    """
+    Copia as linhas do modelo em blocos. As chaves primárias são geradas de novo
+    no destino (cada shard tem as próprias sequences) e as FKs para modelos já
+    copiados são reescritas com id_maps.
+    """
+    remapped = [
+        field for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model in id_maps
+    ]
+    mapping = id_maps[model] = {}
+    queryset = model._base_manager.using(source).filter(**{path: company_id}).order_by('pk')
+
+    batch = []
+
+    def flush():
+        old_ids = [obj.pk for obj in batch]
+        for obj in batch:
+            obj.pk = None
+            obj._state.db = None
+        created = model._base_manager.using(target).bulk_create(batch)
+        mapping.update(zip(old_ids, (obj.pk for obj in created)))
+        batch.clear()
+
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        for field in remapped:
+            value = getattr(obj, field.attname)
+            if value is not None:
+                setattr(obj, field.attname, id_maps[field.related_model][value])
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            flush()
+    if batch:
+        flush()
+    return len(mapping)
+
+
+def move_company(company, target, chunk_size=MOVE_CHUNK_SIZE, keep_source=False, log=None):
+    """
+    Move os dados da empresa para o shard `target`:
+    1. marca a empresa como em migração (escritas bloqueadas na autenticação);
+    2. copia empresa e usuários e, em uma transação no destino, as linhas de
+       cada modelo em ordem topológica;
+    3. troca o mapeamento em CompanyShard;
+    4. remove as linhas da origem (filhos antes dos pais), salvo keep_source.
+    Retorna {modelo: linhas copiadas}.
+    """
+    from accounts.models import CompanyShard
+
+    log = log or (lambda message: None)
+    if target not in shard_aliases():
+        raise ValueError(f'Shard desconhecido: {target}')
+
+    mapping, _ = CompanyShard.objects.using(DEFAULT_DB_ALIAS).get_or_create(company=company)
+    source = mapping.database
+    if source == target:
+        raise ValueError(f'A empresa já está no shard {target}.')
+
+    CompanyShard.objects.using(DEFAULT_DB_ALIAS).filter(pk=mapping.pk).update(is_moving=True)
+    models = company_scoped_models()
+    copied = {}
+    try:
+        copy_directory_rows(company, target)
+        id_maps = {}
+        with transaction.atomic(using=target):
+            for model, path in models:
+                copied[model._meta.label] = _copy_model_rows(
+                    model, path, company.pk, source, target, id_maps, chunk_size
+                )
+                log(f'{model._meta.label}: {copied[model._meta.label]} linhas copiadas')
+    except Exception:
+        CompanyShard.objects.using(DEFAULT_DB_ALIAS).filter(pk=mapping.pk).update(is_moving=False)
+        raise
+
+    CompanyShard.objects.using(DEFAULT_DB_ALIAS).filter(pk=mapping.pk).update(database=target, is_moving=False)
+    log(f'Empresa {company.pk} agora está no shard {target}.')
+    company_moved.send(sender=None, company_id=company.pk, source=source, target=target)
+
+    if not keep_source:
+        with transaction.atomic(using=source):
+            for model, path in reversed(models):
+                # Exclusão direta em SQL: os signals (ex.: saldo das contas) não devem rodar na origem
+                queryset = model._base_manager.using(source).filter(**{path: company.pk})
+                deleted = queryset._raw_delete(source)
+                log(f'{model._meta.label}: {deleted} linhas removidas de {source}')
+    return copied
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from rest_framework import routers
 from django.urls import path, include
-from .views import home
+from .views import home, metrics
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -17,6 +17,7 @@ router.register(r'groups', GroupViewSet)
 urlpatterns = [
     path('', home, name='home'),
     path('admin/', admin.site.urls),
+    path('metrics/', metrics, name='metrics'),
     path('api/', include(router.urls)),
 
     path('api/accounts/', include('accounts.urls')),
@@ -1,4 +1,24 @@
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from jobs.metrics import render_prometheus as render_job_metrics
+from .instrumentation import get_setting, registry
 
 def home(request):
-    return JsonResponse({'message': 'Bem-vindo à API do FinançaPlus!'})
\ No newline at end of file
+    return JsonResponse({'message': 'Bem-vindo à API do FinançaPlus!'})
+
+def metrics(request):
+    """
+    Exporta os histogramas de instrumentação e o estado da fila de tarefas
+    no formato texto do Prometheus.
+    Exige o token configurado em INSTRUMENTATION['METRICS_TOKEN'];
+    sem token configurado, só responde com DEBUG ativo.
+    """
+    token = get_setting('METRICS_TOKEN')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=403)
+    elif not settings.DEBUG:
+        return HttpResponse(status=403)
+
+    return HttpResponse(registry.render_prometheus() + render_job_metrics(), content_type='text/plain; version=0.0.4')
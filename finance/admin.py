@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, BankAccount, Transaction, CreditCard, Payable, Receivable
+from .models import Category, BankAccount, Transaction, CreditCard, Payable, Receivable, CategorizationRule, CategoryStats
+from .models import Budget, BudgetConsumption
 
 admin.site.register(Category)
 admin.site.register(BankAccount)
@@ -7,3 +8,7 @@ admin.site.register(Transaction)
 admin.site.register(CreditCard)
 admin.site.register(Payable)
 admin.site.register(Receivable)
+admin.site.register(CategorizationRule)
+admin.site.register(CategoryStats)
+admin.site.register(Budget)
+admin.site.register(BudgetConsumption)
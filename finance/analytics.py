@@ -0,0 +1,410 @@
+"""
+Relatórios analíticos de contas a receber e a pagar.
+
+Os filtros da listagem (ReceivableViewSet) e do resumo são aplicados pela mesma
+função, e cada relatório sai de uma única agregação (condicional ou agrupada).
+"""
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from dateutil.relativedelta import relativedelta
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from cadastros.models import Customer
+from core.search import search_queryset
+from .models import BankAccount, Payable, Receivable, Transaction
+
+RECEIVABLE_OPEN_STATUSES = [Receivable.StatusChoices.PENDING, Receivable.StatusChoices.OVERDUE]
+PAYABLE_OPEN_STATUSES = ['pendente', 'vencido']
+
+FORECAST_HORIZONS = (30, 90, 365)
+FORECAST_GRANULARITIES = ('day', 'week', 'month')
+
+# (chave, rótulo, dias de atraso mínimo, dias de atraso máximo); None = sem limite
+AGING_BUCKETS = [
+    ('current', 'A vencer', None, 0),
+    ('1_30', '1–30 dias', 1, 30),
+    ('31_60', '31–60 dias', 31, 60),
+    ('61_90', '61–90 dias', 61, 90),
+    ('90_plus', 'Mais de 90 dias', 91, None),
+]
+
+
+def search_receivables(queryset, search, company, rank=False):
+    """
+    Busca contas a receber pela descrição ou pelo nome do cliente. O nome do
+    cliente é filtrado em uma subquery, para que os dois lados do OR usem índice.
+    """
+    def customer_match(word):
+        customers = search_queryset(Customer.objects.filter(company=company), word, ['name'])
+        return Q(customer_id__in=customers.values('id'))
+
+    return search_queryset(
+        queryset, search, ['description'], extra=customer_match,
+        rank=rank, rank_fields=['description', 'customer__name']
+    )
+
+
+def filter_receivables(queryset, params, company):
+    """
+    Aplica os filtros de query params das contas a receber:
+    period-filter (AAAA-MM), status, client_id e search.
+    """
+    period = params.get('period-filter')
+    if period:
+        try:
+            year, month = map(int, period.split('-'))
+            queryset = queryset.filter(due_date__year=year, due_date__month=month)
+        except (ValueError, TypeError):
+            # Ignora o filtro se o formato for inválido
+            pass
+
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+
+    customer_id = params.get('client_id')
+    if customer_id:
+        queryset = queryset.filter(customer_id=customer_id)
+
+    search = params.get('search')
+    if search:
+        queryset = search_receivables(queryset, search, company)
+
+    return queryset
+
+
+def aging_condition(today, min_days, max_days):
+    """Condição de due_date para um bucket de dias de atraso, relativa a hoje."""
+    condition = Q()
+    if min_days is not None:
+        condition &= Q(due_date__lte=today - timedelta(days=min_days))
+    if max_days is not None:
+        condition &= Q(due_date__gte=today - timedelta(days=max_days))
+    return condition
+
+
+def receivables_summary(queryset, today, top=5):
+    """
+    Calcula totais, quebra por status e aging das contas em aberto em uma única
+    query (agregação condicional), mais o ranking dos clientes com maior saldo
+    em aberto em uma segunda query agrupada.
+    """
+    open_filter = Q(status__in=RECEIVABLE_OPEN_STATUSES)
+
+    aggregates = {
+        'total_received': Sum('amount', filter=Q(status=Receivable.StatusChoices.RECEIVED)),
+        'total_to_receive': Sum('amount', filter=open_filter),
+    }
+    for value, _ in Receivable.StatusChoices.choices:
+        aggregates[f'status_{value}'] = Sum('amount', filter=Q(status=value))
+    for key, _, min_days, max_days in AGING_BUCKETS:
+        bucket_filter = open_filter & aging_condition(today, min_days, max_days)
+        aggregates[f'aging_{key}_total'] = Sum('amount', filter=bucket_filter)
+        aggregates[f'aging_{key}_count'] = Count('id', filter=bucket_filter)
+
+    totals = queryset.aggregate(**aggregates)
+
+    # Mesmo formato de antes: apenas os status presentes, em ordem alfabética
+    chart_data = {'labels': [], 'data': []}
+    for value, label in sorted(Receivable.StatusChoices.choices):
+        if totals[f'status_{value}'] is not None:
+            chart_data['labels'].append(label)
+            chart_data['data'].append(totals[f'status_{value}'])
+
+    aging = [
+        {
+            'bucket': key,
+            'label': label,
+            'total': totals[f'aging_{key}_total'] or Decimal('0.00'),
+            'count': totals[f'aging_{key}_count'],
+        }
+        for key, label, _, _ in AGING_BUCKETS
+    ]
+
+    top_customers = list(
+        queryset.filter(open_filter)
+        .order_by()
+        .values('customer_id', 'customer__name')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by('-total')[:top]
+    )
+
+    return {
+        'total_received': totals['total_received'] or Decimal('0.00'),
+        'total_to_receive': totals['total_to_receive'] or Decimal('0.00'),
+        'chart_data': chart_data,
+        'aging': aging,
+        'top_customers': [
+            {
+                'customer_id': item['customer_id'],
+                'customer_name': item['customer__name'],
+                'total': item['total'],
+                'count': item['count'],
+            }
+            for item in top_customers
+        ],
+    }
+
+
+def payables_aging(company, today):
+    """
+    Aging das contas a pagar em aberto (avulsas e parcelas de cartão) por dias
+    de atraso, em uma única agregação condicional.
+    """
+    queryset = Payable.objects.filter(company=company, status__in=PAYABLE_OPEN_STATUSES)
+    manual_filter = Q(transaction__isnull=True)
+
+    aggregates = {
+        'total_open': Sum('amount'),
+        'total_overdue': Sum('amount', filter=Q(due_date__lt=today)),
+        'manual_open': Sum('amount', filter=manual_filter),
+        'card_open': Sum('amount', filter=~manual_filter),
+    }
+    for key, _, min_days, max_days in AGING_BUCKETS:
+        bucket_filter = aging_condition(today, min_days, max_days)
+        aggregates[f'aging_{key}_total'] = Sum('amount', filter=bucket_filter)
+        aggregates[f'aging_{key}_count'] = Count('id', filter=bucket_filter)
+        aggregates[f'aging_{key}_card'] = Sum('amount', filter=bucket_filter & ~manual_filter)
+
+    totals = queryset.aggregate(**aggregates)
+
+    return {
+        'total_open': totals['total_open'] or Decimal('0.00'),
+        'total_overdue': totals['total_overdue'] or Decimal('0.00'),
+        'manual_open': totals['manual_open'] or Decimal('0.00'),
+        'card_open': totals['card_open'] or Decimal('0.00'),
+        'aging': [
+            {
+                'bucket': key,
+                'label': label,
+                'total': totals[f'aging_{key}_total'] or Decimal('0.00'),
+                'count': totals[f'aging_{key}_count'],
+                'card_total': totals[f'aging_{key}_card'] or Decimal('0.00'),
+            }
+            for key, label, _, _ in AGING_BUCKETS
+        ],
+    }
+
+
+def payables_commitments(company, today, months=12):
+    """
+    Compromissos futuros em aberto por mês de vencimento, a partir do mês
+    atual, agrupados por categoria e por cartão. Uma única query agrupada
+    (mês x categoria x cartão); a montagem das séries é feita em memória sobre
+    essas poucas linhas.
+    """
+    start = today.replace(day=1)
+    end = start + relativedelta(months=months)
+    month_keys = [(start + relativedelta(months=i)).strftime('%Y-%m') for i in range(months)]
+    position = {key: index for index, key in enumerate(month_keys)}
+
+    rows = (
+        Payable.objects.filter(
+            company=company,
+            status__in=PAYABLE_OPEN_STATUSES,
+            due_date__gte=start,
+            due_date__lt=end,
+        )
+        .annotate(month=TruncMonth('due_date'))
+        .order_by()
+        .values(
+            'month', 'category_id', 'category__name',
+            'transaction__credit_card_id', 'transaction__credit_card__name',
+        )
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+
+    total = [Decimal('0.00')] * months
+    manual = [Decimal('0.00')] * months
+    by_category = {}
+    by_card = {}
+
+    for row in rows:
+        index = position[row['month'].strftime('%Y-%m')]
+        amount = row['total']
+        total[index] += amount
+
+        category = by_category.setdefault(row['category_id'], {
+            'category_id': row['category_id'],
+            'category_name': row['category__name'] or 'Sem categoria',
+            'values': [Decimal('0.00')] * months,
+            'total': Decimal('0.00'),
+        })
+        category['values'][index] += amount
+        category['total'] += amount
+
+        card_id = row['transaction__credit_card_id']
+        if card_id is None:
+            manual[index] += amount
+            continue
+        card = by_card.setdefault(card_id, {
+            'card_id': card_id,
+            'card_name': row['transaction__credit_card__name'],
+            'values': [Decimal('0.00')] * months,
+            'total': Decimal('0.00'),
+        })
+        card['values'][index] += amount
+        card['total'] += amount
+
+    return {
+        'months': month_keys,
+        'total': total,
+        'manual': manual,
+        'by_category': sorted(by_category.values(), key=lambda item: item['total'], reverse=True),
+        'by_card': sorted(by_card.values(), key=lambda item: item['total'], reverse=True),
+    }
+
+
+def _forecast_day_flows(company, today, end):
+    """
+    Entradas e saídas previstas por dia (índice 0 = hoje) até `end`.
+    Itens vencidos e ainda em aberto entram no dia de hoje. Cada fonte é
+    agregada no banco, então o laço percorre grupos por dia, não itens.
+    """
+    days = (end - today).days + 1
+    inflow = [Decimal('0.00')] * days
+    outflow = [Decimal('0.00')] * days
+
+    def day_index(day):
+        return max((day - today).days, 0)
+
+    receivables = (
+        Receivable.objects.filter(company=company, status__in=RECEIVABLE_OPEN_STATUSES, due_date__lte=end)
+        .order_by().values('due_date').annotate(total=Sum('amount'))
+    )
+    for row in receivables:
+        inflow[day_index(row['due_date'])] += row['total']
+
+    manual_payables = (
+        Payable.objects.filter(
+            company=company, status__in=PAYABLE_OPEN_STATUSES, transaction__isnull=True, due_date__lte=end
+        )
+        .order_by().values('due_date').annotate(total=Sum('amount'))
+    )
+    for row in manual_payables:
+        outflow[day_index(row['due_date'])] += row['total']
+
+    # Parcelas de cartão saem da conta no vencimento da fatura do mês
+    card_installments = (
+        Payable.objects.filter(
+            company=company, status__in=PAYABLE_OPEN_STATUSES, transaction__isnull=False,
+            due_date__lt=end.replace(day=1) + relativedelta(months=1)
+        )
+        .annotate(month=TruncMonth('due_date'))
+        .order_by().values('month', 'transaction__credit_card__due_day').annotate(total=Sum('amount'))
+    )
+    for row in card_installments:
+        month = row['month']
+        due_day = min(row['transaction__credit_card__due_day'] or 1, calendar.monthrange(month.year, month.month)[1])
+        bill_date = month.replace(day=due_day)
+        if bill_date <= end:
+            outflow[day_index(bill_date)] += row['total']
+
+    return inflow, outflow
+
+
+def _forecast_period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def cash_flow_forecast(company, today, horizon_days=90, granularity='day'):
+    """
+    Projeção do saldo a partir do saldo atual das contas ativas, aplicando as
+    contas a pagar e a receber em aberto pela data de vencimento.
+    O saldo diário é a soma acumulada (accumulate) do fluxo líquido por dia;
+    as séries semanais/mensais resumem esse saldo diário.
+    """
+    start_balance = BankAccount.objects.filter(company=company, is_active=True).aggregate(
+        total=Sum('initial_balance')
+    )['total'] or Decimal('0.00')
+
+    end = today + timedelta(days=horizon_days)
+    inflow, outflow = _forecast_day_flows(company, today, end)
+    net = [incoming - outgoing for incoming, outgoing in zip(inflow, outflow)]
+    balances = list(accumulate(net, initial=start_balance))[1:]
+    dates = [today + timedelta(days=i) for i in range(len(balances))]
+
+    series = []
+    current = None
+    for day, incoming, outgoing, balance in zip(dates, inflow, outflow, balances):
+        period = _forecast_period_start(day, granularity)
+        if current is None or current['date'] != period:
+            current = {
+                'date': period,
+                'inflow': Decimal('0.00'),
+                'outflow': Decimal('0.00'),
+                'balance': balance,
+                'min_balance': balance,
+            }
+            series.append(current)
+        current['inflow'] += incoming
+        current['outflow'] += outgoing
+        current['balance'] = balance
+        current['min_balance'] = min(current['min_balance'], balance)
+
+    for item in series:
+        item['negative'] = item['min_balance'] < 0
+
+    negative_days = [day for day, balance in zip(dates, balances) if balance < 0]
+
+    return {
+        'start_balance': start_balance,
+        'end_balance': balances[-1],
+        'horizon_days': horizon_days,
+        'granularity': granularity,
+        'total_inflow': sum(inflow, Decimal('0.00')),
+        'total_outflow': sum(outflow, Decimal('0.00')),
+        'min_balance': min(balances),
+        'first_negative_date': negative_days[0] if negative_days else None,
+        'negative_days': negative_days,
+        'series': series,
+    }
+
+
+def tenant_activity(database):
+    """
+    Resumo por empresa de um banco (shard): transações, última movimentação e
+    totais em aberto. Usado na visão administrativa, que consulta os shards em paralelo.
+    """
+    summary = {}
+
+    def entry(company_id):
+        return summary.setdefault(company_id, {
+            'transactions': 0,
+            'last_transaction_date': None,
+            'open_payables': Decimal('0.00'),
+            'open_receivables': Decimal('0.00'),
+        })
+
+    transactions = (
+        Transaction.objects.using(database).order_by().values('company_id')
+        .annotate(count=Count('id'), last_date=Max('transaction_date'))
+    )
+    for row in transactions:
+        item = entry(row['company_id'])
+        item['transactions'] = row['count']
+        item['last_transaction_date'] = row['last_date']
+
+    payables = (
+        Payable.objects.using(database).filter(status__in=PAYABLE_OPEN_STATUSES)
+        .order_by().values('company_id').annotate(total=Sum('amount'))
+    )
+    for row in payables:
+        entry(row['company_id'])['open_payables'] = row['total']
+
+    receivables = (
+        Receivable.objects.using(database).filter(status__in=RECEIVABLE_OPEN_STATUSES)
+        .order_by().values('company_id').annotate(total=Sum('amount'))
+    )
+    for row in receivables:
+        entry(row['company_id'])['open_receivables'] = row['total']
+
+    return summary
@@ -0,0 +1,258 @@
+"""
+Orçamentos por categoria (semanais ou mensais) e o consumo de cada período.
+
+O gasto do período fica em BudgetConsumption e é mantido incrementalmente: a
+cada transação de saída criada, alterada ou excluída, apply_budget_deltas()
+soma a diferença às linhas dos orçamentos afetados (signals para as escritas
+avulsas, finance/bulk.py para os lotes). O resumo orçado x realizado só lê
+essas linhas; a soma das transações só é feita uma vez por orçamento e
+período, quando a linha ainda não existe.
+
+Ainda na escrita, o percentual consumido é comparado com o último nível
+avisado (o alert_threshold do orçamento e 100%). Quando o nível sobe no
+período atual, depois do commit sai um evento em tempo real 'budget_alert'
+(core.events) e a tarefa 'finance.budget_alerts' manda e-mail aos usuários
+com notify_weekly_goals. rebuild_budget_consumption recalcula tudo a partir
+das transações.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from core.events import publish
+from core.sharding import tenant_database
+from jobs.queue import enqueue
+from .models import Budget, BudgetConsumption, Transaction
+
+ALERT_TASK = 'finance.budget_alerts'
+
+WEEKLY = Budget.PeriodChoices.WEEKLY
+MONTHLY = Budget.PeriodChoices.MONTHLY
+
+# Só as saídas consomem orçamento
+SPENDING_TYPE = 'saida'
+
+
+def period_start(period, day):
+    """Início do período que contém o dia: a segunda-feira ou o dia 1º."""
+    if period == WEEKLY:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def period_end(period, start):
+    if period == WEEKLY:
+        return start + timedelta(days=6)
+    return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+
+
+def add_spending(deltas, category_id, transaction_type, transaction_date, amount, sign=1):
+    """Acumula em deltas[(categoria, dia)] o efeito de uma transação no consumo (sign=-1 desfaz)."""
+    if transaction_type != SPENDING_TYPE or not category_id or not amount or not transaction_date:
+        return
+    if isinstance(transaction_date, str):
+        transaction_date = date.fromisoformat(transaction_date)
+    deltas[(category_id, transaction_date)] += sign * Decimal(amount)
+
+
+def transaction_spending(transactions, sign=1, deltas=None):
+    """deltas de add_spending para várias transações."""
+    deltas = defaultdict(Decimal) if deltas is None else deltas
+    for item in transactions:
+        add_spending(deltas, item.category_id, item.type, item.transaction_date, item.amount, sign)
+    return deltas
+
+
+def alert_level(budget, spent):
+    """0, o alert_threshold do orçamento ou 100, conforme o percentual consumido."""
+    percent = spent * 100 / budget.amount if budget.amount else Decimal('0')
+    if percent >= 100:
+        return 100
+    if percent >= budget.alert_threshold:
+        return budget.alert_threshold
+    return 0
+
+
+def compute_spent(company_id, keys):
+    """
+    Gasto atual somado das transações para cada (orçamento, início do período),
+    com uma consulta agrupada por categoria para cada período distinto.
+    """
+    by_period = defaultdict(list)
+    for budget, start in keys:
+        by_period[(budget.period, start)].append(budget)
+
+    spent = {}
+    for (period, start), budgets in by_period.items():
+        totals = dict(
+            Transaction.objects.filter(
+                company_id=company_id, type=SPENDING_TYPE,
+                category_id__in={budget.category_id for budget in budgets},
+                transaction_date__range=(start, period_end(period, start)),
+            )
+            .order_by()
+            .values('category_id')
+            .annotate(total=Sum('amount'))
+            .values_list('category_id', 'total')
+        )
+        for budget in budgets:
+            spent[(budget.pk, start)] = totals.get(budget.category_id) or Decimal('0')
+    return spent
+
+
+def apply_budget_deltas(company_id, deltas):
+    """
+    Aplica ao consumo dos orçamentos ativos as diferenças de gasto
+    {(categoria, dia): valor} de transações já gravadas e agenda os avisos dos
+    que mudaram de nível. Retorna as linhas de BudgetConsumption alteradas.
+    """
+    deltas = {key: amount for key, amount in deltas.items() if amount}
+    if not company_id or not deltas:
+        return []
+    budgets = list(Budget.objects.filter(
+        company_id=company_id, is_active=True, category_id__in={category_id for category_id, _ in deltas},
+    ))
+    if not budgets:
+        return []
+
+    changes = defaultdict(Decimal)
+    for budget in budgets:
+        for (category_id, day), amount in deltas.items():
+            if category_id == budget.category_id:
+                changes[(budget, period_start(budget.period, day))] += amount
+    budgets_by_id = {budget.pk: budget for budget in budgets}
+
+    using = tenant_database()
+    today = timezone.localdate()
+    alerts = []
+    with transaction.atomic(using=using):
+        keys = {(budget.pk, start): amount for (budget, start), amount in changes.items()}
+        lookup = {'budget_id__in': list(budgets_by_id), 'period_start__in': {start for _, start in keys}}
+        existing = set(BudgetConsumption.objects.filter(**lookup).values_list('budget_id', 'period_start'))
+        missing = [(budget, start) for budget, start in changes if (budget.pk, start) not in existing]
+        if missing:
+            # Primeira escrita do período: cria a linha com o gasto de antes desta escrita (a soma
+            # das transações já a inclui). Se outra requisição criar a mesma linha ao mesmo tempo,
+            # fica a dela e a diferença desta é somada a ela abaixo, depois do lock
+            created = []
+            for (budget_id, start), spent in compute_spent(company_id, missing).items():
+                before = spent - keys[(budget_id, start)]
+                created.append(BudgetConsumption(
+                    budget_id=budget_id, period_start=start, spent=before,
+                    notified_level=alert_level(budgets_by_id[budget_id], before),
+                ))
+            BudgetConsumption.objects.bulk_create(created, ignore_conflicts=True)
+
+        # Trava as linhas até o commit para escritas simultâneas não perderem somas
+        rows = list(BudgetConsumption.objects.select_for_update().filter(**lookup))
+        changed = []
+        now = timezone.now()
+        for row in rows:
+            amount = keys.get((row.budget_id, row.period_start))
+            if amount is None:
+                continue
+            budget = budgets_by_id[row.budget_id]
+            row.spent += amount
+            level = alert_level(budget, row.spent)
+            if level > row.notified_level and period_end(budget.period, row.period_start) >= today:
+                alerts.append([budget.pk, row.period_start.isoformat(), level])
+            # Se o gasto cair, o nível também cai e o aviso pode sair de novo
+            row.notified_level = level
+            row.updated_at = now
+            changed.append(row)
+        BudgetConsumption.objects.bulk_update(changed, ['spent', 'notified_level', 'updated_at'])
+
+        if alerts:
+            transaction.on_commit(partial(_emit_alerts, company_id, alerts), using=using)
+    return changed
+
+
+def _emit_alerts(company_id, alerts):
+    publish(company_id, 'budget_alert', {'ids': [budget_id for budget_id, _, _ in alerts]})
+    enqueue(ALERT_TASK, {'company_id': company_id, 'alerts': alerts}, company=company_id)
+
+
+def consumptions_for(company_id, budgets, day):
+    """
+    {orçamento: BudgetConsumption} do período que contém o dia. As linhas que
+    faltarem são calculadas uma vez e gravadas (sem aviso: não houve escrita).
+    """
+    keys = [(budget, period_start(budget.period, day)) for budget in budgets]
+    rows = {
+        (row.budget_id, row.period_start): row
+        for row in BudgetConsumption.objects.filter(
+            budget_id__in=[budget.pk for budget, _ in keys], period_start__in={start for _, start in keys},
+        )
+    }
+    missing = [(budget, start) for budget, start in keys if (budget.pk, start) not in rows]
+    if missing:
+        budgets_by_id = {budget.pk: budget for budget, _ in missing}
+        created = [
+            BudgetConsumption(
+                budget_id=budget_id, period_start=start, spent=spent,
+                notified_level=alert_level(budgets_by_id[budget_id], spent),
+            )
+            for (budget_id, start), spent in compute_spent(company_id, missing).items()
+        ]
+        with transaction.atomic(using=tenant_database()):
+            BudgetConsumption.objects.bulk_create(created, ignore_conflicts=True)
+        rows.update({(row.budget_id, row.period_start): row for row in created})
+    return {budget: rows[(budget.pk, start)] for budget, start in keys}
+
+
+def budget_status(budget, spent):
+    level = alert_level(budget, spent)
+    if level >= 100:
+        return 'estourado'
+    return 'alerta' if level else 'ok'
+
+
+def budgets_summary(company_id, day):
+    """Orçado x realizado de cada orçamento ativo no período que contém o dia."""
+    budgets = list(
+        Budget.objects.filter(company_id=company_id, is_active=True)
+        .select_related('category').order_by('category__name', 'period')
+    )
+    consumptions = consumptions_for(company_id, budgets, day)
+    results = []
+    for budget in budgets:
+        row = consumptions[budget]
+        spent = row.spent
+        results.append({
+            'id': budget.pk,
+            'category': budget.category_id,
+            'category_name': budget.category.name,
+            'period': budget.period,
+            'period_start': row.period_start,
+            'period_end': period_end(budget.period, row.period_start),
+            'amount': budget.amount,
+            'spent': spent,
+            'remaining': budget.amount - spent,
+            'percent': round(spent * 100 / budget.amount, 1) if budget.amount else None,
+            'alert_threshold': budget.alert_threshold,
+            'status': budget_status(budget, spent),
+        })
+    return {
+        'date': day,
+        'budgets': results,
+        'total_amount': sum((item['amount'] for item in results), Decimal('0')),
+        'total_spent': sum((item['spent'] for item in results), Decimal('0')),
+    }
+
+
+def rebuild_consumption(company_id):
+    """Recalcula a partir das transações o consumo dos orçamentos da empresa nos períodos que já tinham linha."""
+    rows = list(BudgetConsumption.objects.filter(budget__company_id=company_id).select_related('budget'))
+    spent = compute_spent(company_id, [(row.budget, row.period_start) for row in rows])
+    for row in rows:
+        row.spent = spent[(row.budget_id, row.period_start)]
+        row.notified_level = alert_level(row.budget, row.spent)
+    with transaction.atomic(using=tenant_database()):
+        BudgetConsumption.objects.bulk_update(rows, ['spent', 'notified_level'], batch_size=1000)
+    return len(rows)
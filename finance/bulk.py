@@ -0,0 +1,333 @@
+"""
+Operações em lote sobre transações, contas a pagar e contas a receber.
+
+Cada lote valida tudo de uma vez (uma consulta por tipo de referência e uma
+para as transações existentes), grava com bulk_create/bulk_update/DELETE por
+conjunto dentro de uma única transação e ajusta o saldo de cada conta
+bancária afetada com um único UPDATE (F()), em vez de um signal por linha.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.sharding import tenant_atomic
+from .categorization import categorize_transactions
+from .changelog import ENTITY_BY_MODEL, record_changes
+from .outliers import observe_transactions
+from .budgets import apply_budget_deltas, transaction_spending
+from .ledger import apply_open_balance_deltas
+from .fingerprints import existing_fingerprints, fingerprint_for
+from .models import BankAccount, Category, CreditCard, Payable, Receivable, Transaction
+from .serializers import BulkSettlementSerializer, BulkTransactionItemSerializer
+from .signals import suppress_balance_signals
+
+MAX_BULK_OPERATIONS = 1000
+
+TRANSACTION_FIELDS = [
+    'description', 'amount', 'transaction_date', 'type', 'category', 'notes', 'bank_account', 'credit_card',
+]
+# Campos de FK recebidos como id
+REFERENCE_FIELDS = {
+    'category': Category,
+    'bank_account': BankAccount,
+    'credit_card': CreditCard,
+}
+
+
+class BulkValidationError(Exception):
+    """Erros por operação: {'create': {índice: erros}, 'update': {...}, 'delete': {...}}."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def balance_effect(transaction_type, amount):
+    """Efeito da transação no saldo da conta: entrada soma, saída subtrai."""
+    return amount if transaction_type == 'entrada' else -amount
+
+
+def apply_balance_deltas(deltas):
+    """Aplica {conta_id: variação} com um UPDATE por conta (em ordem de id, evitando deadlocks)."""
+    changed = []
+    for account_id in sorted(account_id for account_id in deltas if account_id):
+        delta = deltas[account_id]
+        if delta:
+            BankAccount.objects.filter(pk=account_id).update(initial_balance=F('initial_balance') + delta)
+            changed.append(account_id)
+    return changed
+
+
+def load_reference_ids(company):
+    """Ids de categorias, contas e cartões da empresa, em uma consulta por tipo."""
+    return {
+        field: set(model.objects.filter(company=company).values_list('id', flat=True))
+        for field, model in REFERENCE_FIELDS.items()
+    }
+
+
+def _validate_item(data, references, partial=False, instance=None):
+    serializer = BulkTransactionItemSerializer(data=data, partial=partial)
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    values = serializer.validated_data
+    errors = {}
+    for field in REFERENCE_FIELDS:
+        value = values.get(field)
+        if value is not None and value not in references[field]:
+            errors[field] = ['Registro não encontrado.']
+
+    bank_account = values['bank_account'] if 'bank_account' in values else getattr(instance, 'bank_account_id', None)
+    credit_card = values['credit_card'] if 'credit_card' in values else getattr(instance, 'credit_card_id', None)
+    if not bank_account and not credit_card:
+        errors['non_field_errors'] = ['É necessário fornecer uma conta bancária ou um cartão de crédito.']
+    return values, errors
+
+
+def _assign(transaction, values):
+    for field, value in values.items():
+        if field == 'id':
+            continue
+        if field in REFERENCE_FIELDS:
+            setattr(transaction, f'{field}_id', value)
+        else:
+            setattr(transaction, field, value)
+
+
+def _check_duplicates(company, new_transactions, errors):
+    """
+    Marca como erro as criações iguais a uma transação já existente (uma
+    consulta IN pelo índice de fingerprint) ou a outra criação do mesmo lote.
+    """
+    existing = existing_fingerprints(company, [transaction.fingerprint for _, transaction in new_transactions])
+    seen = set()
+    for index, transaction in new_transactions:
+        if transaction.fingerprint in existing or transaction.fingerprint in seen:
+            errors['create'][index] = {'non_field_errors': ['Transação duplicada.']}
+        seen.add(transaction.fingerprint)
+
+
+def apply_transaction_batch(company, user, create=(), update=(), delete=(), allow_duplicates=False):
+    """
+    Valida e aplica um lote de criações, alterações (parciais, por id) e
+    exclusões. Nada é gravado se alguma operação for inválida; criações
+    duplicadas só passam com allow_duplicates.
+    Retorna {'created': [ids], 'updated': [ids], 'deleted': [ids]}.
+    """
+    references = load_reference_ids(company)
+    errors = {'create': {}, 'update': {}, 'delete': {}}
+
+    update_ids = [item.get('id') for item in update]
+    existing = Transaction.objects.filter(company=company).in_bulk(
+        [pk for pk in update_ids + list(delete) if isinstance(pk, int)]
+    )
+
+    new_transactions = []
+    for index, data in enumerate(create):
+        values, item_errors = _validate_item(data, references)
+        if item_errors:
+            errors['create'][index] = item_errors
+            continue
+        transaction = Transaction(company=company, user=user)
+        _assign(transaction, values)
+        # bulk_create não dispara o pre_save que calcula o fingerprint
+        transaction.fingerprint = fingerprint_for(transaction)
+        new_transactions.append((index, transaction))
+    if not allow_duplicates:
+        _check_duplicates(company, new_transactions, errors)
+    new_transactions = [transaction for _, transaction in new_transactions]
+    # bulk_create também não passa pela categorização automática do pre_save
+    categorize_transactions(company, new_transactions)
+
+    changed = []
+    changed_fields = set()
+    deltas = defaultdict(Decimal)
+    spending = defaultdict(Decimal)
+    seen = set()
+    for index, data in enumerate(update):
+        pk = data.get('id')
+        transaction = existing.get(pk)
+        if transaction is None:
+            errors['update'][index] = {'id': ['Transação não encontrada.']}
+            continue
+        if pk in seen or pk in delete:
+            errors['update'][index] = {'id': ['Transação repetida no lote.']}
+            continue
+        seen.add(pk)
+        values, item_errors = _validate_item(data, references, partial=True, instance=transaction)
+        if item_errors:
+            errors['update'][index] = item_errors
+            continue
+        deltas[transaction.bank_account_id] -= balance_effect(transaction.type, transaction.amount)
+        transaction_spending([transaction], sign=-1, deltas=spending)
+        _assign(transaction, values)
+        transaction.fingerprint = fingerprint_for(transaction)
+        deltas[transaction.bank_account_id] += balance_effect(transaction.type, transaction.amount)
+        transaction_spending([transaction], deltas=spending)
+        changed_fields.update(field for field in values if field != 'id')
+        changed_fields.add('fingerprint')
+        changed.append(transaction)
+
+    removed = []
+    seen_deleted = set()
+    for index, pk in enumerate(delete):
+        transaction = existing.get(pk)
+        if transaction is None:
+            errors['delete'][index] = {'id': ['Transação não encontrada.']}
+            continue
+        if pk in seen_deleted:
+            errors['delete'][index] = {'id': ['Transação repetida no lote.']}
+            continue
+        seen_deleted.add(pk)
+        deltas[transaction.bank_account_id] -= balance_effect(transaction.type, transaction.amount)
+        transaction_spending([transaction], sign=-1, deltas=spending)
+        removed.append(transaction)
+
+    if any(errors.values()):
+        raise BulkValidationError({key: value for key, value in errors.items() if value})
+
+    for transaction in new_transactions:
+        deltas[transaction.bank_account_id] += balance_effect(transaction.type, transaction.amount)
+
+    with tenant_atomic(), suppress_balance_signals():
+        created = Transaction.objects.bulk_create(new_transactions)
+        if changed:
+            Transaction.objects.bulk_update(changed, sorted(changed_fields))
+        if removed:
+            # O collector apaga em conjunto (DELETE ... WHERE id IN) e segue os CASCADEs (parcelas)
+            Transaction.objects.filter(pk__in=[transaction.pk for transaction in removed]).delete()
+        # bulk_create/bulk_update não disparam os signals do log de alterações (a exclusão, sim)
+        record_changes(company.pk, 'transaction', [transaction.pk for transaction in created + changed])
+        record_changes(company.pk, 'bank_account', apply_balance_deltas(deltas))
+        # Nem o detector de valores fora do padrão (post_save) e o consumo dos orçamentos
+        observe_transactions(company.pk, created)
+        apply_budget_deltas(company.pk, transaction_spending(created, deltas=spending))
+
+    return {
+        'created': [transaction.pk for transaction in created],
+        'updated': [transaction.pk for transaction in changed],
+        'deleted': [transaction.pk for transaction in removed],
+    }
+
+
+# (status em aberto, status de baixa, tipo da transação gerada, prefixo da descrição)
+SETTLEMENT_RULES = {
+    Payable: (['pendente', 'vencido'], 'pago', 'saida', 'Pagamento'),
+    Receivable: (
+        [Receivable.StatusChoices.PENDING, Receivable.StatusChoices.OVERDUE],
+        Receivable.StatusChoices.RECEIVED, 'entrada', 'Recebimento',
+    ),
+}
+
+
+def settle_items(model, company, user, items):
+    """
+    Baixa (paga ou recebe) várias contas de uma vez. Os itens já vêm com
+    payment_date e bank_account_id resolvidos (BulkSettlementSerializer).
+
+    - uma consulta para as contas bancárias e outra (com lock) para os itens;
+    - um UPDATE por grupo de (data, conta) em vez de um save() por item;
+    - as transações de saída/entrada são criadas com bulk_create;
+    - o saldo de cada conta bancária é ajustado uma única vez.
+    Retorna {'settled': [ids], 'transactions': [ids]}.
+    """
+    open_statuses, settled_status, transaction_type, prefix = SETTLEMENT_RULES[model]
+    account_ids = set(BankAccount.objects.filter(company=company).values_list('id', flat=True))
+    errors = {}
+
+    with tenant_atomic():
+        records = model.objects.select_for_update().filter(
+            company=company, pk__in=[item['id'] for item in items]
+        ).in_bulk()
+
+        groups = defaultdict(list)
+        transactions = []
+        deltas = defaultdict(Decimal)
+        open_deltas = defaultdict(Decimal)
+        seen = set()
+        for index, item in enumerate(items):
+            record = records.get(item['id'])
+            if record is None:
+                errors[index] = {'id': ['Registro não encontrado.']}
+                continue
+            if item['id'] in seen:
+                errors[index] = {'id': ['Registro repetido no lote.']}
+                continue
+            seen.add(item['id'])
+            if record.status not in open_statuses:
+                errors[index] = {'id': ['Este registro já foi baixado.']}
+                continue
+            if item['bank_account_id'] not in account_ids:
+                errors[index] = {'bank_account_id': ['Conta bancária não encontrada.']}
+                continue
+            # Baixa parcial não é permitida por enquanto
+            amount = item.get('amount', record.amount)
+            if amount != record.amount:
+                errors[index] = {'amount': ['O valor deve ser igual ao valor da conta.']}
+                continue
+
+            groups[(item['payment_date'], item['bank_account_id'])].append(record.pk)
+            transactions.append(Transaction(
+                company=company,
+                user=user,
+                description=f"{prefix}: {record.description}",
+                amount=amount,
+                transaction_date=item['payment_date'],
+                type=transaction_type,
+                category_id=getattr(record, 'category_id', None),
+                bank_account_id=item['bank_account_id'],
+            ))
+            deltas[item['bank_account_id']] += balance_effect(transaction_type, amount)
+            if model is Receivable:
+                open_deltas[record.customer_id] -= amount
+
+        if errors:
+            raise BulkValidationError({'items': errors})
+
+        for (payment_date, account_id), ids in groups.items():
+            values = {'status': settled_status, 'payment_date': payment_date}
+            if model is Payable:
+                values['paid_from_account_id'] = account_id
+            model.objects.filter(pk__in=ids, status__in=open_statuses).update(**values)
+
+        for transaction in transactions:
+            transaction.fingerprint = fingerprint_for(transaction)
+        categorize_transactions(company, transactions)
+        created = Transaction.objects.bulk_create(transactions)
+        record_changes(company.pk, ENTITY_BY_MODEL[model._meta.label], [pk for ids in groups.values() for pk in ids])
+        record_changes(company.pk, 'transaction', [transaction.pk for transaction in created])
+        record_changes(company.pk, 'bank_account', apply_balance_deltas(deltas))
+        observe_transactions(company.pk, created)
+        apply_budget_deltas(company.pk, transaction_spending(created))
+        # O UPDATE por grupo não passa pelos signals do saldo em aberto dos clientes
+        apply_open_balance_deltas(company.pk, open_deltas)
+
+    return {
+        'settled': [pk for ids in groups.values() for pk in ids],
+        'transactions': [transaction.pk for transaction in created],
+    }
+
+
+class SettlementMixin:
+    """
+    Adiciona a rota <lista>/settle/ (POST) a um ViewSet de contas a pagar ou a receber.
+    Corpo: {"payment_date": "AAAA-MM-DD", "bank_account_id": 1, "items": [{"id": 10}, ...]}
+    """
+    settlement_model = None
+
+    @action(detail=False, methods=['post'], url_path='settle')
+    def settle(self, request, *args, **kwargs):
+        serializer = BulkSettlementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = settle_items(
+                self.settlement_model, request.user.company, request.user, serializer.validated_data['items']
+            )
+        except BulkValidationError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
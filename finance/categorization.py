@@ -0,0 +1,208 @@
+"""
+Categorização automática de transações por regras (CategorizationRule).
+
+As regras ativas da empresa são compiladas em um RuleMatcher: os padrões do
+tipo 'contém' viram um único autômato Aho-Corasick, então uma passada pela
+descrição encontra todos eles, qualquer que seja o número de regras; as
+expressões regulares são compiladas uma vez. Entre as regras encontradas
+vale a de menor prioridade cujos filtros (tipo, valor, conta, cartão) aceitem
+a transação.
+
+O matcher fica em cache por empresa no processo. A versão das regras
+(quantidade e última alteração) é lida do banco a cada uso, então uma regra
+criada, alterada ou excluída em qualquer processo invalida o matcher nos
+demais; os signals de CategorizationRule só descartam a cópia local na hora.
+"""
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import Count, Max
+
+from core.search import normalize_text
+from .models import CategorizationRule
+
+MAX_CACHED_MATCHERS = 256
+
+_matchers = {}
+_lock = threading.Lock()
+
+
+def normalize_description(value):
+    """Sem acentos, minúsculas e espaços colapsados ('  Pão  de Açúcar' -> 'pao de acucar')."""
+    return ' '.join((normalize_text(value) or '').split())
+
+
+class AhoCorasick:
+    """Autômato de Aho-Corasick: encontra todos os padrões presentes em um texto em O(len(texto))."""
+
+    def __init__(self, patterns):
+        # patterns: [(texto, valor)]
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for pattern, value in patterns:
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                node = next_node
+            self._output[node] += (value,)
+
+        # Ligações de falha em largura; a saída de cada nó inclui a do nó de falha
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+
+    def search(self, text):
+        """Valores de todos os padrões que ocorrem no texto."""
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+@dataclass
+class CompiledRule:
+    category_id: int
+    regex: object
+    transaction_type: str
+    min_amount: Decimal
+    max_amount: Decimal
+    bank_account_id: int
+    credit_card_id: int
+
+    def accepts(self, description, amount, transaction_type, bank_account_id, credit_card_id):
+        if self.transaction_type and transaction_type != self.transaction_type:
+            return False
+        if self.min_amount is not None and (amount is None or amount < self.min_amount):
+            return False
+        if self.max_amount is not None and (amount is None or amount > self.max_amount):
+            return False
+        if self.bank_account_id and bank_account_id != self.bank_account_id:
+            return False
+        if self.credit_card_id and credit_card_id != self.credit_card_id:
+            return False
+        if self.regex is not None and not self.regex.search(description or ''):
+            return False
+        return True
+
+
+class RuleMatcher:
+    """Regras de uma empresa compiladas, na ordem de prioridade."""
+
+    def __init__(self, rules):
+        self.rules = []
+        patterns = []
+        # Regras sem padrão 'contém' (regex ou só filtros) são avaliadas sempre
+        self._always = []
+        for index, rule in enumerate(rules):
+            regex = None
+            if rule.match_type == CategorizationRule.MatchTypeChoices.REGEX and rule.pattern:
+                regex = re.compile(rule.pattern, re.IGNORECASE)
+            self.rules.append(CompiledRule(
+                rule.category_id, regex, rule.transaction_type, rule.min_amount, rule.max_amount,
+                rule.bank_account_id, rule.credit_card_id,
+            ))
+            pattern = normalize_description(rule.pattern) if regex is None else ''
+            if pattern:
+                patterns.append((pattern, index))
+            else:
+                self._always.append(index)
+        self._automaton = AhoCorasick(patterns) if patterns else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def categorize(self, description, amount, transaction_type, bank_account_id=None, credit_card_id=None):
+        """Id da categoria da primeira regra (por prioridade) que casa, ou None."""
+        if not self.rules:
+            return None
+        candidates = set(self._always)
+        if self._automaton is not None:
+            candidates |= self._automaton.search(normalize_description(description))
+        for index in sorted(candidates):
+            rule = self.rules[index]
+            if rule.accepts(description, amount, transaction_type, bank_account_id, credit_card_id):
+                return rule.category_id
+        return None
+
+    def categorize_transaction(self, transaction):
+        return self.categorize(
+            transaction.description, transaction.amount, transaction.type,
+            transaction.bank_account_id, transaction.credit_card_id,
+        )
+
+
+def rules_version(company_id):
+    """
+    (quantidade, última alteração) das regras da empresa, ativas ou não. Criar
+    ou alterar uma regra muda a data; excluir muda a quantidade.
+    """
+    state = CategorizationRule.objects.filter(company_id=company_id).aggregate(
+        total=Count('id'), changed=Max('updated_at'),
+    )
+    return state['total'], state['changed']
+
+
+def invalidate_rules(company_id):
+    """Chamado pelos signals de CategorizationRule quando as regras mudam."""
+    with _lock:
+        _matchers.pop(company_id, None)
+
+
+def get_matcher(company):
+    """Matcher das regras ativas da empresa, compilado uma vez por versão das regras."""
+    company_id = getattr(company, 'pk', company)
+    version = rules_version(company_id)
+    cached = _matchers.get(company_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    matcher = RuleMatcher(
+        CategorizationRule.objects.filter(company_id=company_id, is_active=True).order_by('priority', 'id')
+    )
+    with _lock:
+        if len(_matchers) >= MAX_CACHED_MATCHERS:
+            # Descarta o mais antigo (dicts preservam a ordem de inserção)
+            _matchers.pop(next(iter(_matchers)), None)
+        _matchers[company_id] = (version, matcher)
+    return matcher
+
+
+def categorize_transactions(company, transactions):
+    """Preenche a categoria das transações (ainda não salvas) que estão sem. Retorna quantas foram categorizadas."""
+    pending = [transaction for transaction in transactions if transaction.category_id is None]
+    if not pending:
+        return 0
+    matcher = get_matcher(company)
+    if not matcher:
+        return 0
+    categorized = 0
+    for transaction in pending:
+        category_id = matcher.categorize_transaction(transaction)
+        if category_id is not None:
+            transaction.category_id = category_id
+            categorized += 1
+    return categorized
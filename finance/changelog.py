@@ -0,0 +1,241 @@
+"""
+Log de alterações por empresa para sincronização incremental (delta sync).
+
+Cada criação, alteração ou exclusão dos registros em ENTITIES gera uma
+entrada (entidade, id, operação, versão). A versão é um contador por empresa
+(ChangeFeed.version) incrementado com a linha bloqueada até o commit, então
+as versões de uma empresa ficam visíveis na mesma ordem em que foram geradas
+e um cursor nunca "pula" uma alteração ainda não confirmada.
+
+As entradas são gravadas na mesma transação da escrita: dentro de um
+tenant_atomic() elas se acumulam (a última operação de cada registro vence)
+e são gravadas de uma vez no fim do bloco, o que mantém o contador bloqueado
+só durante o commit; fora dele, são gravadas na hora.
+
+Compactação (enfileirada a cada COMPACT_EVERY versões, ou pelo comando
+compact_changelog): entradas substituídas por outra mais nova do mesmo
+registro são removidas sem afetar nenhum cursor; entradas mais antigas que
+RETENTION_DAYS (incluindo as exclusões) são removidas e sobem o horizonte.
+Cursores anteriores ao horizonte recebem ChangeFeedReset e o cliente
+recarrega as listas.
+
+Depois do commit, as alterações também viram eventos em tempo real
+(core.events): 'changes' sempre e 'balance', 'bill' ou 'receivable' conforme
+as entidades alteradas, todos com o cursor como id do evento.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, Max, OuterRef
+from django.utils import timezone
+
+from core.events import publish
+from core.sharding import before_commit, commit_scope, tenant_database
+from jobs.queue import enqueue
+from .models import ChangeFeed, ChangeLogEntry
+
+UPSERT = ChangeLogEntry.OperationChoices.UPSERT
+DELETE = ChangeLogEntry.OperationChoices.DELETE
+
+# entidade -> modelo
+ENTITIES = {
+    'transaction': 'finance.Transaction',
+    'payable': 'finance.Payable',
+    'receivable': 'finance.Receivable',
+    'category': 'finance.Category',
+    'bank_account': 'finance.BankAccount',
+    'credit_card': 'finance.CreditCard',
+    'customer': 'cadastros.Customer',
+    'supplier': 'cadastros.Supplier',
+}
+
+# Modelos serializados dentro de outra entidade: alterá-los altera o registro pai
+# modelo -> (entidade, campo do pai)
+DEPENDENT_MODELS = {
+    'cadastros.Address': ('customer', 'customer'),
+    'cadastros.SupplierAddress': ('supplier', 'supplier'),
+    'cadastros.SupplierBankAccount': ('supplier', 'supplier'),
+}
+
+ENTITY_BY_MODEL = {label: entity for entity, label in ENTITIES.items()}
+
+# entidade -> evento em tempo real
+ENTITY_EVENTS = {
+    'bank_account': 'balance',
+    'payable': 'bill',
+    'credit_card': 'bill',
+    'receivable': 'receivable',
+}
+MAX_EVENT_IDS = 100
+
+DEFAULTS = {
+    'RETENTION_DAYS': 30,
+    # Compacta a empresa sempre que a versão passa por um múltiplo deste valor
+    'COMPACT_EVERY': 5000,
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 5000,
+}
+
+
+class ChangeFeedReset(Exception):
+    """O cursor é anterior ao horizonte (ou posterior à versão atual): o cliente precisa recarregar tudo."""
+
+    def __init__(self, version):
+        super().__init__(version)
+        self.version = version
+
+
+def get_setting(name):
+    return getattr(settings, 'FINANCE_CHANGELOG', {}).get(name, DEFAULTS[name])
+
+
+def _reserve_versions(company_id, count):
+    """Incrementa o contador da empresa (bloqueando a linha até o commit) e devolve a última versão reservada."""
+    feed = ChangeFeed.objects.filter(company_id=company_id)
+    if not feed.update(version=F('version') + count):
+        try:
+            with transaction.atomic(using=tenant_database()):
+                ChangeFeed.objects.create(company_id=company_id, version=count)
+        except IntegrityError:
+            # Outra transação criou o contador ao mesmo tempo
+            feed.update(version=F('version') + count)
+    return feed.values_list('version', flat=True).get()
+
+
+def write_entries(changes, using=None):
+    """Grava {(empresa, entidade, id): operação} com versões consecutivas por empresa."""
+    by_company = defaultdict(list)
+    for (company_id, entity, object_id), op in changes.items():
+        by_company[company_id].append((entity, object_id, op))
+
+    using = using or tenant_database()
+    compact_every = get_setting('COMPACT_EVERY')
+    with transaction.atomic(using=using):
+        for company_id in sorted(by_company):
+            items = by_company[company_id]
+            last = _reserve_versions(company_id, len(items))
+            first = last - len(items) + 1
+            ChangeLogEntry.objects.bulk_create([
+                ChangeLogEntry(company_id=company_id, version=first + offset, entity=entity, object_id=object_id, op=op)
+                for offset, (entity, object_id, op) in enumerate(items)
+            ])
+            transaction.on_commit(partial(publish_changes, company_id, last, items), using=using)
+            if compact_every and (first - 1) // compact_every != last // compact_every:
+                # Fora da requisição: a compactação roda no worker (finance/jobs.py)
+                transaction.on_commit(
+                    partial(enqueue, 'finance.compact_changelog', {'company_id': company_id}, company=company_id),
+                    using=using,
+                )
+
+
+def publish_changes(company_id, version, items):
+    """Eventos em tempo real das alterações confirmadas até `version`."""
+    ids_by_event = defaultdict(list)
+    for entity, object_id, op in items:
+        event = ENTITY_EVENTS.get(entity)
+        if event is not None:
+            ids_by_event[event].append(object_id)
+    for event, ids in ids_by_event.items():
+        publish(company_id, event, {'cursor': version, 'ids': ids[:MAX_EVENT_IDS]}, event_id=version)
+    publish(company_id, 'changes', {'cursor': version}, event_id=version)
+
+
+def record_changes(company_id, entity, ids, op=UPSERT, using=None):
+    """Registra a operação para os ids (na transação em andamento, se houver)."""
+    ids = [object_id for object_id in ids if object_id is not None]
+    if not company_id or not ids:
+        return
+    using = using or tenant_database()
+    scope = commit_scope(using)
+    if scope is None:
+        write_entries({(company_id, entity, object_id): op for object_id in ids}, using)
+        return
+
+    pending = scope.get('changelog')
+    if pending is None:
+        pending = scope['changelog'] = {}
+        before_commit(lambda: write_entries(pending, using), using)
+    for object_id in ids:
+        key = (company_id, entity, object_id)
+        # Reinsere para manter a ordem da última operação
+        pending.pop(key, None)
+        pending[key] = op
+
+
+def record_instance(instance, op):
+    """Usado pelos signals de post_save/post_delete dos modelos rastreados."""
+    label = instance._meta.label
+    using = instance._state.db
+    if label in ENTITY_BY_MODEL:
+        record_changes(instance.company_id, ENTITY_BY_MODEL[label], [instance.pk], op, using)
+    elif label in DEPENDENT_MODELS:
+        entity, parent_field = DEPENDENT_MODELS[label]
+        parent = getattr(instance, parent_field, None)
+        if parent is not None:
+            record_changes(parent.company_id, entity, [parent.pk], UPSERT, using)
+
+
+def current_version(company_id):
+    return ChangeFeed.objects.filter(company_id=company_id).values_list('version', flat=True).first() or 0
+
+
+def read_changes(company_id, since, limit=None):
+    """
+    Alterações da empresa depois da versão `since`, no máximo `limit` entradas,
+    uma por registro (a última). Retorna (cursor, tem_mais, [(entidade, id, operação, versão)]).
+    """
+    limit = min(limit or get_setting('PAGE_SIZE'), get_setting('MAX_PAGE_SIZE'))
+    version, horizon = ChangeFeed.objects.filter(company_id=company_id).values_list(
+        'version', 'horizon'
+    ).first() or (0, 0)
+    if since < horizon or since > version:
+        raise ChangeFeedReset(version)
+
+    entries = list(
+        ChangeLogEntry.objects.filter(company_id=company_id, version__gt=since)
+        .order_by('version')
+        .values_list('version', 'entity', 'object_id', 'op')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for entry_version, entity, object_id, op in entries:
+        latest.pop((entity, object_id), None)
+        latest[(entity, object_id)] = (op, entry_version)
+    changes = [(entity, object_id, op, entry_version) for (entity, object_id), (op, entry_version) in latest.items()]
+    return (entries[-1][0] if entries else since), has_more, changes
+
+
+def compact(company_id, retention_days=None, now=None):
+    """
+    Remove as entradas substituídas e as mais antigas que a retenção, subindo o
+    horizonte. Retorna (substituídas, expiradas).
+    """
+    retention_days = get_setting('RETENTION_DAYS') if retention_days is None else retention_days
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    entries = ChangeLogEntry.objects.filter(company_id=company_id)
+
+    newer = ChangeLogEntry.objects.filter(
+        company_id=company_id, entity=OuterRef('entity'), object_id=OuterRef('object_id'), version__gt=OuterRef('version'),
+    )
+    superseded, _ = entries.filter(Exists(newer)).delete()
+
+    expired = 0
+    with transaction.atomic(using=tenant_database()):
+        horizon = entries.filter(created_at__lt=cutoff).aggregate(horizon=Max('version'))['horizon']
+        if horizon is not None:
+            expired, _ = entries.filter(version__lte=horizon).delete()
+            ChangeFeed.objects.filter(company_id=company_id, horizon__lt=horizon).update(horizon=horizon)
+        ChangeFeed.objects.filter(company_id=company_id).update(compacted_at=timezone.now())
+    return superseded, expired
+
+
+def reset_feed(company_id):
+    """Descarta o log da empresa e sobe o horizonte até a versão atual (todos os clientes recarregam)."""
+    with transaction.atomic(using=tenant_database()):
+        ChangeLogEntry.objects.filter(company_id=company_id).delete()
+        ChangeFeed.objects.filter(company_id=company_id).update(horizon=F('version'))
@@ -0,0 +1,383 @@
+"""
+Gerador de dados sintéticos multi-empresa para testes de carga e benchmarks.
+
+Todos os registros são inseridos com bulk_create em lotes, então os sinais de
+saldo não são disparados; os saldos das contas são recalculados ao final com
+uma única agregação, e o saldo em aberto dos clientes com um único UPDATE.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from accounts.models import Company, User
+from cadastros.documents import only_digits
+from cadastros.models import Customer, Address, Supplier, SupplierAddress, SupplierBankAccount
+from .fingerprints import fingerprint_for
+from .ledger import rebuild_open_balances
+from .models import Category, BankAccount, CreditCard, Transaction, Payable, Receivable
+
+BENCHMARK_GROUP = 'Benchmark'
+DEFAULT_PASSWORD = 'benchmark123'
+
+# (nome, tipo, classificação DRE, classificação DFC)
+CATEGORIES = [
+    ('Vendas de Produtos', 'entrada', 'receita_bruta', 'operacional'),
+    ('Prestação de Serviços', 'entrada', 'receita_bruta', 'operacional'),
+    ('Rendimentos de Aplicações', 'entrada', 'receita_financeira', 'investimento'),
+    ('Empréstimos Recebidos', 'entrada', 'nao_se_aplica', 'financiamento'),
+    ('Aporte de Sócios', 'entrada', 'nao_se_aplica', 'financiamento'),
+    ('Impostos sobre Vendas', 'saida', 'deducao_venda', 'operacional'),
+    ('Devoluções', 'saida', 'deducao_venda', 'operacional'),
+    ('Matéria-prima', 'saida', 'custos_variaveis', 'operacional'),
+    ('Comissões', 'saida', 'custos_variaveis', 'operacional'),
+    ('Aluguel', 'saida', 'despesa_operacional', 'operacional'),
+    ('Energia Elétrica', 'saida', 'despesa_operacional', 'operacional'),
+    ('Internet e Telefone', 'saida', 'despesa_operacional', 'operacional'),
+    ('Salários', 'saida', 'despesa_administrativa', 'operacional'),
+    ('Material de Escritório', 'saida', 'despesa_administrativa', 'operacional'),
+    ('Contabilidade', 'saida', 'despesa_administrativa', 'operacional'),
+    ('Marketing', 'saida', 'despesa_comercial', 'operacional'),
+    ('Viagens', 'saida', 'despesa_comercial', 'operacional'),
+    ('Tarifas Bancárias', 'saida', 'despesa_financeira', 'operacional'),
+    ('Juros de Empréstimos', 'saida', 'despesa_financeira', 'financiamento'),
+    ('IRPJ/CSLL', 'saida', 'imposto_lucro', 'operacional'),
+    ('Compra de Equipamentos', 'saida', 'nao_se_aplica', 'investimento'),
+]
+
+INCOME_DESCRIPTIONS = [
+    'Venda balcão', 'Recebimento PIX', 'Recebimento boleto', 'Serviço de consultoria',
+    'Venda online', 'Transferência recebida', 'Resgate aplicação',
+]
+EXPENSE_DESCRIPTIONS = [
+    'Supermercado', 'Posto de combustível', 'Papelaria', 'Conta de luz', 'Conta de água',
+    'Aluguel sala comercial', 'Folha de pagamento', 'Anúncio em rede social',
+    'Tarifa de manutenção', 'Hospedagem de site', 'Passagem aérea', 'Restaurante',
+    'Manutenção de equipamento', 'Assinatura de software', 'Frete',
+]
+FIRST_NAMES = [
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique',
+    'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael',
+]
+LAST_NAMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Rodrigues',
+    'Almeida', 'Nascimento', 'Ferreira', 'Araújo', 'Gomes', 'Ribeiro',
+]
+CITIES = [
+    ('São Paulo', 'SP'), ('Rio de Janeiro', 'RJ'), ('Belo Horizonte', 'MG'),
+    ('Curitiba', 'PR'), ('Porto Alegre', 'RS'), ('Salvador', 'BA'), ('Recife', 'PE'),
+]
+
+
+def _check_digit(digits, weights):
+    remainder = sum(d * w for d, w in zip(digits, weights)) % 11
+    return 0 if remainder < 2 else 11 - remainder
+
+
+def make_cpf(number):
+    """Monta um CPF válido (com dígitos verificadores) a partir de um número de 9 dígitos."""
+    digits = [int(c) for c in f'{number % 10**9:09d}']
+    digits.append(_check_digit(digits, range(10, 1, -1)))
+    digits.append(_check_digit(digits, range(11, 1, -1)))
+    raw = ''.join(map(str, digits))
+    return f'{raw[:3]}.{raw[3:6]}.{raw[6:9]}-{raw[9:]}'
+
+
+def make_cnpj(number):
+    """Monta um CNPJ válido (matriz 0001) a partir de um número de 8 dígitos."""
+    digits = [int(c) for c in f'{number % 10**8:08d}0001']
+    digits.append(_check_digit(digits, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+    digits.append(_check_digit(digits, [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+    raw = ''.join(map(str, digits))
+    return f'{raw[:2]}.{raw[2:5]}.{raw[5:8]}/{raw[8:12]}-{raw[12:]}'
+
+
+def get_benchmark_group():
+    """Grupo com as permissões de visualização e edição de finance e cadastros."""
+    group, created = Group.objects.get_or_create(name=BENCHMARK_GROUP)
+    if created:
+        group.permissions.set(Permission.objects.filter(
+            Q(content_type__app_label='finance') | Q(content_type__app_label='cadastros')
+        ))
+    return group
+
+
+class TenantGenerator:
+    """
+    Gera empresas completas: usuários, categorias (com classes DRE/DFC), contas,
+    cartões, clientes, fornecedores, transações, parcelas de cartão, contas a
+    pagar e contas a receber. O mesmo seed gera sempre a mesma massa de dados
+    (relativa à data atual).
+    """
+
+    def __init__(self, seed=0, batch_size=5000, log=None):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.today = timezone.now().date()
+        self.password_hash = make_password(DEFAULT_PASSWORD)
+
+    def generate(self, name, transactions=10000, users=3):
+        with transaction.atomic():
+            company = Company.objects.create(name=name, business_area='Benchmark')
+            tenant_users = self._create_users(company, users)
+            categories = self._create_categories(company, tenant_users[0])
+            accounts = self._create_bank_accounts(company)
+            cards = self._create_credit_cards(company, accounts)
+
+        customers = self._create_customers(company, tenant_users[0], max(10, transactions // 50))
+        self._create_suppliers(company, tenant_users[0], max(5, transactions // 200))
+        self._create_transactions(company, tenant_users, categories, accounts, cards, transactions)
+        self._create_manual_payables(company, tenant_users, categories, accounts, max(10, transactions // 20))
+        self._create_receivables(company, tenant_users, customers, max(10, transactions // 10))
+        self._refresh_balances(accounts)
+        rebuild_open_balances(company.pk)
+
+        self.log(f'Empresa "{company.name}" (id={company.id}) gerada.')
+        return company
+
+    # --- Dados de referência ---
+
+    def _create_users(self, company, count):
+        User.objects.bulk_create([
+            User(
+                company=company,
+                username=f'bench-{company.id}-{i}@example.com',
+                email=f'bench-{company.id}-{i}@example.com',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                password=self.password_hash,
+                role=User.Role.ADMIN if i == 0 else User.Role.FINANCE,
+            )
+            for i in range(max(1, count))
+        ])
+        users = list(User.objects.filter(company=company).order_by('id'))
+        get_benchmark_group().user_set.add(*users)
+        return users
+
+    def _create_categories(self, company, user):
+        Category.objects.bulk_create([
+            Category(company=company, user=user, name=name, type=type_,
+                     dre_classification=dre, dfc_classification=dfc)
+            for name, type_, dre, dfc in CATEGORIES
+        ])
+        categories = {'entrada': [], 'saida': []}
+        for category in Category.objects.filter(company=company):
+            categories[category.type].append(category)
+        return categories
+
+    def _create_bank_accounts(self, company):
+        BankAccount.objects.bulk_create([
+            BankAccount(company=company, name='Conta Corrente Principal', type='Conta Corrente',
+                        initial_balance=Decimal('50000.00')),
+            BankAccount(company=company, name='Conta Poupança', type='Conta Poupança',
+                        initial_balance=Decimal('20000.00')),
+            BankAccount(company=company, name='Caixa', type='Caixa', initial_balance=Decimal('1500.00')),
+        ])
+        return list(BankAccount.objects.filter(company=company).order_by('id'))
+
+    def _create_credit_cards(self, company, accounts):
+        CreditCard.objects.bulk_create([
+            CreditCard(company=company, name='Cartão Empresarial', brand='Visa', last_digits='1111',
+                       credit_limit=Decimal('30000.00'), closing_day=5, due_day=12,
+                       associated_account=accounts[0]),
+            CreditCard(company=company, name='Cartão Compras', brand='MasterCard', last_digits='2222',
+                       credit_limit=Decimal('15000.00'), closing_day=20, due_day=28,
+                       associated_account=accounts[0]),
+        ])
+        return list(CreditCard.objects.filter(company=company).order_by('id'))
+
+    # --- Cadastros ---
+
+    def _document_offset(self, model):
+        return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+    def _address_kwargs(self):
+        city, state = self.random.choice(CITIES)
+        return {
+            'cep': f'{self.random.randint(1000, 99999):05d}-{self.random.randint(0, 999):03d}',
+            'street': f'Rua {self.random.choice(LAST_NAMES)}',
+            'number': str(self.random.randint(1, 3000)),
+            'neighborhood': 'Centro',
+            'city': city,
+            'state': state,
+        }
+
+    def _create_customers(self, company, user, count):
+        offset = self._document_offset(Customer)
+        customers = []
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+                document = make_cpf(offset + i)
+                batch.append(Customer(
+                    company=company,
+                    user=user,
+                    name=f'{first} {last}',
+                    customer_type=Customer.CustomerType.PESSOA_FISICA,
+                    document=document,
+                    # bulk_create não passa pelo pre_save que preenche a chave
+                    document_key=only_digits(document),
+                    email=f'cliente{offset + i}@example.com',
+                    phone=f'(11) 9{self.random.randint(1000, 9999)}-{self.random.randint(1000, 9999)}',
+                ))
+            with transaction.atomic():
+                batch = Customer.objects.bulk_create(batch)
+                Address.objects.bulk_create([
+                    Address(customer=customer, **self._address_kwargs()) for customer in batch
+                ])
+            customers.extend(customer.id for customer in batch)
+        self.log(f'  {count} clientes')
+        return customers
+
+    def _create_suppliers(self, company, user, count):
+        offset = self._document_offset(Supplier)
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                last = self.random.choice(LAST_NAMES)
+                document = make_cnpj(offset + i)
+                batch.append(Supplier(
+                    company=company,
+                    user=user,
+                    name=f'{last} Comércio Ltda',
+                    trade_name=f'{last} Distribuidora',
+                    document=document,
+                    document_key=only_digits(document),
+                    phone=f'(11) 3{self.random.randint(100, 999)}-{self.random.randint(1000, 9999)}',
+                    email=f'fornecedor{offset + i}@example.com',
+                ))
+            with transaction.atomic():
+                batch = Supplier.objects.bulk_create(batch)
+                SupplierAddress.objects.bulk_create([
+                    SupplierAddress(supplier=supplier, **self._address_kwargs()) for supplier in batch
+                ])
+                SupplierBankAccount.objects.bulk_create([
+                    SupplierBankAccount(
+                        supplier=supplier,
+                        bank='Banco do Brasil',
+                        agency=f'{self.random.randint(1000, 9999)}',
+                        account=f'{self.random.randint(10000, 99999)}-{self.random.randint(0, 9)}',
+                    )
+                    for supplier in batch
+                ])
+        self.log(f'  {count} fornecedores')
+
+    # --- Movimentações ---
+
+    def _amount(self, mean=250.0):
+        return Decimal(str(round(min(self.random.lognormvariate(0, 1) * mean, 99999999), 2))) or Decimal('1.00')
+
+    def _past_date(self, days=3 * 365):
+        return self.today - timedelta(days=self.random.randint(0, days))
+
+    def _create_transactions(self, company, users, categories, accounts, cards, count):
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for _ in range(start, min(start + self.batch_size, count)):
+                on_card = self.random.random() < 0.3
+                type_ = 'saida' if on_card or self.random.random() < 0.65 else 'entrada'
+                descriptions = INCOME_DESCRIPTIONS if type_ == 'entrada' else EXPENSE_DESCRIPTIONS
+                batch.append(Transaction(
+                    company=company,
+                    user=self.random.choice(users),
+                    description=self.random.choice(descriptions),
+                    amount=self._amount(),
+                    transaction_date=self._past_date(),
+                    type=type_,
+                    category=self.random.choice(categories[type_]) if self.random.random() < 0.8 else None,
+                    bank_account=None if on_card else self.random.choice(accounts),
+                    credit_card=self.random.choice(cards) if on_card else None,
+                ))
+
+            for item in batch:
+                item.fingerprint = fingerprint_for(item)
+            with transaction.atomic():
+                batch = Transaction.objects.bulk_create(batch)
+                installments = []
+                for card_transaction in batch:
+                    if card_transaction.credit_card_id is None:
+                        continue
+                    total = self.random.choice([1, 1, 1, 2, 3, 6, 10, 12])
+                    installment_amount = (card_transaction.amount / total).quantize(Decimal('0.01'))
+                    for i in range(1, total + 1):
+                        due_date = card_transaction.transaction_date + relativedelta(months=i)
+                        installments.append(Payable(
+                            company=company,
+                            user=card_transaction.user,
+                            transaction=card_transaction,
+                            description=f'{card_transaction.description} ({i}/{total})',
+                            amount=installment_amount,
+                            due_date=due_date,
+                            status='pago' if due_date < self.today else 'pendente',
+                            category=self.random.choice(categories['saida']),
+                        ))
+                Payable.objects.bulk_create(installments, batch_size=self.batch_size)
+            self.log(f'  {min(start + self.batch_size, count)}/{count} transações')
+
+    def _create_manual_payables(self, company, users, categories, accounts, count):
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for _ in range(start, min(start + self.batch_size, count)):
+                due_date = self.today + timedelta(days=self.random.randint(-365, 365))
+                paid = due_date < self.today and self.random.random() < 0.85
+                batch.append(Payable(
+                    company=company,
+                    user=self.random.choice(users),
+                    description=self.random.choice(EXPENSE_DESCRIPTIONS),
+                    amount=self._amount(800.0),
+                    due_date=due_date,
+                    payment_date=due_date if paid else None,
+                    status='pago' if paid else ('vencido' if due_date < self.today else 'pendente'),
+                    category=self.random.choice(categories['saida']),
+                    paid_from_account=self.random.choice(accounts) if paid else None,
+                ))
+            Payable.objects.bulk_create(batch)
+        self.log(f'  {count} contas a pagar manuais')
+
+    def _create_receivables(self, company, users, customers, count):
+        methods = [choice for choice, _ in Receivable.PaymentMethodChoices.choices]
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for _ in range(start, min(start + self.batch_size, count)):
+                due_date = self.today + timedelta(days=self.random.randint(-365, 180))
+                received = due_date < self.today and self.random.random() < 0.8
+                if received:
+                    status = Receivable.StatusChoices.RECEIVED
+                elif due_date < self.today:
+                    status = Receivable.StatusChoices.OVERDUE
+                else:
+                    status = Receivable.StatusChoices.PENDING
+                batch.append(Receivable(
+                    company=company,
+                    user=self.random.choice(users),
+                    customer_id=self.random.choice(customers),
+                    description=self.random.choice(INCOME_DESCRIPTIONS),
+                    amount=self._amount(600.0),
+                    due_date=due_date,
+                    payment_date=due_date if received else None,
+                    status=status,
+                    payment_method=self.random.choice(methods),
+                ))
+            Receivable.objects.bulk_create(batch)
+        self.log(f'  {count} contas a receber')
+
+    def _refresh_balances(self, accounts):
+        """Aplica o efeito das transações geradas nos saldos, como os sinais fariam."""
+        totals = Transaction.objects.filter(bank_account__in=accounts).values('bank_account').annotate(
+            incomes=Sum('amount', filter=Q(type='entrada')),
+            expenses=Sum('amount', filter=Q(type='saida')),
+        )
+        by_account = {row['bank_account']: row for row in totals}
+        for account in accounts:
+            row = by_account.get(account.id)
+            if row:
+                account.initial_balance += (row['incomes'] or 0) - (row['expenses'] or 0)
+        BankAccount.objects.bulk_update(accounts, ['initial_balance'])
@@ -0,0 +1,48 @@
+"""
+Impressão digital (fingerprint) das transações para detectar lançamentos
+duplicados: sha256 de conta/cartão, data, valor com sinal e descrição
+normalizada (sem acentos, minúsculas, espaços colapsados). É gravada em
+Transaction.fingerprint e indexada junto com a empresa, então a checagem de
+duplicidade é uma busca por igualdade e a varredura é um GROUP BY.
+"""
+import hashlib
+from decimal import Decimal
+
+from core.search import normalize_text
+
+from .models import Transaction
+
+
+def transaction_fingerprint(bank_account_id, credit_card_id, transaction_date, amount, transaction_type, description):
+    signed = Decimal(amount).quantize(Decimal('0.01'))
+    if transaction_type != 'entrada':
+        signed = -signed
+    parts = [
+        f'a{bank_account_id or ""}',
+        f'c{credit_card_id or ""}',
+        transaction_date.isoformat() if hasattr(transaction_date, 'isoformat') else str(transaction_date),
+        str(signed),
+        ' '.join((normalize_text(description) or '').split()),
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def fingerprint_for(transaction):
+    return transaction_fingerprint(
+        transaction.bank_account_id,
+        transaction.credit_card_id,
+        transaction.transaction_date,
+        transaction.amount,
+        transaction.type,
+        transaction.description,
+    )
+
+
+def existing_fingerprints(company, fingerprints, exclude_pk=None):
+    """Fingerprints da lista que já existem na empresa (uma consulta pelo índice)."""
+    if not fingerprints:
+        return set()
+    queryset = Transaction.objects.filter(company=company, fingerprint__in=set(fingerprints))
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    return set(queryset.values_list('fingerprint', flat=True))
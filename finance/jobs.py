@@ -0,0 +1,107 @@
+"""Tarefas em segundo plano do app finance (ver jobs/registry.py)."""
+from datetime import date
+
+from django.db import DEFAULT_DB_ALIAS
+from django.template.loader import render_to_string
+
+from accounts.models import User
+from jobs.registry import task
+from notifications.models import OutboundEmail
+from notifications.outbox import queue_emails
+from . import budgets, reminders
+from .changelog import compact
+from .models import Budget, BudgetConsumption, Transaction
+
+
+@task('finance.compact_changelog', priority=10)
+def compact_changelog(company_id):
+    compact(company_id)
+
+
+@task('finance.bill_reminders')
+def bill_reminders():
+    """Disparo diário: um resumo por shard e a execução de amanhã."""
+    reminders.dispatch_reminders()
+    reminders.schedule_reminders()
+
+
+@task('finance.bill_reminders_shard', max_attempts=5)
+def bill_reminders_shard(alias, day=None):
+    reminders.send_shard_reminders(alias, reminders.parse_day(day))
+
+
+@task('finance.large_transaction_alerts')
+def large_transaction_alerts(company_id, alerts):
+    """E-mail para os usuários com notify_large_transactions sobre as transações fora do padrão."""
+    means = dict((transaction_id, mean) for transaction_id, mean in alerts)
+    transactions = list(
+        Transaction.objects.filter(company_id=company_id, pk__in=list(means))
+        .select_related('category').order_by('transaction_date', 'id')
+    )
+    users = User.objects.using(DEFAULT_DB_ALIAS).filter(
+        company_id=company_id, is_active=True, notify_large_transactions=True,
+    ).exclude(email='').values_list('email', 'first_name', 'username')
+    if not transactions:
+        return
+
+    items = [
+        {
+            'description': item.description,
+            'category': item.category.name if item.category else '',
+            'amount': reminders.format_currency(item.amount),
+            'mean': reminders.format_currency(means[item.pk]),
+            'date': item.transaction_date,
+        }
+        for item in transactions
+    ]
+    subject = f"FinançaPlus: {len(items)} transação(ões) acima do padrão da categoria"
+    queue_emails([
+        OutboundEmail(
+            recipient=email, subject=subject,
+            body=render_to_string('finance/email/large_transactions.txt', {'name': first_name or username, 'items': items}),
+        )
+        for email, first_name, username in users
+    ])
+
+
+@task('finance.budget_alerts')
+def budget_alerts(company_id, alerts):
+    """E-mail para os usuários com notify_weekly_goals sobre os orçamentos que atingiram o aviso ou estouraram."""
+    levels = {budget_id: level for budget_id, _, level in alerts}
+    starts = {budget_id: start for budget_id, start, _ in alerts}
+    spent = {
+        row.budget_id: row.spent
+        for row in BudgetConsumption.objects.filter(budget_id__in=list(levels), budget__company_id=company_id)
+        if row.period_start.isoformat() == starts[row.budget_id]
+    }
+    items = []
+    for budget in Budget.objects.filter(pk__in=list(spent)).select_related('category').order_by('category__name'):
+        start = date.fromisoformat(starts[budget.pk])
+        items.append({
+            'category': budget.category.name,
+            'period': budget.get_period_display().lower(),
+            'period_start': start,
+            'period_end': budgets.period_end(budget.period, start),
+            'amount': reminders.format_currency(budget.amount),
+            'spent': reminders.format_currency(spent[budget.pk]),
+            'level': levels[budget.pk],
+            'exceeded': levels[budget.pk] >= 100,
+        })
+    if not items:
+        return
+
+    users = User.objects.using(DEFAULT_DB_ALIAS).filter(
+        company_id=company_id, is_active=True, notify_weekly_goals=True,
+    ).exclude(email='').values_list('email', 'first_name', 'username')
+    exceeded = sum(item['exceeded'] for item in items)
+    subject = (
+        f"FinançaPlus: {exceeded} orçamento(s) estourado(s)" if exceeded
+        else f"FinançaPlus: {len(items)} orçamento(s) perto do limite"
+    )
+    queue_emails([
+        OutboundEmail(
+            recipient=email, subject=subject,
+            body=render_to_string('finance/email/budget_alert.txt', {'name': first_name or username, 'items': items}),
+        )
+        for email, first_name, username in users
+    ])
@@ -0,0 +1,191 @@
+"""
+Extrato por cliente e saldo em aberto desnormalizado em Customer.open_balance.
+
+O extrato junta (UNION ALL) as cobranças, uma por conta a receber na data de
+vencimento, e os recebimentos, um por conta recebida na data de recebimento.
+O saldo acumulado é calculado no banco com SUM() OVER (ORDER BY data, tipo,
+id). A paginação é por chave (keyset): o cursor guarda a posição e o saldo da
+última linha da página, e a próxima página só lê as linhas depois dela. O
+custo de cada página não depende de quantas páginas já foram lidas.
+
+Customer.open_balance é a soma das contas a receber pendentes ou vencidas. Os
+signals (escritas avulsas) e finance/bulk.py (baixas em lote) ajustam o saldo
+com UPDATE ... F(), então a listagem de clientes ordena pela exposição sem
+agregar. rebuild_customer_balances recalcula o saldo a partir das contas.
+"""
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from cadastros.models import Customer
+from .changelog import record_changes
+from .models import Receivable
+
+CHARGE = 0
+RECEIPT = 1
+ENTRY_TYPES = {CHARGE: 'cobranca', RECEIPT: 'recebimento'}
+
+OPEN_STATUSES = [Receivable.StatusChoices.PENDING, Receivable.StatusChoices.OVERDUE]
+RECEIVED = Receivable.StatusChoices.RECEIVED
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+CENTS = Decimal('0.01')
+
+
+def open_amount(status, amount):
+    """Quanto a conta a receber soma ao saldo em aberto do cliente."""
+    return Decimal(amount) if status in OPEN_STATUSES and amount else Decimal('0')
+
+
+def apply_open_balance_deltas(company_id, deltas):
+    """Aplica {cliente_id: variação} com um UPDATE por cliente (em ordem de id, evitando deadlocks)."""
+    changed = []
+    for customer_id in sorted(customer_id for customer_id in deltas if customer_id):
+        delta = deltas[customer_id]
+        if delta:
+            Customer.objects.filter(pk=customer_id).update(open_balance=F('open_balance') + delta)
+            changed.append(customer_id)
+    # O saldo aparece no cadastro do cliente: a SPA precisa recarregá-lo
+    record_changes(company_id, 'customer', changed)
+    return changed
+
+
+def rebuild_open_balances(company_id):
+    """Recalcula o saldo em aberto dos clientes da empresa em um único UPDATE. Retorna quantos clientes."""
+    open_total = (
+        Receivable.objects.filter(customer=OuterRef('pk'), status__in=OPEN_STATUSES)
+        .order_by()
+        .values('customer')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    return Customer.objects.filter(company_id=company_id).update(
+        open_balance=Coalesce(Subquery(open_total), Value(Decimal('0')), output_field=DecimalField()),
+    )
+
+
+def encode_cursor(entry_date, kind, entry_id, balance):
+    payload = json.dumps([entry_date.isoformat(), kind, entry_id, str(balance)])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(data, tipo, id, saldo) da última linha da página anterior. ValueError se o cursor for inválido."""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        entry_date, kind, entry_id, balance = json.loads(payload)
+        return date.fromisoformat(entry_date), int(kind), int(entry_id), Decimal(balance)
+    except (TypeError, ValueError, ArithmeticError) as exc:
+        raise ValueError('Cursor inválido.') from exc
+
+
+def _to_decimal(value):
+    # O SQLite devolve as somas como float
+    return (value if isinstance(value, Decimal) else Decimal(str(value or 0))).quantize(CENTS)
+
+
+def _to_date(value):
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def opening_balance(company_id, customer_id, start_date):
+    """Saldo do cliente antes de start_date: cobranças vencidas antes menos recebimentos antes."""
+    totals = Receivable.objects.filter(company_id=company_id, customer_id=customer_id).aggregate(
+        charges=Sum('amount', filter=Q(due_date__lt=start_date)),
+        receipts=Sum('amount', filter=Q(status=RECEIVED, payment_date__lt=start_date)),
+    )
+    return (totals['charges'] or Decimal('0')) - (totals['receipts'] or Decimal('0'))
+
+
+def _entries_query(company_id, customer_id, start_date=None, end_date=None, after=None):
+    """
+    (sql, parâmetros, banco) do UNION ALL de cobranças e recebimentos, já
+    filtrados pelo período e pelo cursor. O banco é o que o ORM usaria na
+    leitura (réplica ou shard), para a consulta crua seguir o mesmo roteamento.
+    """
+    base = Receivable.objects.filter(company_id=company_id, customer_id=customer_id).order_by()
+    branches = []
+    for kind, date_field, queryset in (
+        (CHARGE, 'due_date', base),
+        (RECEIPT, 'payment_date', base.filter(status=RECEIVED, payment_date__isnull=False)),
+    ):
+        if start_date:
+            queryset = queryset.filter(**{f'{date_field}__gte': start_date})
+        if end_date:
+            queryset = queryset.filter(**{f'{date_field}__lte': end_date})
+        if after:
+            # (data, tipo, id) > cursor; o tipo é constante em cada parte da união
+            after_date, after_kind, after_id = after
+            position = Q(**{f'{date_field}__gt': after_date})
+            if kind > after_kind:
+                position |= Q(**{date_field: after_date})
+            elif kind == after_kind:
+                position |= Q(**{date_field: after_date, 'id__gt': after_id})
+            queryset = queryset.filter(position)
+        signed = F('amount') if kind == CHARGE else ExpressionWrapper(
+            -F('amount'), output_field=DecimalField(max_digits=15, decimal_places=2),
+        )
+        branches.append(
+            queryset.annotate(entry_date=F(date_field), kind=Value(kind), signed=signed)
+            .values_list('id', 'entry_date', 'kind', 'signed', 'description', 'status')
+        )
+    combined = branches[0].union(branches[1], all=True)
+    sql, params = combined.query.get_compiler(using=combined.db).as_sql()
+    return sql, params, combined.db
+
+
+def customer_statement(company_id, customer_id, start_date=None, end_date=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Uma página do extrato do cliente em ordem de data (cobranças antes dos
+    recebimentos do mesmo dia). Retorna {'opening_balance', 'results',
+    'next_cursor'}; next_cursor é None na última página.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        after_date, after_kind, after_id, balance = decode_cursor(cursor)
+        after = (after_date, after_kind, after_id)
+        opening = None
+    else:
+        after = None
+        balance = opening_balance(company_id, customer_id, start_date) if start_date else Decimal('0')
+        opening = balance
+
+    union_sql, params, using = _entries_query(company_id, customer_id, start_date, end_date, after)
+    sql = (
+        'SELECT id, entry_date, kind, signed, description, status, '
+        'SUM(signed) OVER (ORDER BY entry_date, kind, id ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) '
+        f'FROM ({union_sql}) entries ORDER BY entry_date, kind, id LIMIT %s'
+    )
+    # Uma linha a mais só para saber se há próxima página
+    with connections[using].cursor() as db_cursor:
+        db_cursor.execute(sql, [*params, limit + 1])
+        rows = db_cursor.fetchall()
+
+    results = []
+    position = None
+    for entry_id, entry_date, kind, signed, description, status, running in rows[:limit]:
+        signed = _to_decimal(signed)
+        entry_date = _to_date(entry_date)
+        results.append({
+            'id': entry_id,
+            'date': entry_date,
+            'type': ENTRY_TYPES[kind],
+            'description': description,
+            'status': status,
+            'debit': signed if kind == CHARGE else Decimal('0.00'),
+            'credit': -signed if kind == RECEIPT else Decimal('0.00'),
+            'balance': balance + _to_decimal(running),
+        })
+        position = (entry_date, kind, entry_id)
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(*position, results[-1]['balance'])
+    return {'opening_balance': opening, 'results': results, 'next_cursor': next_cursor}
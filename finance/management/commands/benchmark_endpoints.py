@@ -0,0 +1,221 @@
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import Company
+from core.sharding import for_company
+from finance.datagen import TenantGenerator
+from finance.models import CreditCard
+from finance.partitioning import partition_status
+
+class QueryCounter:
+    """
+    execute_wrapper que conta as consultas. Ao contrário do CaptureQueriesContext,
+    não depende do queries_log da conexão, limitado a 9000 entradas.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+# (nome, nome da rota, função que monta os query params a partir do contexto)
+ENDPOINTS = [
+    ('categories', 'category-list', lambda ctx: {}),
+    ('bank-accounts', 'bankaccount-list', lambda ctx: {}),
+    ('credit-cards', 'creditcard-list', lambda ctx: {}),
+    ('transactions', 'transaction-list', lambda ctx: {}),
+    ('transactions-month', 'transaction-list', lambda ctx: {
+        'start_date': ctx['month_start'], 'end_date': ctx['month_end'],
+    }),
+    ('transactions-export-csv', 'transaction-export', lambda ctx: {'file_format': 'csv'}),
+    ('transactions-export-xlsx', 'transaction-export', lambda ctx: {'file_format': 'xlsx'}),
+    ('payables', 'payable-list', lambda ctx: {}),
+    ('payables-month', 'payable-list', lambda ctx: {'month': ctx['month'], 'year': ctx['year']}),
+    ('payables-export-csv', 'payable-export', lambda ctx: {'file_format': 'csv'}),
+    ('receivables', 'receivable-list', lambda ctx: {}),
+    ('receivables-month', 'receivable-list', lambda ctx: {'period-filter': ctx['period']}),
+    ('receivables-export-csv', 'receivable-export', lambda ctx: {'file_format': 'csv'}),
+    ('receivables-search', 'receivable-list', lambda ctx: {'search': 'silva'}),
+    ('receivables-summary', 'receivables-summary', lambda ctx: {'period-filter': ctx['period']}),
+    ('payables-aging', 'payables-aging', lambda ctx: {}),
+    ('card-statement', 'card-statement', lambda ctx: {
+        'card_id': ctx['card_id'], 'month': ctx['month'], 'year': ctx['year'],
+    }),
+    ('card-bill', 'card-bill', lambda ctx: {'card_id': ctx['card_id'], 'month': ctx['month'], 'year': ctx['year']}),
+    ('card-bill-detail', 'card-bill-detail', lambda ctx: {
+        'card_id': ctx['card_id'], 'month': ctx['month'], 'year': ctx['year'],
+    }),
+    ('monthly-bills', 'monthly-bills', lambda ctx: {'month': ctx['month'], 'year': ctx['year']}),
+    ('dashboard', 'dashboard-summary', lambda ctx: {}),
+    ('chart-income-expense', 'chart-income-expense', lambda ctx: {}),
+    ('chart-cash-flow', 'chart-cash-flow', lambda ctx: {}),
+    ('chart-cash-flow-forecast', 'chart-cash-flow-forecast', lambda ctx: {'days': 365, 'granularity': 'week'}),
+    ('chart-dfc', 'chart-dfc', lambda ctx: {'year': ctx['year']}),
+    ('global-search', 'global-search', lambda ctx: {'q': 'joao'}),
+    ('customers', 'customer-list', lambda ctx: {}),
+    ('customers-search', 'customer-list', lambda ctx: {'search': 'silva'}),
+    ('suppliers', 'supplier-list', lambda ctx: {}),
+]
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith('k'):
+        multiplier, value = 1000, value[:-1]
+    elif value.endswith('m'):
+        multiplier, value = 1000000, value[:-1]
+    return int(float(value) * multiplier)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o tempo de resposta dos endpoints de finance e cadastros em empresas '
+        'sintéticas de vários tamanhos e grava um relatório JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10k,100k,1M', help='Tamanhos (transações por empresa), ex: 10k,100k,1M.')
+        parser.add_argument('--repeat', type=int, default=5, help='Execuções medidas por endpoint.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--endpoints', default='', help='Lista de endpoints a medir (padrão: todos).')
+        parser.add_argument('--output', default='benchmark_report.json')
+        parser.add_argument('--regenerate', action='store_true', help='Gera novas empresas mesmo que já existam.')
+        parser.add_argument('--compare', help='Relatório JSON anterior para comparação.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Regressão máxima aceita na mediana (0.25 = 25%%).')
+
+    def handle(self, *args, **options):
+        sizes = [parse_size(size) for size in options['sizes'].split(',') if size.strip()]
+        selected = {name.strip() for name in options['endpoints'].split(',') if name.strip()}
+        endpoints = [endpoint for endpoint in ENDPOINTS if not selected or endpoint[0] in selected]
+
+        results = []
+        for size in sizes:
+            company = self._get_company(size, options)
+            user = company.users.order_by('id').first()
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+
+            # force_authenticate não passa pela autenticação que ativa o shard
+            with for_company(company) as database:
+                context = self._context(company)
+                self.stdout.write(f'\n== {size} transações (empresa {company.id}, banco {database}) ==')
+                for name, url_name, params in endpoints:
+                    result = self._measure(client, reverse(url_name), params(context), options['repeat'], database)
+                    result.update({'size': size, 'endpoint': name})
+                    results.append(result)
+                    self.stdout.write(
+                        f"{name:<24} {result['status']}  mediana {result['median_ms']:>10.1f} ms  "
+                        f"p95 {result['p95_ms']:>10.1f} ms  {result['queries']:>5} queries  {result['bytes']:>10} bytes"
+                    )
+
+        report = {
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'database': {'vendor': connection.vendor, 'name': str(connection.settings_dict['NAME'])},
+            # Permite comparar relatórios com e sem particionamento (partition pruning nos gráficos)
+            'partitioning': {
+                table: {'partitioned': info['partitioned'], 'partitions': len(info['partitions'])}
+                for table, info in partition_status(connection).items()
+            },
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nRelatório gravado em {options['output']}"))
+
+        if options['compare']:
+            self._compare(report, options['compare'], options['tolerance'])
+
+    def _get_company(self, size, options):
+        name = f'Benchmark {size}'
+        company = Company.objects.filter(name=name).order_by('-id').first()
+        if company is None or options['regenerate']:
+            self.stdout.write(f'Gerando empresa com {size} transações...')
+            generator = TenantGenerator(seed=options['seed'], log=lambda message: self.stdout.write(message))
+            company = generator.generate(name=name, transactions=size)
+        return company
+
+    def _context(self, company):
+        today = date.today()
+        month_start = today.replace(day=1)
+        card = CreditCard.objects.filter(company=company).order_by('id').first()
+        return {
+            'year': today.year,
+            'month': today.month,
+            'period': today.strftime('%Y-%m'),
+            'month_start': month_start.isoformat(),
+            'month_end': (month_start + relativedelta(months=1) - timedelta(days=1)).isoformat(),
+            'card_id': card.id if card else 0,
+        }
+
+    def _measure(self, client, path, params, repeat, database):
+        # Primeira chamada sem medição para aquecer caches e conexões
+        response = client.get(path, params)
+        timings = []
+        queries = 0
+        size = 0
+        for _ in range(max(1, repeat)):
+            counter = QueryCounter()
+            with connections[database].execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.get(path, params)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = counter.count
+            size = len(body)
+
+        return {
+            'path': path,
+            'params': params,
+            'status': response.status_code,
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': queries,
+            'bytes': size,
+        }
+
+    def _compare(self, report, baseline_path, tolerance):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        previous = {(item['size'], item['endpoint']): item for item in baseline['results']}
+
+        regressions = []
+        self.stdout.write(f'\nComparação com {baseline_path}:')
+        for item in report['results']:
+            before = previous.get((item['size'], item['endpoint']))
+            if not before or not before['median_ms']:
+                continue
+            ratio = item['median_ms'] / before['median_ms']
+            marker = ''
+            if ratio > 1 + tolerance:
+                marker = '  <-- REGRESSÃO'
+                regressions.append(item)
+            self.stdout.write(
+                f"{item['size']:>9} {item['endpoint']:<24} {before['median_ms']:>10.1f} -> "
+                f"{item['median_ms']:>10.1f} ms ({ratio:.2f}x){marker}"
+            )
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} endpoint(s) acima da tolerância de {tolerance:.0%}.')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.sharding import shard_aliases
+from finance.reminders import parse_day, schedule_reminders, send_shard_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Agenda o resumo diário de contas a pagar na fila de tarefas (padrão) ou, com --now, '
+        'monta e enfileira os e-mails de todos os shards imediatamente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--now', action='store_true', help='Gera os resumos agora, sem passar pela fila de tarefas.')
+        parser.add_argument('--day', help='Data de referência (AAAA-MM-DD, padrão: hoje).')
+        parser.add_argument('--days-ahead', type=int, help='Padrão: BILL_REMINDERS["DAYS_AHEAD"].')
+
+    def handle(self, *args, **options):
+        if not options['now']:
+            job = schedule_reminders()
+            if job is None:
+                self.stdout.write('O resumo diário já está agendado.')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Resumo diário agendado para {timezone.localtime(job.run_at):%d/%m/%Y %H:%M}.'))
+            return
+
+        total = 0
+        for alias in shard_aliases():
+            queued = send_shard_reminders(alias, parse_day(options['day']), options['days_ahead'])
+            self.stdout.write(f'{alias}: {queued} e-mail(s)')
+            total += queued
+        self.stdout.write(self.style.SUCCESS(f'{total} resumo(s) na caixa de saída.'))
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Company
+from core.sharding import for_company, tenant_atomic
+from finance.budgets import apply_budget_deltas, transaction_spending
+from finance.categorization import get_matcher
+from finance.changelog import record_changes
+from finance.models import Transaction
+from finance.outliers import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica as regras de categorização às transações sem categoria, em blocos '
+        '(paginação por id e bulk_update), empresa por empresa. Atualiza também o consumo dos '
+        'orçamentos e as estatísticas por categoria.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: todas com regras ativas).')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Apenas conta, sem gravar.')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id').values_list('id', flat=True)
+        if options['company']:
+            companies = companies.filter(id=options['company'])
+            if not companies:
+                raise CommandError(f"Empresa {options['company']} não encontrada.")
+
+        total = 0
+        for company_id in companies:
+            with for_company(company_id):
+                matcher = get_matcher(company_id)
+                if not matcher:
+                    continue
+                categorized, scanned = self._categorize(company_id, matcher, options['chunk_size'], options['dry_run'])
+                if categorized and not options['dry_run']:
+                    # As transações mudaram de categoria: recalcula as estatísticas de uma vez, sem
+                    # alertar sobre lançamentos antigos como observe_transactions() faria
+                    rebuild_stats(company_id)
+            total += categorized
+            self.stdout.write(f'Empresa {company_id}: {categorized} de {scanned} transações sem categoria categorizadas.')
+
+        verb = 'seriam categorizadas' if options['dry_run'] else 'categorizadas'
+        self.stdout.write(self.style.SUCCESS(f'{total} transações {verb}.'))
+
+    def _categorize(self, company_id, matcher, chunk_size, dry_run):
+        queryset = Transaction.objects.filter(company_id=company_id, category__isnull=True).order_by('pk')
+        categorized = scanned = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_pk).values_list(
+                    'id', 'description', 'amount', 'type', 'bank_account_id', 'credit_card_id', 'transaction_date',
+                )[:chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            scanned += len(rows)
+
+            changed = []
+            for pk, description, amount, transaction_type, bank_account_id, credit_card_id, transaction_date in rows:
+                category_id = matcher.categorize(description, amount, transaction_type, bank_account_id, credit_card_id)
+                if category_id is not None:
+                    changed.append(Transaction(
+                        pk=pk, category_id=category_id, amount=amount, type=transaction_type,
+                        transaction_date=transaction_date,
+                    ))
+            categorized += len(changed)
+            if changed and not dry_run:
+                with tenant_atomic():
+                    Transaction.objects.bulk_update(changed, ['category'], batch_size=chunk_size)
+                    record_changes(company_id, 'transaction', [transaction.pk for transaction in changed])
+                    # bulk_update não dispara os signals do consumo dos orçamentos
+                    apply_budget_deltas(company_id, transaction_spending(changed))
+        return categorized, scanned
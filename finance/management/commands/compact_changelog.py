@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.sharding import for_company, shard_aliases
+from finance.changelog import compact
+from finance.models import ChangeFeed
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacta o log de alterações (delta sync): remove as entradas substituídas e as '
+        'mais antigas que a retenção, subindo o horizonte dos cursores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: todas).')
+        parser.add_argument('--retention-days', type=int, help='Padrão: FINANCE_CHANGELOG["RETENTION_DAYS"].')
+
+    def handle(self, *args, **options):
+        if options['company']:
+            company_ids = [options['company']]
+        else:
+            company_ids = sorted({
+                company_id
+                for database in shard_aliases()
+                for company_id in ChangeFeed.objects.using(database).values_list('company_id', flat=True)
+            })
+
+        for company_id in company_ids:
+            with for_company(company_id):
+                superseded, expired = compact(company_id, options['retention_days'])
+            self.stdout.write(f'Empresa {company_id}: {superseded} substituídas e {expired} expiradas removidas.')
@@ -0,0 +1,63 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.sharding import shard_aliases, shard_for_company
+from finance.models import Transaction
+
+
+class Command(BaseCommand):
+    help = (
+        'Lista as transações duplicadas (mesmo fingerprint: conta/cartão, data, valor e descrição) '
+        'com um único GROUP BY pelo índice (empresa, fingerprint) em cada banco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: todas).')
+        parser.add_argument('--limit', type=int, default=100, help='Máximo de grupos listados por banco.')
+
+    def handle(self, *args, **options):
+        company_id = options['company']
+        databases = [shard_for_company(company_id)[0]] if company_id else shard_aliases()
+
+        total_groups = total_extra = 0
+        for database in databases:
+            queryset = Transaction.objects.using(database).exclude(fingerprint='')
+            if company_id:
+                queryset = queryset.filter(company_id=company_id)
+
+            groups = list(
+                queryset.order_by()
+                .values('company_id', 'fingerprint')
+                .annotate(count=Count('id'))
+                .filter(count__gt=1)
+                .order_by('-count', 'company_id')[:options['limit']]
+            )
+            if not groups:
+                continue
+
+            # Uma consulta IN para os detalhes de todos os grupos listados
+            rows = defaultdict(list)
+            details = queryset.filter(fingerprint__in=[group['fingerprint'] for group in groups]).order_by('id')
+            for pk, company, fingerprint, day, amount, description in details.values_list(
+                'id', 'company_id', 'fingerprint', 'transaction_date', 'amount', 'description'
+            ):
+                rows[(company, fingerprint)].append((pk, day, amount, description))
+
+            self.stdout.write(f'== {database} ==')
+            for group in groups:
+                items = rows[(group['company_id'], group['fingerprint'])]
+                if not items:
+                    continue
+                _, day, amount, description = items[0]
+                self.stdout.write(
+                    f"empresa {group['company_id']}: {group['count']}x {day} {amount} {description!r} "
+                    f"ids {', '.join(str(item[0]) for item in items)}"
+                )
+                total_groups += 1
+                total_extra += group['count'] - 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_groups} grupo(s) de duplicadas, {total_extra} transação(ões) excedente(s).'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from finance.datagen import TenantGenerator, DEFAULT_PASSWORD
+
+
+class Command(BaseCommand):
+    help = 'Gera empresas sintéticas com cadastros e movimentações para testes de carga.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=1, help='Quantidade de empresas a gerar.')
+        parser.add_argument('--transactions', type=int, default=10000, help='Transações por empresa.')
+        parser.add_argument('--users', type=int, default=3, help='Usuários por empresa.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--name-prefix', default='Empresa Sintética')
+
+    def handle(self, *args, **options):
+        generator = TenantGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=lambda message: self.stdout.write(message),
+        )
+        for i in range(1, options['tenants'] + 1):
+            generator.generate(
+                name=f"{options['name_prefix']} {i}",
+                transactions=options['transactions'],
+                users=options['users'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['tenants']} empresa(s) gerada(s). Senha dos usuários: {DEFAULT_PASSWORD}"
+        ))
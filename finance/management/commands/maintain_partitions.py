@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from finance.partitioning import (
+    PARTITIONED_TABLES, convert_to_partitioned, ensure_partitions, future_limit, get_setting, is_partitioned,
+    partition_status, partitioning_supported,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria antecipadamente as partições futuras de finance_transaction e finance_payable '
+        '(e move para elas as linhas que caíram na partição DEFAULT).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, help='Intervalos futuros a garantir (padrão: FINANCE_PARTITIONING["AHEAD"]).')
+        parser.add_argument('--interval', choices=['year', 'month'], help='Padrão: FINANCE_PARTITIONING["INTERVAL"].')
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Converte as tabelas ainda não particionadas (bloqueia as tabelas durante a cópia).'
+        )
+        parser.add_argument('--status', action='store_true', help='Apenas lista as partições existentes.')
+
+    def handle(self, *args, **options):
+        if not partitioning_supported(connection):
+            raise CommandError('Particionamento disponível somente no PostgreSQL.')
+
+        if not options['status']:
+            interval = options['interval'] or get_setting('INTERVAL')
+            for table in PARTITIONED_TABLES:
+                with transaction.atomic():
+                    if not is_partitioned(connection, table):
+                        if not options['convert']:
+                            self.stdout.write(f'{table}: não particionada (use --convert).')
+                            continue
+                        self.stdout.write(f'{table}: convertendo para tabela particionada...')
+                        convert_to_partitioned(connection, table, interval)
+
+                    until = future_limit(interval, options['ahead'])
+                    for name, moved in ensure_partitions(connection, table, interval, until=until):
+                        self.stdout.write(f'{table}: partição {name} criada ({moved} linhas movidas da DEFAULT).')
+
+        for table, info in partition_status(connection).items():
+            if not info['partitioned']:
+                continue
+            self.stdout.write(f"\n{table}: {len(info['partitions'])} partições")
+            for partition in info['partitions']:
+                self.stdout.write(f"  {partition['name']:<40} {partition['bounds']:<50} ~{partition['estimated_rows']} linhas")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Company
+from core.sharding import for_company
+from finance.outliers import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula as estatísticas por categoria usadas no alerta de transações fora do padrão '
+        '(necessário depois de importações que não passam pelo detector ou de edições em massa).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: todas).')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id').values_list('id', flat=True)
+        if options['company']:
+            companies = [options['company']]
+
+        total = 0
+        for company_id in companies:
+            with for_company(company_id):
+                total += rebuild_stats(company_id)
+        self.stdout.write(self.style.SUCCESS(f'{total} categoria(s) recalculada(s).'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Company
+from core.sharding import for_company
+from finance.ledger import rebuild_open_balances
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula o saldo em aberto dos clientes (Customer.open_balance) a partir das contas a receber '
+        '(necessário depois de importações ou correções feitas direto no banco).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: todas).')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('id').values_list('id', flat=True)
+        if options['company']:
+            companies = [options['company']]
+
+        total = 0
+        for company_id in companies:
+            with for_company(company_id):
+                total += rebuild_open_balances(company_id)
+        self.stdout.write(self.style.SUCCESS(f'{total} cliente(s) recalculado(s).'))
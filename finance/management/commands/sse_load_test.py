@@ -0,0 +1,152 @@
+import asyncio
+import gc
+import statistics
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Company
+from core.events import get_backend, publish
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Connection:
+    """Cliente SSE falso falando o protocolo ASGI direto com a aplicação (sem servidor nem sockets)."""
+
+    def __init__(self, application, path, cookie):
+        self.application = application
+        self.scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream'), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        self.status = None
+        self.started = asyncio.Event()
+        self.received = asyncio.Queue()
+        self._disconnect = asyncio.Event()
+        self._request_sent = False
+        self.task = None
+
+    def open(self):
+        self.task = asyncio.ensure_future(self.application(self.scope, self._receive, self._send))
+
+    async def _receive(self):
+        if not self._request_sent:
+            self._request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def _send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            self.started.set()
+        elif message['type'] == 'http.response.body' and message.get('body'):
+            self.received.put_nowait((time.perf_counter(), message['body']))
+
+    def close(self):
+        self._disconnect.set()
+
+
+class Command(BaseCommand):
+    help = (
+        'Abre N conexões SSE simultâneas no endpoint de eventos pelo app ASGI, mede a memória por '
+        'conexão e a latência de entrega de um evento a todas, e confere que nada vaza ao desconectar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=5, help='Eventos publicados (latência medida em cada).')
+        parser.add_argument('--company', type=int, help='Id da empresa (padrão: a primeira com usuário).')
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(users__isnull=False).order_by('id').first()
+        if options['company']:
+            company = Company.objects.filter(pk=options['company']).first()
+        if company is None:
+            raise CommandError('Nenhuma empresa com usuário encontrada.')
+        user = company.users.order_by('id').first()
+        cookie = f'access_token={AccessToken.for_user(user)}'
+        asyncio.run(self._run(company, cookie, options['connections'], options['events']))
+
+    async def _run(self, company, cookie, count, events):
+        application = get_asgi_application()
+        path = reverse('event-stream')
+        backend = get_backend()
+        baseline = backend.subscription_count()
+
+        # Aquece imports, conexão com o banco e caches antes de medir a memória
+        warmup = Connection(application, path, cookie)
+        warmup.open()
+        await self._wait_streaming([warmup])
+        warmup.close()
+        await asyncio.gather(warmup.task, return_exceptions=True)
+
+        gc.collect()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        connections = [Connection(application, path, cookie) for _ in range(count)]
+        for connection in connections:
+            connection.open()
+        await self._wait_streaming(connections)
+        opened_in = time.perf_counter() - start
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        statuses = {connection.status for connection in connections}
+        if statuses != {200}:
+            raise CommandError(f'Respostas inesperadas: {statuses}')
+        subscribed = backend.subscription_count() - baseline
+        self.stdout.write(
+            f'{count} conexões abertas em {opened_in:.2f} s, {subscribed} assinaturas, '
+            f'{(after - before) / count / 1024:.1f} KiB por conexão (tracemalloc)'
+        )
+
+        # Latência de fan-out: do publish até a última conexão receber o evento
+        latencies = []
+        for number in range(events):
+            for connection in connections:
+                while not connection.received.empty():
+                    connection.received.get_nowait()
+            sent_at = time.perf_counter()
+            await sync_to_async(publish)(company.pk, 'changes', {'cursor': number}, event_id=number)
+            arrivals = await asyncio.gather(*(self._next_event(connection) for connection in connections))
+            latencies.append((max(arrivals) - sent_at) * 1000)
+        self.stdout.write(
+            f'fan-out para {count} conexões: mediana {statistics.median(latencies):.1f} ms, '
+            f'p95 {percentile(latencies, 0.95):.1f} ms, máx {max(latencies):.1f} ms'
+        )
+
+        for connection in connections:
+            connection.close()
+        await asyncio.gather(*(connection.task for connection in connections), return_exceptions=True)
+        leaked = backend.subscription_count() - baseline
+        if leaked:
+            raise CommandError(f'{leaked} assinatura(s) continuam abertas depois de desconectar.')
+        self.stdout.write(self.style.SUCCESS('Todas as conexões foram encerradas sem deixar assinaturas.'))
+
+    async def _wait_streaming(self, connections, timeout=60):
+        """Espera o cabeçalho e o primeiro bloco (retry:) de cada conexão."""
+        async def first_chunk(connection):
+            await connection.started.wait()
+            await connection.received.get()
+        await asyncio.wait_for(asyncio.gather(*(first_chunk(connection) for connection in connections)), timeout)
+
+    async def _next_event(self, connection, timeout=30):
+        while True:
+            arrived_at, body = await asyncio.wait_for(connection.received.get(), timeout)
+            if body.startswith(b'id:') or b'\nevent:' in body or body.startswith(b'event:'):
+                return arrived_at
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# A função finaplus_normalize é criada em cadastros.0003_search_indexes.
+FORWARD_SQL = [
+    'CREATE INDEX IF NOT EXISTS finance_transaction_description_trgm ON finance_transaction USING gin (finaplus_normalize(description) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS finance_payable_description_trgm ON finance_payable USING gin (finaplus_normalize(description) gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS finance_receivable_description_trgm ON finance_receivable USING gin (finaplus_normalize(description) gin_trgm_ops)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS finance_transaction_description_trgm',
+    'DROP INDEX IF EXISTS finance_payable_description_trgm',
+    'DROP INDEX IF EXISTS finance_receivable_description_trgm',
+]
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0003_search_indexes'),
+        ('finance', '0007_receivable'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)),
+    ]
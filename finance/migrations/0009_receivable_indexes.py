@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_currency_user_language_and_more'),
+        ('cadastros', '0003_search_indexes'),
+        ('finance', '0008_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receivable',
+            index=models.Index(fields=['company', 'due_date'], name='receivable_company_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='receivable',
+            index=models.Index(fields=['company', 'status', 'due_date'], name='receivable_company_status_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_currency_user_language_and_more'),
+        ('finance', '0009_receivable_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payable',
+            index=models.Index(fields=['company', 'status', 'due_date'], name='payable_company_status_idx'),
+        ),
+    ]
@@ -0,0 +1,135 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import migrations
+
+# Cópia do que finance.partitioning fazia quando esta migração foi escrita: o
+# módulo vivo pode mudar (ou sair), e a migração tem de continuar convertendo
+# as tabelas do mesmo jeito.
+PARTITIONED_TABLES = {
+    'finance_transaction': 'transaction_date',
+    'finance_payable': 'due_date',
+}
+
+DEFAULTS = {
+    'ENABLED': False,
+    'INTERVAL': 'year',
+    'AHEAD': 2,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'FINANCE_PARTITIONING', {}).get(name, DEFAULTS[name])
+
+
+def period_start(day, interval):
+    if interval == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_period(start, interval):
+    return start + (relativedelta(months=1) if interval == 'month' else relativedelta(years=1))
+
+
+def partition_name(table, start, interval):
+    if interval == 'month':
+        return f'{table}_m{start:%Y%m}'
+    return f'{table}_y{start:%Y}'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+    return cursor.fetchone() is not None
+
+
+def convert_to_partitioned(connection, cursor, table, interval):
+    """Renomeia a tabela, cria a versão particionada (PK composta) e copia as linhas."""
+    column = PARTITIONED_TABLES[table]
+    legacy = f'{table}_unpartitioned'
+    sequence = f'{table}_id_seq'
+    qn = connection.ops.quote_name
+
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = %s AND indexname NOT LIKE '%%_pkey'",
+        [table],
+    )
+    indexes = cursor.fetchall()
+    # FKs para tabelas particionadas não são possíveis (ex.: payable.transaction_id)
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype = 'f'
+          AND confrelid NOT IN (SELECT partrelid FROM pg_partitioned_table)
+        """,
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+
+    cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+    cursor.execute(
+        f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY RANGE ({qn(column)})'
+    )
+    cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+
+    # Partições dos dados existentes até hoje + AHEAD intervalos, criadas
+    # antes da cópia para que nada passe pela DEFAULT
+    cursor.execute(f'SELECT MIN({qn(column)}), MAX({qn(column)}) FROM {qn(legacy)}')
+    first, last = cursor.fetchone()
+    today = date.today()
+    until = period_start(today, interval)
+    for _ in range(get_setting('AHEAD')):
+        until = next_period(until, interval)
+    until = max(until, period_start(last or today, interval))
+    start = period_start(min(first or today, today), interval)
+    while start <= until:
+        cursor.execute(
+            f'CREATE TABLE {qn(partition_name(table, start, interval))} PARTITION OF {qn(table)} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [start, next_period(start, interval)],
+        )
+        start = next_period(start, interval)
+
+    cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}')
+    # CASCADE remove as FKs que apontavam para a tabela antiga. Só depois
+    # disso os nomes da PK, dos índices e da sequence ficam livres.
+    cursor.execute(f'DROP TABLE {qn(legacy)} CASCADE')
+
+    cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+    cursor.execute(f'SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {qn(table)}), 0) + 1, false)', [sequence])
+    cursor.execute(f'ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)', [sequence])
+    cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + "_pkey")} PRIMARY KEY (id, {qn(column)})')
+
+    # As definições foram lidas antes do rename, então já apontam para `table`
+    for name, definition in indexes:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+    cursor.execute(f'ANALYZE {qn(table)}')
+
+
+def partition_tables(apps, schema_editor):
+    # Opcional: só roda no PostgreSQL com FINANCE_PARTITIONING['ENABLED']
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or not get_setting('ENABLED'):
+        return
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cursor, table):
+                convert_to_partitioned(connection, cursor, table, get_setting('INTERVAL'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0010_payable_indexes'),
+    ]
+
+    operations = [
+        # A volta não desfaz o particionamento: as tabelas continuam compatíveis com o modelo
+        migrations.RunPython(partition_tables, migrations.RunPython.noop),
+    ]
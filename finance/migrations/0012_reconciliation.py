@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('finance', '0011_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='is_reconciled',
+            field=models.BooleanField(default=False, verbose_name='Conciliada'),
+        ),
+        migrations.CreateModel(
+            name='StatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Valor')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='Descrição')),
+                ('external_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='Identificador Externo')),
+                ('is_reconciled', models.BooleanField(default=False, verbose_name='Conciliada')),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_lines', to='finance.bankaccount', verbose_name='Conta Bancária')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statement_lines', to='accounts.company')),
+            ],
+            options={
+                'verbose_name': 'Linha de Extrato',
+                'verbose_name_plural': 'Linhas de Extrato',
+                'ordering': ['date', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=1.0, verbose_name='Pontuação')),
+                ('method', models.CharField(choices=[('auto', 'Automática'), ('manual', 'Manual')], default='auto', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='accounts.company')),
+                ('payable', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='finance.payable')),
+                ('receivable', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='finance.receivable')),
+                ('transaction', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='finance.transaction')),
+                ('statement_line', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='match', to='finance.statementline')),
+            ],
+            options={
+                'verbose_name': 'Conciliação',
+                'verbose_name_plural': 'Conciliações',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='statementline',
+            index=models.Index(fields=['company', 'bank_account', 'date'], name='statement_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statementline',
+            index=models.Index(fields=['bank_account', 'external_id'], name='statement_external_id_idx'),
+        ),
+    ]
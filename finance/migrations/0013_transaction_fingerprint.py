@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:06
+
+import hashlib
+import unicodedata
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+# Cópia de finance.fingerprints.transaction_fingerprint (e de
+# core.search.normalize_text) como era nesta migração: o código vivo pode
+# mudar, e o preenchimento tem de produzir os fingerprints desta versão.
+def _normalize(value):
+    decomposed = unicodedata.normalize('NFKD', str(value or ''))
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).lower().split())
+
+
+def transaction_fingerprint(bank_account_id, credit_card_id, transaction_date, amount, transaction_type, description):
+    signed = Decimal(amount).quantize(Decimal('0.01'))
+    if transaction_type != 'entrada':
+        signed = -signed
+    parts = [
+        f'a{bank_account_id or ""}',
+        f'c{credit_card_id or ""}',
+        transaction_date.isoformat() if hasattr(transaction_date, 'isoformat') else str(transaction_date),
+        str(signed),
+        _normalize(description),
+    ]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Transaction = apps.get_model('finance', 'Transaction')
+    using = schema_editor.connection.alias
+    rows = Transaction.objects.using(using).order_by().values_list(
+        'id', 'bank_account_id', 'credit_card_id', 'transaction_date', 'amount', 'type', 'description'
+    )
+    batch = []
+    for pk, *fields in rows.iterator(chunk_size=BACKFILL_CHUNK_SIZE):
+        batch.append(Transaction(pk=pk, fingerprint=transaction_fingerprint(*fields)))
+        if len(batch) >= BACKFILL_CHUNK_SIZE:
+            Transaction.objects.using(using).bulk_update(batch, ['fingerprint'])
+            batch = []
+    if batch:
+        Transaction.objects.using(using).bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('finance', '0012_reconciliation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        # Preenche antes de criar o índice
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['company', 'fingerprint'], name='transaction_fingerprint_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('finance', '0013_transaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorizationRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Nome')),
+                ('match_type', models.CharField(choices=[('contains', 'Contém'), ('regex', 'Expressão Regular')], default='contains', max_length=10, verbose_name='Tipo de Padrão')),
+                ('pattern', models.CharField(blank=True, max_length=255, verbose_name='Padrão da Descrição')),
+                ('transaction_type', models.CharField(blank=True, choices=[('entrada', 'Entrada'), ('saida', 'Saída')], max_length=7, null=True, verbose_name='Tipo da Transação')),
+                ('min_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Valor Mínimo')),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Valor Máximo')),
+                ('priority', models.PositiveIntegerField(default=100, verbose_name='Prioridade')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativa')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bank_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='finance.bankaccount', verbose_name='Conta Bancária')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categorization_rules', to='finance.category', verbose_name='Categoria')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='categorization_rules', to='accounts.company')),
+                ('credit_card', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='finance.creditcard', verbose_name='Cartão de Crédito')),
+            ],
+            options={
+                'verbose_name': 'Regra de Categorização',
+                'verbose_name_plural': 'Regras de Categorização',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
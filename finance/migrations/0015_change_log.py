@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('finance', '0014_categorization_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+                ('horizon', models.BigIntegerField(default=0)),
+                ('compacted_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='change_feed', to='accounts.company')),
+            ],
+            options={
+                'verbose_name': 'Log de Alterações',
+                'verbose_name_plural': 'Logs de Alterações',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+                ('entity', models.CharField(max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'Criação/Alteração'), ('delete', 'Exclusão')], max_length=6)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_log', to='accounts.company')),
+            ],
+            options={
+                'verbose_name': 'Alteração',
+                'verbose_name_plural': 'Alterações',
+                'indexes': [models.Index(fields=['company', 'entity', 'object_id', 'version'], name='changelog_object_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'version'), name='changelog_company_version_uniq')],
+            },
+        ),
+    ]
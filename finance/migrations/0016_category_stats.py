@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('finance', '0015_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='finance.category')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to='accounts.company')),
+            ],
+            options={
+                'verbose_name': 'Estatística da Categoria',
+                'verbose_name_plural': 'Estatísticas das Categorias',
+            },
+        ),
+    ]
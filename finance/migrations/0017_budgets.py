@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:36
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+        ('finance', '0016_category_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('semanal', 'Semanal'), ('mensal', 'Mensal')], default='mensal', max_length=10, verbose_name='Período')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=15, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Limite')),
+                ('alert_threshold', models.PositiveSmallIntegerField(default=80, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)], verbose_name='Aviso em (%)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativo?')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budgets', to='finance.category', verbose_name='Categoria')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budgets', to='accounts.company')),
+            ],
+            options={
+                'verbose_name': 'Orçamento',
+                'verbose_name_plural': 'Orçamentos',
+                'ordering': ['category__name', 'period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BudgetConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(verbose_name='Início do Período')),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=15, verbose_name='Gasto')),
+                ('notified_level', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('budget', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumptions', to='finance.budget')),
+            ],
+            options={
+                'verbose_name': 'Consumo de Orçamento',
+                'verbose_name_plural': 'Consumos de Orçamento',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='budget',
+            constraint=models.UniqueConstraint(fields=('company', 'category', 'period'), name='budget_unique_category_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='budgetconsumption',
+            constraint=models.UniqueConstraint(fields=('budget', 'period_start'), name='budget_consumption_unique_period'),
+        ),
+    ]
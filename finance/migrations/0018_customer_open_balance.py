@@ -0,0 +1,34 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_open_balance(apps, schema_editor):
+    """Preenche Customer.open_balance com a soma das contas a receber pendentes ou vencidas."""
+    Customer = apps.get_model('cadastros', 'Customer')
+    Receivable = apps.get_model('finance', 'Receivable')
+    open_total = (
+        Receivable.objects.using(schema_editor.connection.alias)
+        .filter(customer=OuterRef('pk'), status__in=['pending', 'overdue'])
+        .order_by()
+        .values('customer')
+        .annotate(total=Sum('amount'))
+        .values('total')
+    )
+    Customer.objects.using(schema_editor.connection.alias).update(
+        open_balance=Coalesce(Subquery(open_total), Value(Decimal('0')), output_field=DecimalField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0004_customer_open_balance'),
+        ('finance', '0017_budgets'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_open_balance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# A busca de transações (TransactionViewSet, ?search=) procura também nas
+# observações; sem este índice o filtro em notes varria a tabela inteira.
+FORWARD_SQL = [
+    'CREATE INDEX IF NOT EXISTS finance_transaction_notes_trgm ON finance_transaction USING gin (finaplus_normalize(notes) gin_trgm_ops)',
+]
+
+REVERSE_SQL = [
+    'DROP INDEX IF EXISTS finance_transaction_notes_trgm',
+]
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0018_customer_open_balance'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD_SQL), run_postgresql(REVERSE_SQL)),
+    ]
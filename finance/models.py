@@ -1,3 +1,4 @@
+from decimal import Decimal
 from django.db import models
 from django.utils import timezone
 from django.db.models.signals import post_init 
@@ -119,11 +120,18 @@ class Transaction(models.Model):
     notes = models.TextField(blank=True, null=True) 
     bank_account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, null=True, blank=True)
     credit_card = models.ForeignKey(CreditCard, on_delete=models.CASCADE, null=True, blank=True, related_name='transactions')
+    is_reconciled = models.BooleanField(default=False, verbose_name="Conciliada")
+    # sha256 de conta/cartão, data, valor e descrição normalizada (ver finance/fingerprints.py)
+    fingerprint = models.CharField(max_length=64, blank=True, default='', editable=False)
     
 
     class Meta:
         verbose_name = "Transação"
         verbose_name_plural = "Transações"
+        indexes = [
+            # Detecção de duplicadas
+            models.Index(fields=['company', 'fingerprint'], name='transaction_fingerprint_idx'),
+        ]
         
 
     def __str__(self):
@@ -135,7 +143,10 @@ def store_original_state(sender, instance, **kwargs):
     instance._original_state = {
         'amount': instance.amount,
         'type': instance.type,
-        'bank_account_id': instance.bank_account_id
+        'bank_account_id': instance.bank_account_id,
+        # Usados no consumo dos orçamentos (finance/budgets.py)
+        'category_id': instance.category_id,
+        'transaction_date': instance.transaction_date,
     }
     
 
@@ -168,6 +179,10 @@ class Payable(models.Model):
         verbose_name = "Conta a Pagar"
         verbose_name_plural = "Contas a Pagar"
         ordering = ['due_date']
+        indexes = [
+            # Aging e compromissos futuros das contas em aberto
+            models.Index(fields=['company', 'status', 'due_date'], name='payable_company_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - Venc: {self.due_date}"
@@ -203,9 +218,227 @@ class Receivable(models.Model):
         verbose_name = "Conta a Receber"
         verbose_name_plural = "Contas a Receber"
         ordering = ['due_date']
+        indexes = [
+            # Listagem por período e resumo/aging por status
+            models.Index(fields=['company', 'due_date'], name='receivable_company_due_idx'),
+            models.Index(fields=['company', 'status', 'due_date'], name='receivable_company_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} - {self.customer.name} - Venc: {self.due_date}"
 
-    
 
+@receiver(post_init, sender=Receivable)
+def store_receivable_state(sender, instance, **kwargs):
+    """Guarda o estado carregado para o saldo em aberto do cliente (finance/ledger.py)."""
+    # __dict__ evita consultas extras quando o campo foi adiado (.only()/.defer())
+    instance._original_state = {
+        'customer_id': instance.__dict__.get('customer_id'),
+        'amount': instance.__dict__.get('amount'),
+        'status': instance.__dict__.get('status'),
+    }
+
+
+class StatementLine(models.Model):
+    """Linha importada do extrato bancário. Valor positivo = crédito, negativo = débito."""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='statement_lines')
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='statement_lines', verbose_name="Conta Bancária")
+    date = models.DateField(verbose_name="Data")
+    amount = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Valor")
+    description = models.CharField(max_length=255, blank=True, verbose_name="Descrição")
+    # Identificador da linha no banco (ex.: FITID do OFX), usado para não importar duas vezes
+    external_id = models.CharField(max_length=100, null=True, blank=True, verbose_name="Identificador Externo")
+    is_reconciled = models.BooleanField(default=False, verbose_name="Conciliada")
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Linha de Extrato"
+        verbose_name_plural = "Linhas de Extrato"
+        ordering = ['date', 'id']
+        indexes = [
+            models.Index(fields=['company', 'bank_account', 'date'], name='statement_account_date_idx'),
+            models.Index(fields=['bank_account', 'external_id'], name='statement_external_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.description} {self.amount}"
+
+
+class ReconciliationMatch(models.Model):
+    """
+    Vínculo entre uma linha do extrato e o lançamento correspondente.
+    As FKs não têm constraint no banco porque finance_transaction e
+    finance_payable podem estar particionadas (ver finance/partitioning.py).
+    """
+    class MethodChoices(models.TextChoices):
+        AUTO = 'auto', 'Automática'
+        MANUAL = 'manual', 'Manual'
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='reconciliation_matches')
+    statement_line = models.OneToOneField(StatementLine, on_delete=models.CASCADE, related_name='match')
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, null=True, blank=True, db_constraint=False, related_name='reconciliation_matches')
+    payable = models.ForeignKey(Payable, on_delete=models.CASCADE, null=True, blank=True, db_constraint=False, related_name='reconciliation_matches')
+    receivable = models.ForeignKey(Receivable, on_delete=models.CASCADE, null=True, blank=True, related_name='reconciliation_matches')
+    score = models.FloatField(default=1.0, verbose_name="Pontuação")
+    method = models.CharField(max_length=10, choices=MethodChoices.choices, default=MethodChoices.AUTO)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Conciliação"
+        verbose_name_plural = "Conciliações"
+
+    def __str__(self):
+        return f"{self.statement_line} ({self.score:.2f})"
+
+
+class CategorizationRule(models.Model):
+    """
+    Regra de categorização automática: transações sem categoria que casam com
+    o padrão da descrição (e com os filtros opcionais de tipo, valor, conta e
+    cartão) recebem a categoria da regra. Vale a regra de menor prioridade.
+    Ver finance/categorization.py.
+    """
+    class MatchTypeChoices(models.TextChoices):
+        CONTAINS = 'contains', 'Contém'
+        REGEX = 'regex', 'Expressão Regular'
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='categorization_rules')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='categorization_rules', verbose_name="Categoria")
+    name = models.CharField(max_length=100, blank=True, verbose_name="Nome")
+    match_type = models.CharField(max_length=10, choices=MatchTypeChoices.choices, default=MatchTypeChoices.CONTAINS, verbose_name="Tipo de Padrão")
+    # Vazio: a regra depende apenas dos demais filtros
+    pattern = models.CharField(max_length=255, blank=True, verbose_name="Padrão da Descrição")
+    transaction_type = models.CharField(max_length=7, choices=Transaction.TRANSACTION_TYPE_CHOICES, null=True, blank=True, verbose_name="Tipo da Transação")
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Valor Mínimo")
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Valor Máximo")
+    bank_account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Conta Bancária")
+    credit_card = models.ForeignKey(CreditCard, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Cartão de Crédito")
+    priority = models.PositiveIntegerField(default=100, verbose_name="Prioridade")
+    is_active = models.BooleanField(default=True, verbose_name="Ativa")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Regra de Categorização"
+        verbose_name_plural = "Regras de Categorização"
+        ordering = ['priority', 'id']
+
+    def __str__(self):
+        return self.name or f"{self.pattern} -> {self.category.name}"
+
+
+class ChangeFeed(models.Model):
+    """Estado do log de alterações da empresa: última versão gravada e horizonte da compactação."""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, related_name='change_feed')
+    version = models.BigIntegerField(default=0)
+    # Entradas com versão até o horizonte podem ter sido removidas: cursores
+    # anteriores a ele precisam recarregar tudo
+    horizon = models.BigIntegerField(default=0)
+    compacted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Log de Alterações"
+        verbose_name_plural = "Logs de Alterações"
+
+    def __str__(self):
+        return f"{self.company_id}: v{self.version} (horizonte {self.horizon})"
+
+
+class ChangeLogEntry(models.Model):
+    """Uma alteração (criação/edição ou exclusão) de um registro. Ver finance/changelog.py."""
+    class OperationChoices(models.TextChoices):
+        UPSERT = 'upsert', 'Criação/Alteração'
+        DELETE = 'delete', 'Exclusão'
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='change_log')
+    version = models.BigIntegerField()
+    entity = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    op = models.CharField(max_length=6, choices=OperationChoices.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Alteração"
+        verbose_name_plural = "Alterações"
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'version'], name='changelog_company_version_uniq'),
+        ]
+        indexes = [
+            # Compactação: entradas substituídas por uma mais nova do mesmo registro
+            models.Index(fields=['company', 'entity', 'object_id', 'version'], name='changelog_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"v{self.version} {self.op} {self.entity}#{self.object_id}"
+
+
+class CategoryStats(models.Model):
+    """
+    Estatísticas acumuladas dos valores das transações de uma categoria
+    (algoritmo de Welford), usadas para detectar valores fora do padrão sem
+    reler o histórico. Ver finance/outliers.py.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, related_name='stats')
+    count = models.PositiveBigIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    # Soma dos quadrados dos desvios em relação à média (variância = m2 / count)
+    m2 = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Estatística da Categoria"
+        verbose_name_plural = "Estatísticas das Categorias"
+
+    def __str__(self):
+        return f"{self.category_id}: n={self.count} média={self.mean:.2f}"
+
+
+class Budget(models.Model):
+    """Orçamento (limite de gastos) de uma categoria por semana ou por mês. Ver finance/budgets.py."""
+    class PeriodChoices(models.TextChoices):
+        WEEKLY = 'semanal', 'Semanal'
+        MONTHLY = 'mensal', 'Mensal'
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='budgets')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='budgets', verbose_name="Categoria")
+    period = models.CharField(max_length=10, choices=PeriodChoices.choices, default=PeriodChoices.MONTHLY, verbose_name="Período")
+    amount = models.DecimalField(max_digits=15, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))], verbose_name="Limite")
+    # Percentual do limite que gera o aviso antecipado (o estouro, 100%, sempre gera)
+    alert_threshold = models.PositiveSmallIntegerField(
+        default=80, validators=[MinValueValidator(1), MaxValueValidator(100)], verbose_name="Aviso em (%)",
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Ativo?")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Orçamento"
+        verbose_name_plural = "Orçamentos"
+        ordering = ['category__name', 'period']
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'category', 'period'], name='budget_unique_category_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} ({self.get_period_display()}): {self.amount}"
+
+
+class BudgetConsumption(models.Model):
+    """Gasto acumulado de um orçamento em um período, mantido incrementalmente a cada escrita de transação."""
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name='consumptions')
+    period_start = models.DateField(verbose_name="Início do Período")
+    spent = models.DecimalField(max_digits=15, decimal_places=2, default=0, verbose_name="Gasto")
+    # Maior nível já avisado no período: 0, o alert_threshold do orçamento ou 100
+    notified_level = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Consumo de Orçamento"
+        verbose_name_plural = "Consumos de Orçamento"
+        constraints = [
+            models.UniqueConstraint(fields=['budget', 'period_start'], name='budget_consumption_unique_period'),
+        ]
+
+    def __str__(self):
+        return f"{self.budget_id} {self.period_start}: {self.spent}"
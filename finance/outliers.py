@@ -0,0 +1,161 @@
+"""
+Detecção de transações com valor fora do padrão da categoria
+(User.notify_large_transactions).
+
+Cada categoria tem uma linha em CategoryStats com contagem, média e soma dos
+quadrados dos desvios, atualizadas a cada transação nova pelo algoritmo de
+Welford (lotes são combinados de uma vez pela fórmula de Chan). Uma
+transação é "grande" quando fica mais de Z_THRESHOLD desvios-padrão acima da
+média da categoria, comparada com as estatísticas de antes dela: O(1) por
+transação, sem consultar o histórico.
+
+Os alertas saem depois do commit: um evento em tempo real 'large_transaction'
+(core.events) e a tarefa 'finance.large_transaction_alerts', que manda um
+e-mail por usuário com a opção ligada. Edições e exclusões não alteram as
+estatísticas; rebuild_category_stats as recalcula a partir das transações.
+"""
+import math
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Variance
+from django.utils import timezone
+
+from core.events import publish
+from core.sharding import tenant_database
+from jobs.queue import enqueue
+from .models import CategoryStats, Transaction
+
+ALERT_TASK = 'finance.large_transaction_alerts'
+
+DEFAULTS = {
+    # Transações já vistas na categoria antes de começar a alertar
+    'MIN_SAMPLES': 20,
+    # Desvios-padrão acima da média para a transação ser considerada grande
+    'Z_THRESHOLD': 3.0,
+    # Valor mínimo para alertar (evita alertas de categorias de valores baixos)
+    'MIN_AMOUNT': 0,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'LARGE_TRANSACTIONS', {}).get(name, DEFAULTS[name])
+
+
+class RunningStats:
+    """Contagem, média e m2 de uma série, atualizáveis valor a valor ou por lote."""
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Combina com as estatísticas de outro lote (Chan et al.)."""
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+
+    def is_outlier(self, value, min_samples, threshold):
+        if self.count < min_samples:
+            return False
+        stddev = self.stddev
+        if stddev == 0:
+            return value > self.mean
+        return (value - self.mean) / stddev > threshold
+
+
+def observe_transactions(company_id, transactions):
+    """
+    Atualiza as estatísticas das categorias com as transações novas (já
+    salvas) e agenda os alertas das que ficaram fora do padrão. Retorna os ids
+    das transações sinalizadas.
+    """
+    by_category = defaultdict(list)
+    for item in transactions:
+        if item.category_id and item.amount is not None:
+            by_category[item.category_id].append(item)
+    if not company_id or not by_category:
+        return []
+
+    min_samples = get_setting('MIN_SAMPLES')
+    threshold = get_setting('Z_THRESHOLD')
+    min_amount = float(get_setting('MIN_AMOUNT'))
+    using = tenant_database()
+    flagged = []
+    with transaction.atomic(using=using):
+        stats = CategoryStats.objects.select_for_update().filter(category_id__in=list(by_category))
+        # Trava as linhas das categorias até o commit para as atualizações não se perderem
+        existing = {row.category_id: row for row in stats}
+        missing = [category_id for category_id in by_category if category_id not in existing]
+        if missing:
+            # Primeira transação da categoria: cria a linha vazia e trava. Se outra requisição
+            # criar a mesma linha ao mesmo tempo, fica a dela e este lote é combinado a ela
+            CategoryStats.objects.bulk_create(
+                [CategoryStats(company_id=company_id, category_id=category_id) for category_id in missing],
+                ignore_conflicts=True,
+            )
+            existing.update({row.category_id: row for row in stats.filter(category_id__in=missing)})
+
+        now = timezone.now()
+        for category_id, items in by_category.items():
+            row = existing[category_id]
+            before = RunningStats(row.count, row.mean, row.m2)
+            batch = RunningStats()
+            for item in items:
+                value = float(item.amount)
+                # Compara com o histórico anterior ao lote, não com o próprio lote
+                if value >= min_amount and before.is_outlier(value, min_samples, threshold):
+                    flagged.append((item, before.mean))
+                batch.add(value)
+            before.merge(batch)
+            row.count, row.mean, row.m2, row.updated_at = before.count, before.mean, before.m2, now
+        CategoryStats.objects.bulk_update(list(existing.values()), ['count', 'mean', 'm2', 'updated_at'])
+
+        if flagged:
+            alerts = [[item.pk, round(mean, 2)] for item, mean in flagged]
+            transaction.on_commit(partial(_emit_alerts, company_id, alerts), using=using)
+    return [item.pk for item, _ in flagged]
+
+
+def _emit_alerts(company_id, alerts):
+    publish(company_id, 'large_transaction', {'ids': [transaction_id for transaction_id, _ in alerts]})
+    enqueue(ALERT_TASK, {'company_id': company_id, 'alerts': alerts}, company=company_id)
+
+
+def rebuild_stats(company_id):
+    """Recalcula as estatísticas da empresa a partir das transações (uma consulta agrupada)."""
+    rows = (
+        Transaction.objects.filter(company_id=company_id, category__isnull=False)
+        .order_by()
+        .values('category_id')
+        .annotate(count=Count('id'), mean=Avg('amount'), variance=Variance('amount'))
+    )
+    stats = [
+        CategoryStats(
+            company_id=company_id, category_id=row['category_id'], count=row['count'], mean=float(row['mean']),
+            m2=float(row['variance'] or 0) * row['count'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic(using=tenant_database()):
+        CategoryStats.objects.filter(company_id=company_id).delete()
+        CategoryStats.objects.bulk_create(stats)
+    return len(stats)
@@ -0,0 +1,253 @@
+"""
+Particionamento declarativo (PostgreSQL) das tabelas de movimentação.
+
+finance_transaction é particionada por transaction_date e finance_payable por
+due_date, em intervalos anuais ou mensais (FINANCE_PARTITIONING['INTERVAL']),
+com uma partição DEFAULT para datas fora das faixas criadas. Consultas com
+filtro de período (DFC, gráficos, faturas) passam a ler só as partições do
+intervalo (partition pruning).
+
+Restrições do PostgreSQL que afetam o modelo:
+- a chave primária passa a ser (id, <coluna de data>); o id continua vindo de
+  uma sequence, então segue único na prática, e o Django continua usando id;
+- não há FK apontando para uma tabela particionada sem incluir a chave de
+  partição, por isso a constraint de finance_payable.transaction_id é removida
+  no banco (o ON DELETE CASCADE continua sendo feito pelo ORM).
+"""
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+
+PARTITIONED_TABLES = {
+    'finance_transaction': 'transaction_date',
+    'finance_payable': 'due_date',
+}
+
+DEFAULTS = {
+    'ENABLED': False,
+    # 'year' ou 'month'
+    'INTERVAL': 'year',
+    # Quantos intervalos futuros manter criados
+    'AHEAD': 2,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'FINANCE_PARTITIONING', {}).get(name, DEFAULTS[name])
+
+
+def partitioning_supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def partitioning_enabled(connection):
+    return bool(get_setting('ENABLED')) and partitioning_supported(connection)
+
+
+def _quote(connection, name):
+    return connection.ops.quote_name(name)
+
+
+def period_start(day, interval):
+    if interval == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_period(start, interval):
+    return start + (relativedelta(months=1) if interval == 'month' else relativedelta(years=1))
+
+
+def future_limit(interval, ahead=None, today=None):
+    """Início do último intervalo que deve existir (hoje + `ahead` intervalos)."""
+    limit = period_start(today or date.today(), interval)
+    for _ in range(get_setting('AHEAD') if ahead is None else ahead):
+        limit = next_period(limit, interval)
+    return limit
+
+
+def partition_name(table, start, interval):
+    if interval == 'month':
+        return f'{table}_m{start:%Y%m}'
+    return f'{table}_y{start:%Y}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def is_partitioned(connection, table):
+    if not partitioning_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(connection, table):
+    """Partições existentes: [(nome, limites, linhas estimadas)]."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples::bigint
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            ORDER BY child.relname
+            """,
+            [table],
+        )
+        return cursor.fetchall()
+
+
+def _date_range(connection, table, column):
+    with connection.cursor() as cursor:
+        column, table = _quote(connection, column), _quote(connection, table)
+        cursor.execute(f'SELECT MIN({column}), MAX({column}) FROM {table}')
+        return cursor.fetchone()
+
+
+def _create_partition(connection, table, column, start, interval):
+    """
+    Cria a partição [start, próximo intervalo). Linhas que já estejam na
+    partição DEFAULT dentro dessa faixa são movidas para a nova partição.
+    """
+    name = partition_name(table, start, interval)
+    end = next_period(start, interval)
+    default = default_partition_name(table)
+    qn = lambda value: _quote(connection, value)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [default])
+        has_default = cursor.fetchone()[0]
+        moved = 0
+        if has_default:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s',
+                [start, end],
+            )
+            moved = cursor.fetchone()[0]
+
+        if moved:
+            cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(default)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+        if moved:
+            cursor.execute(
+                f'INSERT INTO {qn(name)} SELECT * FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s',
+                [start, end],
+            )
+            cursor.execute(
+                f'DELETE FROM {qn(default)} WHERE {qn(column)} >= %s AND {qn(column)} < %s',
+                [start, end],
+            )
+            cursor.execute(f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(default)} DEFAULT')
+    return name, moved
+
+
+def ensure_partitions(connection, table, interval=None, until=None, since=None):
+    """
+    Garante partições de `since` (ou da data mais antiga da tabela) até
+    `until` (padrão: hoje + AHEAD intervalos). Retorna as partições criadas.
+    """
+    interval = interval or get_setting('INTERVAL')
+    column = PARTITIONED_TABLES[table]
+    today = date.today()
+    if until is None:
+        until = future_limit(interval, today=today)
+    if since is None:
+        since = _date_range(connection, table, column)[0] or today
+
+    existing = {row[0] for row in list_partitions(connection, table)}
+    created = []
+    start = period_start(since, interval)
+    while start <= until:
+        if partition_name(table, start, interval) not in existing:
+            created.append(_create_partition(connection, table, column, start, interval))
+        start = next_period(start, interval)
+    return created
+
+
+def convert_to_partitioned(connection, table, interval=None):
+    """
+    Converte uma tabela comum em particionada: renomeia a original, cria a
+    nova estrutura (mesmas colunas, PK composta, índices e FKs), cria as
+    partições cobrindo os dados existentes e copia as linhas.
+    Deve rodar dentro de uma transação (migração ou atomic()).
+    """
+    interval = interval or get_setting('INTERVAL')
+    column = PARTITIONED_TABLES[table]
+    legacy = f'{table}_unpartitioned'
+    sequence = f'{table}_id_seq'
+    qn = lambda value: _quote(connection, value)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s AND indexname NOT LIKE '%%_pkey'",
+            [table],
+        )
+        indexes = cursor.fetchall()
+        # FKs para tabelas particionadas não são possíveis (ex.: payable.transaction_id)
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype = 'f'
+              AND confrelid NOT IN (SELECT partrelid FROM pg_partitioned_table)
+            """,
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}')
+        cursor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({qn(column)})'
+        )
+        cursor.execute(f'CREATE TABLE {qn(default_partition_name(table))} PARTITION OF {qn(table)} DEFAULT')
+
+    # Partições criadas antes da cópia: nada passa pela DEFAULT
+    first, last = _date_range(connection, legacy, column)
+    today = date.today()
+    ensure_partitions(connection, table, interval, since=min(first or today, today), until=max(last or today, today))
+    ensure_partitions(connection, table, interval)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}')
+        # CASCADE remove as FKs que apontavam para a tabela antiga. Só depois
+        # disso os nomes da PK, dos índices e da sequence ficam livres.
+        cursor.execute(f'DROP TABLE {qn(legacy)} CASCADE')
+
+        cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+        cursor.execute(f'SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {qn(table)}), 0) + 1, false)', [sequence])
+        cursor.execute(f'ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)', [sequence])
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + "_pkey")} PRIMARY KEY (id, {qn(column)})')
+
+        # As definições foram lidas antes do rename, então já apontam para `table`
+        for name, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+        cursor.execute(f'ANALYZE {qn(table)}')
+
+
+def partition_status(connection):
+    """Resumo por tabela, usado pelo comando de manutenção e pelo benchmark."""
+    status = {}
+    for table in PARTITIONED_TABLES:
+        partitioned = is_partitioned(connection, table)
+        status[table] = {
+            'partitioned': partitioned,
+            'partitions': [
+                {'name': name, 'bounds': bounds, 'estimated_rows': rows}
+                for name, bounds, rows in list_partitions(connection, table)
+            ] if partitioned else [],
+        }
+    return status
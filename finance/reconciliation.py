@@ -0,0 +1,268 @@
+"""
+Conciliação bancária: importação de extratos e casamento automático das
+linhas com lançamentos (transações e, na falta delas, contas a pagar/receber
+em aberto).
+
+O casamento não compara todas as linhas com todos os lançamentos: os
+candidatos são agrupados por valor em centavos (hash) e, dentro de cada
+grupo, ordenados por data, de modo que a janela de datas sai por busca
+binária (bisect). Só os pares dentro do mesmo valor e da janela recebem uma
+pontuação (proximidade de data + similaridade de trigramas da descrição), e a
+escolha final é gulosa, do maior para o menor score, um-para-um.
+"""
+import csv
+import io
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from core.search import set_similarity, trigrams
+from core.sharding import tenant_atomic
+from .models import Payable, ReconciliationMatch, Receivable, StatementLine, Transaction
+
+DEFAULT_DATE_WINDOW = 3
+DEFAULT_MIN_SCORE = 0.5
+IMPORT_BATCH_SIZE = 2000
+
+# Peso da proximidade de data no score; o restante vem da descrição
+DATE_WEIGHT = 0.6
+
+# Lançamentos já registrados têm prioridade sobre contas ainda em aberto
+KIND_BONUS = {'transaction': 0.05, 'payable': 0.0, 'receivable': 0.0}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y')
+
+
+class StatementImportError(ValueError):
+    pass
+
+
+@dataclass
+class Candidate:
+    kind: str
+    pk: int
+    date: object
+    grams: frozenset
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def parse_amount(value):
+    """Aceita '1234.56', '-1.234,56' e 'R$ 10,00'."""
+    text = str(value).strip().replace('R$', '').replace(' ', '')
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(text).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise StatementImportError(f'Valor inválido: {value}')
+
+
+def parse_date(value):
+    text = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise StatementImportError(f'Data inválida: {value}')
+
+
+def parse_statement_csv(content):
+    """
+    Lê um extrato CSV (',' ou ';') com as colunas data, descricao, valor e,
+    opcionalmente, id. Retorna dicts com date, description, amount e external_id.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    sample = content[:2048]
+    delimiter = ';' if sample.count(';') > sample.count(',') else ','
+    reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
+
+    aliases = {
+        'date': ('data', 'date'),
+        'description': ('descricao', 'descrição', 'description', 'historico', 'histórico'),
+        'amount': ('valor', 'amount'),
+        'external_id': ('id', 'fitid', 'external_id', 'documento'),
+    }
+    columns = {}
+    for header in reader.fieldnames or []:
+        normalized = header.strip().lower()
+        for field, names in aliases.items():
+            if normalized in names:
+                columns[field] = header
+    missing = [field for field in ('date', 'amount') if field not in columns]
+    if missing:
+        raise StatementImportError(f"Colunas obrigatórias ausentes: {', '.join(missing)}.")
+
+    rows = []
+    for line_number, row in enumerate(reader, start=2):
+        try:
+            rows.append({
+                'date': parse_date(row[columns['date']]),
+                'amount': parse_amount(row[columns['amount']]),
+                'description': (row.get(columns.get('description'), '') or '').strip()[:255],
+                'external_id': (row.get(columns.get('external_id'), '') or '').strip() or None,
+            })
+        except StatementImportError as exc:
+            raise StatementImportError(f'Linha {line_number}: {exc}')
+    return rows
+
+
+def import_statement_lines(company, bank_account, rows):
+    """
+    Grava as linhas do extrato em lotes, ignorando as que já foram importadas
+    (mesmo external_id na conta, verificado com uma consulta IN por lote).
+    Retorna (importadas, ignoradas).
+    """
+    imported = skipped = 0
+    with tenant_atomic():
+        for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+            chunk = rows[start:start + IMPORT_BATCH_SIZE]
+            external_ids = {row['external_id'] for row in chunk if row.get('external_id')}
+            existing = set(
+                StatementLine.objects.filter(bank_account=bank_account, external_id__in=external_ids)
+                .values_list('external_id', flat=True)
+            ) if external_ids else set()
+
+            lines = []
+            for row in chunk:
+                external_id = row.get('external_id')
+                if external_id and external_id in existing:
+                    skipped += 1
+                    continue
+                if external_id:
+                    existing.add(external_id)
+                lines.append(StatementLine(company_id=company.pk, bank_account_id=bank_account.pk, **row))
+            StatementLine.objects.bulk_create(lines)
+            imported += len(lines)
+    return imported, skipped
+
+
+def _candidate_index(company, bank_account, start, end):
+    """
+    Lançamentos ainda não conciliados da conta no período, agrupados por valor
+    com sinal (em centavos) e ordenados por data: {centavos: (datas, candidatos)}.
+    """
+    matched = ReconciliationMatch.objects.filter(company=company)
+    buckets = defaultdict(list)
+
+    transactions = Transaction.objects.filter(
+        company=company, bank_account=bank_account, is_reconciled=False,
+        transaction_date__range=(start, end),
+    ).values_list('id', 'transaction_date', 'amount', 'type', 'description')
+    for pk, date, amount, transaction_type, description in transactions.iterator(chunk_size=IMPORT_BATCH_SIZE):
+        signed = amount if transaction_type == 'entrada' else -amount
+        buckets[to_cents(signed)].append(Candidate('transaction', pk, date, frozenset(trigrams(description))))
+
+    payables = Payable.objects.filter(
+        company=company, status__in=['pendente', 'vencido'], due_date__range=(start, end),
+    ).exclude(pk__in=matched.filter(payable__isnull=False).values('payable_id'))
+    for pk, date, amount, description in payables.values_list('id', 'due_date', 'amount', 'description'):
+        buckets[to_cents(-amount)].append(Candidate('payable', pk, date, frozenset(trigrams(description))))
+
+    receivables = Receivable.objects.filter(
+        company=company, status__in=[Receivable.StatusChoices.PENDING, Receivable.StatusChoices.OVERDUE],
+        due_date__range=(start, end),
+    ).exclude(pk__in=matched.filter(receivable__isnull=False).values('receivable_id'))
+    for pk, date, amount, description in receivables.values_list('id', 'due_date', 'amount', 'description'):
+        buckets[to_cents(amount)].append(Candidate('receivable', pk, date, frozenset(trigrams(description))))
+
+    index = {}
+    for cents, candidates in buckets.items():
+        candidates.sort(key=lambda candidate: candidate.date)
+        index[cents] = ([candidate.date for candidate in candidates], candidates)
+    return index
+
+
+def find_matches(lines, index, date_window=DEFAULT_DATE_WINDOW, min_score=DEFAULT_MIN_SCORE):
+    """
+    Pontua os pares (linha, candidato) com o mesmo valor dentro da janela de
+    datas e escolhe, do maior score para o menor, no máximo um candidato por
+    linha e uma linha por candidato. `lines`: [(id, data, valor, descrição)].
+    Retorna [(id_da_linha, candidato, score)].
+    """
+    window = timedelta(days=date_window)
+    pairs = []
+    for line_id, date, amount, description in lines:
+        bucket = index.get(to_cents(amount))
+        if bucket is None:
+            continue
+        dates, candidates = bucket
+        low = bisect_left(dates, date - window)
+        high = bisect_right(dates, date + window)
+        if low == high:
+            continue
+        line_grams = trigrams(description)
+        for candidate in candidates[low:high]:
+            closeness = 1 - abs((candidate.date - date).days) / (date_window + 1)
+            score = (
+                DATE_WEIGHT * closeness
+                + (1 - DATE_WEIGHT) * set_similarity(line_grams, candidate.grams)
+                + KIND_BONUS[candidate.kind]
+            )
+            if score >= min_score:
+                pairs.append((score, line_id, candidate))
+
+    pairs.sort(key=lambda pair: pair[0], reverse=True)
+    used_lines = set()
+    used_candidates = set()
+    matches = []
+    for score, line_id, candidate in pairs:
+        key = (candidate.kind, candidate.pk)
+        if line_id in used_lines or key in used_candidates:
+            continue
+        used_lines.add(line_id)
+        used_candidates.add(key)
+        matches.append((line_id, candidate, min(score, 1.0)))
+    return matches
+
+
+def reconcile(company, bank_account, start, end, date_window=DEFAULT_DATE_WINDOW, min_score=DEFAULT_MIN_SCORE):
+    """
+    Concilia as linhas ainda abertas do extrato da conta no período e grava os
+    vínculos e as marcas de conciliado. Retorna um resumo da execução.
+    """
+    lines = list(
+        StatementLine.objects.filter(
+            company=company, bank_account=bank_account, is_reconciled=False, date__range=(start, end),
+        ).values_list('id', 'date', 'amount', 'description')
+    )
+    margin = timedelta(days=date_window)
+    index = _candidate_index(company, bank_account, start - margin, end + margin)
+    matches = find_matches(lines, index, date_window, min_score)
+
+    by_kind = defaultdict(int)
+    links = []
+    for line_id, candidate, score in matches:
+        by_kind[candidate.kind] += 1
+        links.append(ReconciliationMatch(
+            company=company,
+            statement_line_id=line_id,
+            score=round(score, 4),
+            **{f'{candidate.kind}_id': candidate.pk},
+        ))
+
+    with tenant_atomic():
+        ReconciliationMatch.objects.bulk_create(links, batch_size=IMPORT_BATCH_SIZE)
+        line_ids = [line_id for line_id, _, _ in matches]
+        transaction_ids = [candidate.pk for _, candidate, _ in matches if candidate.kind == 'transaction']
+        for start_index in range(0, len(line_ids), IMPORT_BATCH_SIZE):
+            StatementLine.objects.filter(
+                pk__in=line_ids[start_index:start_index + IMPORT_BATCH_SIZE]
+            ).update(is_reconciled=True)
+        for start_index in range(0, len(transaction_ids), IMPORT_BATCH_SIZE):
+            Transaction.objects.filter(
+                pk__in=transaction_ids[start_index:start_index + IMPORT_BATCH_SIZE]
+            ).update(is_reconciled=True)
+
+    return {
+        'lines': len(lines),
+        'matched': len(matches),
+        'unmatched': len(lines) - len(matches),
+        'by_kind': dict(by_kind),
+    }
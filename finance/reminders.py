@@ -0,0 +1,224 @@
+"""
+Resumo diário de contas a pagar por e-mail (User.notify_bills_reminder).
+
+A tarefa 'finance.bill_reminders' roda uma vez por dia (SEND_HOUR, e se
+reagenda) e enfileira uma 'finance.bill_reminders_shard' por shard, que os
+workers executam em paralelo. Em cada shard o custo não depende do número de
+usuários: uma consulta traz os destinatários (no 'default'), uma traz as
+contas manuais em aberto da janela e uma, agrupada por empresa, cartão e mês,
+traz o valor em aberto das faturas de cartão. O resumo de cada empresa é
+montado uma vez, renderizado para cada usuário e entregue à caixa de saída
+com um único bulk_create.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import User
+from core.sharding import shard_aliases, sharding_enabled
+from jobs.queue import QUEUED, enqueue, jobs
+from notifications.models import OutboundEmail
+from notifications.outbox import queue_emails
+from .models import Payable
+
+DISPATCH_TASK = 'finance.bill_reminders'
+SHARD_TASK = 'finance.bill_reminders_shard'
+
+DEFAULTS = {
+    # Contas que vencem de hoje até DAYS_AHEAD dias
+    'DAYS_AHEAD': 3,
+    # Vencidas há no máximo OVERDUE_DAYS dias também entram
+    'OVERDUE_DAYS': 30,
+    # Itens listados por seção do e-mail (o restante vira "e mais N")
+    'MAX_ITEMS': 20,
+    # Hora local do envio diário
+    'SEND_HOUR': 8,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'BILL_REMINDERS', {}).get(name, DEFAULTS[name])
+
+
+def format_currency(value):
+    """1234.5 -> 'R$ 1.234,50'"""
+    return 'R$ ' + f'{value:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.')
+
+
+def recipients_for_shard(alias):
+    """{empresa: [(id, e-mail, nome)]} dos usuários que querem o lembrete, das empresas do shard."""
+    users = User.objects.using(DEFAULT_DB_ALIAS).filter(
+        is_active=True, notify_bills_reminder=True, company__isnull=False,
+    ).exclude(email='')
+    if sharding_enabled():
+        in_shard = Q(company__shard__database=alias)
+        if alias == DEFAULT_DB_ALIAS:
+            in_shard |= Q(company__shard__isnull=True)
+        users = users.filter(in_shard)
+
+    recipients = defaultdict(list)
+    for user_id, company_id, email, first_name, username in users.order_by('company_id', 'id').values_list(
+        'id', 'company_id', 'email', 'first_name', 'username',
+    ).iterator(chunk_size=5000):
+        recipients[company_id].append((user_id, email, first_name or username))
+    return recipients
+
+
+def bill_due_date(month_start, due_day):
+    """Vencimento da fatura do mês, limitado ao último dia (dia 31 em fevereiro -> 28/29)."""
+    last_day = calendar.monthrange(month_start.year, month_start.month)[1]
+    return month_start.replace(day=min(due_day, last_day))
+
+
+def manual_bills(alias, start, end):
+    """{empresa: [(descrição, valor, vencimento)]} das contas manuais em aberto no período."""
+    bills = defaultdict(list)
+    rows = (
+        Payable.objects.using(alias)
+        .filter(transaction__isnull=True, due_date__range=(start, end))
+        .exclude(status='pago')
+        .order_by('company_id', 'due_date', 'id')
+        .values_list('company_id', 'description', 'amount', 'due_date')
+    )
+    for company_id, description, amount, due_date in rows.iterator(chunk_size=5000):
+        bills[company_id].append((description, amount, due_date))
+    return bills
+
+
+def card_bills(alias, start, end):
+    """
+    {empresa: [(cartão, valor em aberto, vencimento, parcelas)]} das faturas com
+    vencimento no período, em uma consulta agrupada por empresa, cartão e mês.
+    """
+    # O vencimento da fatura cai no mês das parcelas: basta olhar os meses do período
+    rows = (
+        Payable.objects.using(alias)
+        .filter(
+            transaction__credit_card__isnull=False, transaction__credit_card__is_active=True,
+            due_date__gte=start.replace(day=1), due_date__lte=bill_due_date(end, 31),
+        )
+        .exclude(status='pago')
+        .annotate(month=TruncMonth('due_date'))
+        .values(
+            'company_id', 'month', card_name=F('transaction__credit_card__name'),
+            last_digits=F('transaction__credit_card__last_digits'), due_day=F('transaction__credit_card__due_day'),
+        )
+        .annotate(total=Sum('amount'), items=Count('id'))
+        .order_by('company_id', 'month', 'card_name')
+    )
+    bills = defaultdict(list)
+    for row in rows:
+        month = row['month'].date() if isinstance(row['month'], datetime) else row['month']
+        due_date = bill_due_date(month, row['due_day'])
+        if start <= due_date <= end:
+            label = f"{row['card_name']} (final {row['last_digits']})"
+            bills[row['company_id']].append((label, row['total'], due_date, row['items']))
+    for company_bills in bills.values():
+        company_bills.sort(key=lambda bill: bill[2])
+    return bills
+
+
+def company_digest(manual, cards, today, max_items):
+    """Contexto do resumo de uma empresa (o mesmo para todos os usuários dela), ou None se não houver contas."""
+    if not manual and not cards:
+        return None
+    items = [
+        {'description': description, 'amount': format_currency(amount), 'due_date': due_date, 'overdue': due_date < today}
+        for description, amount, due_date in manual
+    ]
+    bills = [
+        {'card': card, 'amount': format_currency(total), 'due_date': due_date, 'items': count, 'overdue': due_date < today}
+        for card, total, due_date, count in cards
+    ]
+    overdue_items = [item for item in items if item['overdue']]
+    upcoming_items = [item for item in items if not item['overdue']]
+    overdue_count = len(overdue_items) + sum(1 for bill in bills if bill['overdue'])
+    total = sum(amount for _, amount, _ in manual) + sum(bill[1] for bill in cards)
+    # Cada seção é cortada em max_items; o "e mais N" de cada uma conta só o que ela deixou de fora
+    return {
+        'overdue_items': overdue_items[:max_items],
+        'hidden_overdue': max(len(overdue_items) - max_items, 0),
+        'upcoming_items': upcoming_items[:max_items],
+        'hidden_upcoming': max(len(upcoming_items) - max_items, 0),
+        'card_bills': bills[:max_items],
+        'hidden_card_bills': max(len(bills) - max_items, 0),
+        'count': len(items) + len(bills),
+        'overdue_count': overdue_count,
+        'total': format_currency(total),
+    }
+
+
+def build_digests(alias, today=None, days_ahead=None):
+    """OutboundEmail (não salvos) com o resumo de cada usuário das empresas do shard."""
+    today = today or timezone.localdate()
+    days_ahead = get_setting('DAYS_AHEAD') if days_ahead is None else days_ahead
+    start = today - timedelta(days=get_setting('OVERDUE_DAYS'))
+    end = today + timedelta(days=days_ahead)
+
+    recipients = recipients_for_shard(alias)
+    if not recipients:
+        return []
+    manual = manual_bills(alias, start, end)
+    cards = card_bills(alias, start, end)
+
+    emails = []
+    for company_id, users in recipients.items():
+        digest = company_digest(manual.get(company_id, ()), cards.get(company_id, ()), today, get_setting('MAX_ITEMS'))
+        if digest is None:
+            continue
+        subject = f"FinançaPlus: {digest['count']} conta(s) a pagar até {end:%d/%m}"
+        if digest['overdue_count']:
+            subject += f" ({digest['overdue_count']} vencida(s))"
+        for _, email, name in users:
+            context = {**digest, 'name': name, 'days_ahead': days_ahead, 'today': today}
+            emails.append(OutboundEmail(
+                recipient=email,
+                subject=subject,
+                body=render_to_string('finance/email/bill_reminder.txt', context),
+                html_body=render_to_string('finance/email/bill_reminder.html', context),
+            ))
+    return emails
+
+
+def send_shard_reminders(alias, today=None, days_ahead=None):
+    """Monta e enfileira os resumos do shard de uma vez. Retorna quantos e-mails."""
+    emails = build_digests(alias, today, days_ahead)
+    # Tudo ou nada: se a tarefa falhar e for repetida, ninguém recebe o resumo duas vezes
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        return queue_emails(emails)
+
+
+def next_run_at(now=None):
+    """Próximo SEND_HOUR no fuso local."""
+    now = timezone.localtime(now)
+    run_at = timezone.make_aware(datetime.combine(now.date(), time(get_setting('SEND_HOUR'))))
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+def schedule_reminders(run_at=None):
+    """Garante a próxima execução diária na fila (sem duplicar)."""
+    run_at = run_at or next_run_at()
+    if jobs().filter(task=DISPATCH_TASK, status=QUEUED).exists():
+        return None
+    return enqueue(DISPATCH_TASK, run_at=run_at)
+
+
+def dispatch_reminders(day=None):
+    """Enfileira o resumo de cada shard para o dia (padrão: hoje)."""
+    day = day or timezone.localdate().isoformat()
+    for alias in shard_aliases():
+        enqueue(SHARD_TASK, {'alias': alias, 'day': day})
+    return len(shard_aliases())
+
+
+def parse_day(value):
+    return date.fromisoformat(value) if value else None
@@ -1,7 +1,13 @@
+import re
+
 from rest_framework import serializers
-from .models import Category, BankAccount, Transaction, CreditCard, Payable, Receivable
+from .models import Category, BankAccount, Transaction, CreditCard, Payable, Receivable, CategorizationRule, Budget
+from .fingerprints import existing_fingerprints, transaction_fingerprint
 from cadastros.serializers import CustomerSerializer 
 
+# Campos que entram no fingerprint de duplicidade (finance/fingerprints.py)
+FINGERPRINT_FIELDS = ('bank_account', 'credit_card', 'transaction_date', 'amount', 'type', 'description')
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -45,6 +51,8 @@ class TransactionSerializer(serializers.ModelSerializer):
         required=False,
         allow_null=True
     )
+    # Confirma o lançamento mesmo que já exista um idêntico
+    allow_duplicate = serializers.BooleanField(write_only=True, required=False, default=False)
 
     class Meta:
         model = Transaction
@@ -61,18 +69,193 @@ class TransactionSerializer(serializers.ModelSerializer):
             'user',
             'company',
             'category_name',
-            'bank_account_name'
+            'bank_account_name',
+            'allow_duplicate'
         ]
         read_only_fields = ['user', 'company']
 
     def validate(self, data):
         """
-        Validação para garantir que ou a conta bancária ou o cartão de crédito seja fornecido.
+        Validação para garantir que ou a conta bancária ou o cartão de crédito seja fornecido
+        e que o lançamento não duplique um já existente.
         """
+        allow_duplicate = data.pop('allow_duplicate', False)
         if not data.get('bank_account') and not data.get('credit_card'):
             raise serializers.ValidationError("É necessário fornecer uma conta bancária ou um cartão de crédito.")
+
+        request = self.context.get('request')
+        company = getattr(getattr(request, 'user', None), 'company', None)
+        if not allow_duplicate and company is not None and self._fingerprint_changed(data):
+            def current(field):
+                return data[field] if field in data else getattr(self.instance, field, None)
+
+            bank_account, credit_card = current('bank_account'), current('credit_card')
+            fingerprint = transaction_fingerprint(
+                bank_account.pk if bank_account else None,
+                credit_card.pk if credit_card else None,
+                current('transaction_date'),
+                current('amount'),
+                current('type'),
+                current('description'),
+            )
+            if existing_fingerprints(company, [fingerprint], exclude_pk=getattr(self.instance, 'pk', None)):
+                raise serializers.ValidationError({
+                    'allow_duplicate': [
+                        "Já existe uma transação com a mesma conta, data, valor e descrição. "
+                        "Envie allow_duplicate=true para confirmar."
+                    ]
+                })
         return data
 
+    def _fingerprint_changed(self, data):
+        """
+        Na criação, sempre; na edição, só se algum campo do fingerprint mudou
+        (mudar só a categoria ou as notas de uma duplicada já confirmada não pede
+        allow_duplicate de novo).
+        """
+        if self.instance is None:
+            return True
+        return any(
+            field in data and data[field] != getattr(self.instance, field)
+            for field in FINGERPRINT_FIELDS
+        )
+
+class BulkTransactionItemSerializer(serializers.Serializer):
+    """
+    Item de uma operação em lote. As referências (categoria, conta, cartão)
+    chegam como ids e são conferidas de uma vez em finance.bulk, sem uma
+    consulta por item.
+    """
+    id = serializers.IntegerField(required=False)
+    description = serializers.CharField(max_length=255)
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
+    transaction_date = serializers.DateField()
+    type = serializers.ChoiceField(choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    category = serializers.IntegerField(required=False, allow_null=True)
+    notes = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    bank_account = serializers.IntegerField(required=False, allow_null=True)
+    credit_card = serializers.IntegerField(required=False, allow_null=True)
+
+
+class BulkTransactionSerializer(serializers.Serializer):
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    delete = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    # Sem ele, criações iguais a transações existentes (ou repetidas no lote) são rejeitadas
+    allow_duplicates = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, data):
+        from .bulk import MAX_BULK_OPERATIONS
+
+        total = len(data['create']) + len(data['update']) + len(data['delete'])
+        if not total:
+            raise serializers.ValidationError("Nenhuma operação informada.")
+        if total > MAX_BULK_OPERATIONS:
+            raise serializers.ValidationError(f"Máximo de {MAX_BULK_OPERATIONS} operações por requisição.")
+        return data
+
+
+class SettlementItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    # Se omitidos, valem os valores gerais do lote
+    amount = serializers.DecimalField(max_digits=15, decimal_places=2, required=False)
+    payment_date = serializers.DateField(required=False)
+    bank_account_id = serializers.IntegerField(required=False)
+
+
+class BulkSettlementSerializer(serializers.Serializer):
+    """Baixa em lote: itens com id e, opcionalmente, valor, data e conta próprios."""
+    items = SettlementItemSerializer(many=True)
+    payment_date = serializers.DateField(required=False)
+    bank_account_id = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        from .bulk import MAX_BULK_OPERATIONS
+
+        if not data['items']:
+            raise serializers.ValidationError("Nenhum item informado.")
+        if len(data['items']) > MAX_BULK_OPERATIONS:
+            raise serializers.ValidationError(f"Máximo de {MAX_BULK_OPERATIONS} itens por requisição.")
+
+        errors = {}
+        for index, item in enumerate(data['items']):
+            item.setdefault('payment_date', data.get('payment_date'))
+            item.setdefault('bank_account_id', data.get('bank_account_id'))
+            if not item['payment_date'] or not item['bank_account_id']:
+                errors[index] = ['Conta bancária e data do pagamento são obrigatórias.']
+        if errors:
+            raise serializers.ValidationError({'items': errors})
+        return data
+
+
+class CategorizationRuleSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = CategorizationRule
+        fields = [
+            'id', 'name', 'category', 'category_name', 'match_type', 'pattern', 'transaction_type',
+            'min_amount', 'max_amount', 'bank_account', 'credit_card', 'priority', 'is_active',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = ['company', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        def current(field):
+            return data[field] if field in data else getattr(self.instance, field, None)
+
+        # Categoria, conta e cartão precisam ser da empresa do usuário
+        company = self.context['request'].user.company
+        for field in ('category', 'bank_account', 'credit_card'):
+            value = data.get(field)
+            if value is not None and value.company_id != company.id:
+                raise serializers.ValidationError({field: "Registro não encontrado."})
+
+        pattern = current('pattern') or ''
+        if current('match_type') == CategorizationRule.MatchTypeChoices.REGEX:
+            try:
+                re.compile(pattern)
+            except re.error as exc:
+                raise serializers.ValidationError({'pattern': f"Expressão regular inválida: {exc}"})
+
+        min_amount, max_amount = current('min_amount'), current('max_amount')
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise serializers.ValidationError({'max_amount': "O valor máximo deve ser maior que o mínimo."})
+
+        criteria = (pattern, current('transaction_type'), min_amount, max_amount, current('bank_account'), current('credit_card'))
+        if not any(value not in (None, '') for value in criteria):
+            raise serializers.ValidationError("Informe ao menos um critério: padrão, tipo, valor, conta ou cartão.")
+        return data
+
+
+class BudgetSerializer(serializers.ModelSerializer):
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = Budget
+        fields = [
+            'id', 'category', 'category_name', 'period', 'amount', 'alert_threshold', 'is_active',
+            'created_at', 'updated_at',
+        ]
+        read_only_fields = ['company', 'created_at', 'updated_at']
+
+    def validate(self, data):
+        company = self.context['request'].user.company
+        category = data.get('category', getattr(self.instance, 'category', None))
+        period = data.get('period', getattr(self.instance, 'period', Budget.PeriodChoices.MONTHLY))
+        if category is not None and category.company_id != company.id:
+            raise serializers.ValidationError({'category': "Registro não encontrado."})
+        if category is not None and category.type != 'saida':
+            raise serializers.ValidationError({'category': "Orçamentos só podem ser criados para categorias de saída."})
+
+        duplicates = Budget.objects.filter(company=company, category=category, period=period)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError("Já existe um orçamento desta categoria para o período.")
+        return data
+
+
 class CreditCardSerializer(serializers.ModelSerializer):
     # Para mostrar o nome da conta na resposta da API
     associated_account_name = serializers.CharField(source='associated_account.name', read_only=True)
@@ -1,15 +1,156 @@
-from django.db.models.signals import post_save, post_delete
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.backends.signals import connection_created
 from django.dispatch import receiver
-from .models import Transaction, Payable, BankAccount
+from core.search import install_sqlite_functions
+from .models import Transaction, Payable, Receivable, BankAccount, ReconciliationMatch, StatementLine, CategorizationRule
+from .fingerprints import fingerprint_for
+from .categorization import get_matcher, invalidate_rules
+from . import changelog
+from .outliers import observe_transactions
+from .budgets import add_spending, apply_budget_deltas
+from .ledger import apply_open_balance_deltas, open_amount
+from core.sharding import company_moved, for_company
 from django.utils import timezone
 from django.db.models import Sum
 from decimal import Decimal
 
+_balance_signals_suppressed = contextvars.ContextVar('finaplus_balance_signals_suppressed', default=False)
+
+
+@contextmanager
+def suppress_balance_signals():
+    """
+    Desliga a atualização de saldo e do consumo dos orçamentos por transação
+    dentro do bloco. Usado pelas operações em lote (finance/bulk.py), que
+    aplicam o saldo uma vez por conta e o consumo uma vez por orçamento.
+    """
+    token = _balance_signals_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _balance_signals_suppressed.reset(token)
+
+
+def balance_signals_suppressed():
+    return _balance_signals_suppressed.get()
+
+
+@receiver(connection_created)
+def register_search_functions(sender, connection, **kwargs):
+    """
+    No SQLite, registra as funções usadas pela busca (no PostgreSQL elas são
+    criadas pelas migrações).
+    """
+    if connection.vendor == 'sqlite':
+        install_sqlite_functions(connection)
+
+@receiver(pre_save, sender=Transaction)
+def set_transaction_fingerprint(sender, instance, **kwargs):
+    """Recalcula o fingerprint usado na detecção de duplicadas."""
+    instance.fingerprint = fingerprint_for(instance)
+
+
+@receiver(pre_save, sender=Transaction)
+def categorize_new_transaction(sender, instance, **kwargs):
+    """Aplica as regras de categorização às transações novas criadas sem categoria."""
+    if instance._state.adding and instance.category_id is None and instance.company_id:
+        category_id = get_matcher(instance.company_id).categorize_transaction(instance)
+        if category_id is not None:
+            instance.category_id = category_id
+
+
+@receiver(post_save, sender=Transaction)
+def detect_large_transaction(sender, instance, created, raw=False, **kwargs):
+    """Atualiza as estatísticas da categoria e alerta se o valor estiver fora do padrão."""
+    if created and not raw:
+        observe_transactions(instance.company_id, [instance])
+
+
+@receiver(post_save, sender=Transaction)
+def update_budget_on_save(sender, instance, created, raw=False, **kwargs):
+    """Soma ao consumo dos orçamentos a diferença de gasto da transação (finance/budgets.py)."""
+    if raw or balance_signals_suppressed():
+        return
+    deltas = defaultdict(Decimal)
+    if not created:
+        original = instance._original_state
+        add_spending(
+            deltas, original.get('category_id'), original.get('type'), original.get('transaction_date'),
+            original.get('amount'), sign=-1,
+        )
+    add_spending(deltas, instance.category_id, instance.type, instance.transaction_date, instance.amount)
+    apply_budget_deltas(instance.company_id, deltas)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_budget_on_delete(sender, instance, **kwargs):
+    if balance_signals_suppressed():
+        return
+    deltas = defaultdict(Decimal)
+    add_spending(deltas, instance.category_id, instance.type, instance.transaction_date, instance.amount, sign=-1)
+    apply_budget_deltas(instance.company_id, deltas)
+
+
+@receiver(post_save, sender=Receivable)
+def update_open_balance_on_save(sender, instance, created, raw=False, **kwargs):
+    """Ajusta o saldo em aberto do cliente (Customer.open_balance, ver finance/ledger.py)."""
+    if raw:
+        return
+    deltas = defaultdict(Decimal)
+    if not created:
+        original = instance._original_state
+        deltas[original['customer_id']] -= open_amount(original['status'], original['amount'])
+    deltas[instance.customer_id] += open_amount(instance.status, instance.amount)
+    apply_open_balance_deltas(instance.company_id, deltas)
+    # Um segundo save() da mesma instância parte do estado já gravado
+    instance._original_state = {'customer_id': instance.customer_id, 'amount': instance.amount, 'status': instance.status}
+
+
+@receiver(post_delete, sender=Receivable)
+def update_open_balance_on_delete(sender, instance, **kwargs):
+    apply_open_balance_deltas(
+        instance.company_id, {instance.customer_id: -open_amount(instance.status, instance.amount)},
+    )
+
+
+@receiver([post_save, post_delete], sender=CategorizationRule)
+def invalidate_categorization_rules(sender, instance, **kwargs):
+    invalidate_rules(instance.company_id)
+
+
+def record_change_on_save(sender, instance, **kwargs):
+    changelog.record_instance(instance, changelog.UPSERT)
+
+
+def record_change_on_delete(sender, instance, **kwargs):
+    changelog.record_instance(instance, changelog.DELETE)
+
+
+# Log de alterações (delta sync) dos modelos expostos à SPA
+for _label in [*changelog.ENTITIES.values(), *changelog.DEPENDENT_MODELS]:
+    post_save.connect(record_change_on_save, sender=_label, dispatch_uid=f'changelog-save-{_label}')
+    post_delete.connect(record_change_on_delete, sender=_label, dispatch_uid=f'changelog-delete-{_label}')
+
+
+@receiver(company_moved)
+def reset_change_feed_on_move(sender, company_id, target, **kwargs):
+    """Os ids mudam ao trocar de shard: o log copiado é descartado e os clientes recarregam tudo."""
+    with for_company(company_id):
+        changelog.reset_feed(company_id)
+
+
 @receiver(post_save, sender=Transaction)
 def update_balance_on_save(sender, instance, created, **kwargs):
     """
     Atualiza o saldo da(s) conta(s) bancária(s) quando uma transação é criada ou alterada.
     """
+    if balance_signals_suppressed():
+        return
+
     # Se a transação foi recém-criada, a lógica é simples
     if created:
         if instance.bank_account:
@@ -57,6 +198,9 @@ def update_balance_on_delete(sender, instance, **kwargs):
     """
     Atualiza o saldo da conta bancária quando uma transação é deletada.
     """
+    if balance_signals_suppressed():
+        return
+
     # --- INÍCIO DA CORREÇÃO ---
     try:
         # Tenta acessar a conta bancária. Se ela não existir (porque está sendo deletada),
@@ -83,6 +227,17 @@ def update_balance_on_delete(sender, instance, **kwargs):
 
 
 
+@receiver(post_delete, sender=ReconciliationMatch)
+def undo_reconciliation_on_delete(sender, instance, **kwargs):
+    """
+    Ao desfazer um vínculo (ou apagar o lançamento conciliado), a linha do
+    extrato e a transação voltam a ficar pendentes de conciliação.
+    """
+    StatementLine.objects.filter(pk=instance.statement_line_id).update(is_reconciled=False)
+    if instance.transaction_id:
+        Transaction.objects.filter(pk=instance.transaction_id).update(is_reconciled=False)
+
+
 
 # @receiver(post_save, sender=Payable)
 # def create_transaction_from_payable(sender, instance, created, **kwargs):
@@ -1,7 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import CategoryViewSet, BankAccountViewSet, TransactionViewSet, CreditCardViewSet, PayableViewSet, ReceivableViewSet, ReceivablesSummaryView, DFCView
-from .views import CreateCardExpenseView, MarkAsPaidView, CardStatementView, CardBillView, MonthlyBillsView, CardBillDetailView, PayCardBillView, DashboardView, IncomeExpenseChartView, CashFlowChartView
+from .views import CreateCardExpenseView, MarkAsPaidView, CardStatementView, CardBillView, MonthlyBillsView, CardBillDetailView, PayCardBillView, DashboardView, IncomeExpenseChartView, CashFlowChartView, GlobalSearchView, PayablesAgingView, CashFlowForecastView
+from .views import StatementImportView, ReconciliationRunView, CategorizationRuleViewSet, ChangeFeedView, event_stream_view
+from .views import BudgetViewSet
 
 
 
@@ -12,6 +14,8 @@ router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'credit-cards', CreditCardViewSet, basename='creditcard')
 router.register(r'payables', PayableViewSet, basename='payable')
 router.register(r'receivables', ReceivableViewSet, basename='receivable')
+router.register(r'categorization-rules', CategorizationRuleViewSet, basename='categorizationrule')
+router.register(r'budgets', BudgetViewSet, basename='budget')
 
 
 
@@ -26,10 +30,17 @@ urlpatterns = [
     path('card-bill-detail/', CardBillDetailView.as_view(), name='card-bill-detail'),
     path('pay-card-bill/', PayCardBillView.as_view(), name='pay-card-bill'),
     path('receivables-summary/', ReceivablesSummaryView.as_view(), name='receivables-summary'),
+    path('payables-aging/', PayablesAgingView.as_view(), name='payables-aging'),
     path('dashboard/', DashboardView.as_view(), name='dashboard-summary'), 
     path('charts/income-expense/', IncomeExpenseChartView.as_view(), name='chart-income-expense'),
     path('charts/cash-flow/', CashFlowChartView.as_view(), name='chart-cash-flow'),
+    path('charts/cash-flow-forecast/', CashFlowForecastView.as_view(), name='chart-cash-flow-forecast'),
     path('charts/dfc/', DFCView.as_view(), name='chart-dfc'),
+    path('search/', GlobalSearchView.as_view(), name='global-search'),
+    path('reconciliation/import/', StatementImportView.as_view(), name='reconciliation-import'),
+    path('reconciliation/run/', ReconciliationRunView.as_view(), name='reconciliation-run'),
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
+    path('events/', event_stream_view, name='event-stream'),
    
     
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from rest_framework.decorators import action
+from django.utils.decorators import method_decorator
 from django.db.models import Sum, Q
 from decimal import Decimal, InvalidOperation  
 from datetime import timedelta 
@@ -6,17 +7,40 @@ from rest_framework.views import APIView
 from django.db.models import ProtectedError
 from django.db import models
 from django.utils import timezone
-from django.db import transaction
+from django.utils.dateparse import parse_date as parse_iso_date
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Category, BankAccount, Transaction, CreditCard, Payable, Receivable
+from rest_framework.exceptions import AuthenticationFailed
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from accounts.authentication import CookieJWTAuthentication
+from .models import Category, BankAccount, Transaction, CreditCard, Payable, Receivable, CategorizationRule, Budget
 from .serializers import CategorySerializer, BankAccountSerializer, TransactionSerializer, CreditCardSerializer, PayableSerializer, ReceivableSerializer
+from .serializers import BulkTransactionSerializer, BulkSettlementSerializer, CategorizationRuleSerializer, BudgetSerializer
+from .bulk import BulkValidationError, SettlementMixin, apply_transaction_batch
+from .budgets import budgets_summary
+from .fingerprints import existing_fingerprints, transaction_fingerprint
+from .changelog import ChangeFeedReset, current_version, read_changes, record_changes
+from .reconciliation import (
+    DEFAULT_DATE_WINDOW, DEFAULT_MIN_SCORE, StatementImportError, import_statement_lines, parse_amount, parse_date,
+    parse_statement_csv, reconcile,
+)
 from dateutil.relativedelta import relativedelta
 from django.db.models.functions import TruncMonth
 from accounts.permissions import CanEditFinance, CanViewFinance
-
-class CategoryViewSet(viewsets.ModelViewSet):
+from .exports import ExportMixin
+from core.search import search_queryset
+from core.db_routers import use_replica
+from core.sharding import TenantAtomicWritesMixin, tenant_atomic
+from core.events import encode_event, event_stream
+from .analytics import filter_receivables, receivables_summary, search_receivables, payables_aging, payables_commitments
+from .analytics import cash_flow_forecast, FORECAST_HORIZONS, FORECAST_GRANULARITIES
+from cadastros.models import Customer, Supplier
+from cadastros.serializers import CustomerSerializer, SupplierSerializer
+
+class CategoryViewSet(TenantAtomicWritesMixin, viewsets.ModelViewSet):
     
     serializer_class = CategorySerializer
     permission_classes = [CanEditFinance]
@@ -44,7 +68,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 
-class BankAccountViewSet(viewsets.ModelViewSet):
+class BankAccountViewSet(TenantAtomicWritesMixin, viewsets.ModelViewSet):
     serializer_class = BankAccountSerializer
     permission_classes = [CanEditFinance]
 
@@ -59,7 +83,8 @@ class BankAccountViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         try:
             # Tenta deletar o objeto normalmente
-            self.perform_destroy(instance)
+            with tenant_atomic():
+                self.perform_destroy(instance)
             # Se a exclusão for bem-sucedida, retorna a resposta padrão 204
             return Response(status=status.HTTP_204_NO_CONTENT)
         except ProtectedError:
@@ -68,12 +93,25 @@ class BankAccountViewSet(viewsets.ModelViewSet):
                 {"detail": "Esta conta não pode ser excluída pois possui transações ou cartões de crédito associados a ela."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-class TransactionViewSet(viewsets.ModelViewSet):
+@method_decorator(use_replica, name='dispatch')
+class TransactionViewSet(TenantAtomicWritesMixin, ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint para visualizar e editar transações.
     """
     serializer_class = TransactionSerializer
     permission_classes = [CanEditFinance]
+    export_filename = 'transacoes'
+    export_fields = (
+        ('id', 'ID'),
+        ('transaction_date', 'Data'),
+        ('description', 'Descrição'),
+        ('type', 'Tipo'),
+        ('amount', 'Valor'),
+        ('category__name', 'Categoria'),
+        ('bank_account__name', 'Conta Bancária'),
+        ('credit_card__name', 'Cartão de Crédito'),
+        ('notes', 'Observações'),
+    )
 
 
     def get_queryset(self):
@@ -92,18 +130,99 @@ class TransactionViewSet(viewsets.ModelViewSet):
         if start_date and end_date:
             queryset = queryset.filter(transaction_date__range=[start_date, end_date])
 
+        # Busca textual (sem acentos) em descrição e observações
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_queryset(queryset, search, ['description', 'notes'])
+
         return queryset
 
     def perform_create(self, serializer):
         
-        with transaction.atomic():
+        with tenant_atomic():
             
             new_transaction = serializer.save(
                 company=self.request.user.company, 
                 user=self.request.user
             )
 
-class CreditCardViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        Cria, altera e exclui várias transações em uma única requisição atômica.
+        Corpo: {"create": [{...}], "update": [{"id": 1, ...campos}], "delete": [ids]}
+        O saldo de cada conta afetada é ajustado uma única vez.
+        """
+        serializer = BulkTransactionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            result = apply_transaction_batch(
+                request.user.company,
+                request.user,
+                create=serializer.validated_data['create'],
+                update=serializer.validated_data['update'],
+                delete=serializer.validated_data['delete'],
+                allow_duplicates=serializer.validated_data['allow_duplicates'],
+            )
+        except BulkValidationError as exc:
+            return Response({'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(result, status=status.HTTP_200_OK)
+
+class CategorizationRuleViewSet(TenantAtomicWritesMixin, viewsets.ModelViewSet):
+    """
+    API endpoint para as regras de categorização automática de transações.
+    """
+    serializer_class = CategorizationRuleSerializer
+    permission_classes = [CanEditFinance]
+
+    def get_queryset(self):
+        return CategorizationRule.objects.filter(company=self.request.user.company).select_related('category')
+
+    def perform_create(self, serializer):
+        serializer.save(company=self.request.user.company)
+
+class BudgetViewSet(TenantAtomicWritesMixin, viewsets.ModelViewSet):
+    """
+    API endpoint para os orçamentos por categoria e o resumo orçado x realizado.
+    """
+    serializer_class = BudgetSerializer
+    permission_classes = [CanEditFinance]
+
+    def get_queryset(self):
+        return Budget.objects.filter(company=self.request.user.company).select_related('category')
+
+    def perform_create(self, serializer):
+        serializer.save(company=self.request.user.company)
+
+    def perform_update(self, serializer):
+        previous = (serializer.instance.category_id, serializer.instance.period)
+        was_active = serializer.instance.is_active
+        budget = serializer.save()
+        # O consumo acumulado era de outra categoria ou de outro período, ou ficou parado enquanto
+        # o orçamento estava inativo (apply_budget_deltas só atualiza os ativos): recomeça no próximo acesso
+        if (budget.category_id, budget.period) != previous or (budget.is_active and not was_active):
+            budget.consumptions.all().delete()
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request, *args, **kwargs):
+        """
+        Orçado x realizado de cada orçamento ativo no período que contém a data.
+        Ex: /api/finance/budgets/summary/?date=2026-03-15 (padrão: hoje)
+        """
+        day = timezone.localdate()
+        if request.query_params.get('date'):
+            # parse_date devolve None fora do formato e levanta ValueError em datas impossíveis (2026-02-30)
+            try:
+                day = parse_iso_date(request.query_params['date'])
+            except ValueError:
+                day = None
+            if day is None:
+                return Response({'error': 'Data inválida. Use o formato AAAA-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(budgets_summary(request.user.company_id, day), status=status.HTTP_200_OK)
+
+class CreditCardViewSet(TenantAtomicWritesMixin, viewsets.ModelViewSet):
     """
     API endpoint para gerenciar cartões de crédito.
     """
@@ -116,13 +235,27 @@ class CreditCardViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(company=self.request.user.company)
 
-class PayableViewSet(viewsets.ModelViewSet):
+@method_decorator(use_replica, name='dispatch')
+class PayableViewSet(TenantAtomicWritesMixin, ExportMixin, SettlementMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerenciar contas a pagar (Payables).
     """
     queryset = Payable.objects.all()
     serializer_class = PayableSerializer
     permission_classes = [IsAuthenticated]
+    settlement_model = Payable
+    export_filename = 'contas-a-pagar'
+    export_fields = (
+        ('id', 'ID'),
+        ('due_date', 'Vencimento'),
+        ('description', 'Descrição'),
+        ('amount', 'Valor'),
+        ('status', 'Status'),
+        ('payment_date', 'Data de Pagamento'),
+        ('category__name', 'Categoria'),
+        ('transaction__credit_card__name', 'Cartão de Crédito'),
+        ('paid_from_account__name', 'Conta de Pagamento'),
+    )
 
     def get_queryset(self):
         """
@@ -147,6 +280,11 @@ class PayableViewSet(viewsets.ModelViewSet):
                 )
             except (ValueError, TypeError):
                 pass
+
+        # Busca textual (sem acentos) na descrição
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_queryset(queryset, search, ['description'])
         
         # A função get_queryset DEVE retornar o queryset
         return queryset.order_by('due_date')
@@ -190,7 +328,7 @@ class MarkAsPaidView(APIView):
         if paid_amount != payable.amount:
             return Response({'error': 'O valor pago deve ser igual ao valor da conta.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        with transaction.atomic():
+        with tenant_atomic():
             # Atualiza a conta a pagar
             payable.status = 'pago'
             payable.save()
@@ -238,7 +376,17 @@ class CreateCardExpenseView(APIView):
         except (InvalidOperation, ValueError):
             return Response({'error': 'Dados inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        with transaction.atomic():
+        if str(request.data.get('allow_duplicate', '')).lower() not in ('1', 'true'):
+            fingerprint = transaction_fingerprint(
+                None, credit_card.pk, transaction_date, amount, 'saida', f"{description} (Compra Original)"
+            )
+            if existing_fingerprints(company, [fingerprint]):
+                return Response(
+                    {'error': 'Esta compra já foi registrada. Envie allow_duplicate=true para confirmar.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+        with tenant_atomic():
             # Cria a transação principal (a compra original)
             # --- BLOCO CORRIGIDO ---
             main_transaction = Transaction.objects.create(
@@ -269,6 +417,7 @@ class CreateCardExpenseView(APIView):
 
         return Response({'success': 'Despesa registrada e parcelas criadas com sucesso!'}, status=status.HTTP_201_CREATED)
     
+@method_decorator(use_replica, name='dispatch')
 class CardStatementView(APIView):
     """
     View para buscar e calcular a fatura de um cartão de crédito
@@ -330,6 +479,7 @@ class CardStatementView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
     
 
+@method_decorator(use_replica, name='dispatch')
 class CardBillView(APIView):
     """
     View para calcular e retornar o valor total da fatura de um cartão
@@ -379,6 +529,7 @@ class CardBillView(APIView):
 
         return Response(response_data, status=status.HTTP_200_OK)
     
+@method_decorator(use_replica, name='dispatch')
 class MonthlyBillsView(APIView):
     """
     View para buscar e agrupar todas as contas a pagar de um mês,
@@ -462,6 +613,7 @@ class MonthlyBillsView(APIView):
 
         return Response(response_data, status=status.HTTP_200_OK)
     
+@method_decorator(use_replica, name='dispatch')
 class CardBillDetailView(APIView):
     """
     View para obter os detalhes completos de uma fatura de cartão de crédito
@@ -526,7 +678,7 @@ class PayCardBillView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
+    @tenant_atomic()
     def post(self, request, *args, **kwargs):
         card_id = request.data.get('card_id')
         month_str = request.data.get('month') # Renomeado para indicar que é string
@@ -575,18 +727,37 @@ class PayCardBillView(APIView):
             transaction_date=payment_date
         )
         
-        payables_to_update.update(status='pago')
+        # update() não dispara os signals: registra as parcelas pagas no log de alterações
+        # (delta sync e o evento 'bill' em tempo real)
+        paid_ids = list(payables_to_update.values_list('id', flat=True))
+        Payable.objects.filter(pk__in=paid_ids).update(status='pago')
+        record_changes(request.user.company_id, 'payable', paid_ids)
 
         return Response({'success': 'Fatura paga com sucesso!'}, status=status.HTTP_200_OK)
     
 
 
-class ReceivableViewSet(viewsets.ModelViewSet):
+@method_decorator(use_replica, name='dispatch')
+class ReceivableViewSet(TenantAtomicWritesMixin, ExportMixin, SettlementMixin, viewsets.ModelViewSet):
     """
     API endpoint para visualizar e gerenciar Contas a Receber.
     """
     serializer_class = ReceivableSerializer
     permission_classes = [IsAuthenticated]
+    settlement_model = Receivable
+    export_filename = 'contas-a-receber'
+    export_fields = (
+        ('id', 'ID'),
+        ('due_date', 'Vencimento'),
+        ('description', 'Descrição'),
+        ('customer__name', 'Cliente'),
+        ('customer__document', 'CPF/CNPJ'),
+        ('amount', 'Valor'),
+        ('status', 'Status'),
+        ('payment_method', 'Forma de Pagamento'),
+        ('payment_date', 'Data de Recebimento'),
+        ('notes', 'Observações'),
+    )
 
     # --- MÉTODO A SER SUBSTITUÍDO ---
     def get_queryset(self):
@@ -596,96 +767,59 @@ class ReceivableViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         queryset = Receivable.objects.filter(company=user.company).select_related('customer')
-
-        # --- INÍCIO DA CORREÇÃO ---
-        # Adicionada a lógica para o filtro por período (mês/ano)
-        period = self.request.query_params.get('period-filter')
-        if period:
-            try:
-                year, month = map(int, period.split('-'))
-                queryset = queryset.filter(due_date__year=year, due_date__month=month)
-            except (ValueError, TypeError):
-                # Ignora o filtro se o formato for inválido
-                pass
-        # --- FIM DA CORREÇÃO ---
-
-        # Filtro por status (lógica existente mantida)
-        status = self.request.query_params.get('status')
-        if status:
-            queryset = queryset.filter(status=status)
-
-        # Filtro por cliente (lógica existente mantida)
-        customer_id = self.request.query_params.get('client_id')
-        if customer_id:
-            queryset = queryset.filter(customer_id=customer_id)
-        
-        # Filtro de busca (lógica existente mantida)
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(description__icontains=search) |
-                Q(customer__name__icontains=search)
-            )
+        queryset = filter_receivables(queryset, self.request.query_params, user.company)
 
         return queryset.order_by('due_date')
     
 
+@method_decorator(use_replica, name='dispatch')
 class ReceivablesSummaryView(APIView):
     """
-    View para fornecer um resumo dos dados de Contas a Receber.
+    View para fornecer um resumo dos dados de Contas a Receber: totais,
+    gráfico por status, aging dos valores em aberto e maiores clientes.
+    Aceita os mesmos filtros da listagem e ?top=N (padrão 5).
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         company = request.user.company
-        queryset = Receivable.objects.filter(company=company)
-
-        # Aplica os mesmos filtros da sua lista principal
-        period = request.query_params.get('period-filter')
-        if period:
-            year, month = map(int, period.split('-'))
-            queryset = queryset.filter(due_date__year=year, due_date__month=month)
+        queryset = filter_receivables(Receivable.objects.filter(company=company), request.query_params, company)
 
-        # --- CORREÇÃO AQUI ---
-        # A variável foi renomeada de 'status' para 'status_filter'
-        status_filter = request.query_params.get('status')
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-
-        customer_id = request.query_params.get('client_id')
-        if customer_id:
-            queryset = queryset.filter(customer_id=customer_id)
+        try:
+            top = min(int(request.query_params.get('top', 5)), 50)
+        except ValueError:
+            return Response({'error': 'top deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        search = request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(description__icontains=search) | Q(customer__name__icontains=search)
-            )
+        response_data = receivables_summary(queryset, timezone.now().date(), top=top)
+        return Response(response_data, status=status.HTTP_200_OK)
+    
 
-        # Calcula os totais
-        total_received = queryset.filter(status='received').aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        total_to_receive_qs = queryset.filter(status__in=['pending', 'overdue'])
-        total_to_receive = total_to_receive_qs.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Dados para o gráfico
-        summary_by_status = queryset.values('status').annotate(total_amount=Sum('amount')).order_by('status')
-        chart_data = {'labels': [], 'data': []}
-        status_map = {'pending': 'Pendente', 'received': 'Recebido', 'overdue': 'Vencido'}
+@method_decorator(use_replica, name='dispatch')
+class PayablesAgingView(APIView):
+    """
+    Relatório de contas a pagar: aging dos valores em aberto (contas avulsas e
+    parcelas de cartão) e compromissos dos próximos meses por categoria e cartão.
+    Ex: /api/finance/payables-aging/?months=12
+    """
+    permission_classes = [IsAuthenticated]
 
-        for item in summary_by_status:
-            chart_data['labels'].append(status_map.get(item['status'], item['status']))
-            chart_data['data'].append(item['total_amount'])
+    def get(self, request, *args, **kwargs):
+        company = request.user.company
+        today = timezone.now().date()
 
-        response_data = {
-            'total_received': total_received,
-            'total_to_receive': total_to_receive,
-            'chart_data': chart_data
-        }
+        try:
+            months = int(request.query_params.get('months', 12))
+        except ValueError:
+            return Response({'error': 'months deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= months <= 24:
+            return Response({'error': 'months deve estar entre 1 e 24.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Agora 'status' refere-se corretamente ao módulo importado
+        response_data = payables_aging(company, today)
+        response_data['commitments'] = payables_commitments(company, today, months=months)
         return Response(response_data, status=status.HTTP_200_OK)
-    
 
+
+@method_decorator(use_replica, name='dispatch')
 class DashboardView(APIView):
     
     permission_classes = [IsAuthenticated]
@@ -780,6 +914,7 @@ class DashboardView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
     
 
+@method_decorator(use_replica, name='dispatch')
 class IncomeExpenseChartView(APIView):
     """
     Fornece dados agregados para o gráfico de Receitas vs. Despesas.
@@ -840,6 +975,7 @@ class IncomeExpenseChartView(APIView):
         }
         return Response(response, status=status.HTTP_200_OK)
     
+@method_decorator(use_replica, name='dispatch')
 class CashFlowChartView(APIView):
     """
     Fornece dados para o gráfico de Fluxo de Caixa Acumulado.
@@ -908,6 +1044,40 @@ class CashFlowChartView(APIView):
         return Response(response, status=status.HTTP_200_OK)
     
 
+@method_decorator(use_replica, name='dispatch')
+class CashFlowForecastView(APIView):
+    """
+    Projeção do fluxo de caixa: parte do saldo atual das contas e aplica as
+    contas a pagar e a receber em aberto pela data de vencimento.
+    Ex: /api/finance/charts/cash-flow-forecast/?days=90&granularity=week
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        granularity = request.query_params.get('granularity', 'day')
+        try:
+            days = int(request.query_params.get('days', 90))
+        except ValueError:
+            return Response({'error': 'days deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if days not in FORECAST_HORIZONS:
+            return Response(
+                {'error': f"days deve ser um de: {', '.join(map(str, FORECAST_HORIZONS))}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if granularity not in FORECAST_GRANULARITIES:
+            return Response(
+                {'error': f"granularity deve ser um de: {', '.join(FORECAST_GRANULARITIES)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response_data = cash_flow_forecast(
+            request.user.company, timezone.now().date(), horizon_days=days, granularity=granularity
+        )
+        return Response(response_data, status=status.HTTP_200_OK)
+    
+
+@method_decorator(use_replica, name='dispatch')
 class DFCView(APIView):
     """
     Fornece dados para a Demonstração do Fluxo de Caixa (DFC).
@@ -1042,3 +1212,231 @@ class DFCView(APIView):
         return {'labels': labels, 'data': data}
 
 
+
+
+
+@method_decorator(use_replica, name='dispatch')
+class GlobalSearchView(APIView):
+    """
+    Busca única em clientes, fornecedores, contas a receber e transações da
+    empresa do usuário, ordenada por relevância.
+    Ex: /api/finance/search/?q=joao silva&limit=5
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        company = request.user.company
+        term = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({'error': 'limit deve ser um número.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(term) < 2:
+            return Response({'error': 'Informe ao menos 2 caracteres para a busca.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        customers = search_queryset(
+            Customer.objects.filter(company=company), term, ['name', 'email', 'document'], rank=True
+        ).order_by('-search_rank', 'name').values('id', 'name', 'document', 'email', 'search_rank')[:limit]
+
+        suppliers = search_queryset(
+            Supplier.objects.filter(company=company), term, ['name', 'trade_name', 'document'], rank=True
+        ).order_by('-search_rank', 'name').values('id', 'name', 'trade_name', 'document', 'search_rank')[:limit]
+
+        receivables = search_receivables(
+            Receivable.objects.filter(company=company), term, company, rank=True
+        ).order_by('-search_rank', 'due_date').values(
+            'id', 'description', 'customer__name', 'amount', 'due_date', 'status', 'search_rank'
+        )[:limit]
+
+        transactions = search_queryset(
+            Transaction.objects.filter(company=company), term, ['description'], rank=True
+        ).order_by('-search_rank', '-transaction_date').values(
+            'id', 'description', 'amount', 'type', 'transaction_date', 'search_rank'
+        )[:limit]
+
+        response_data = {
+            'query': term,
+            'customers': list(customers),
+            'suppliers': list(suppliers),
+            'receivables': list(receivables),
+            'transactions': list(transactions),
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class StatementImportView(APIView):
+    """
+    Importa linhas de extrato bancário para a conciliação.
+    Aceita um arquivo CSV (campo 'file': data;descricao;valor[;id]) ou JSON em
+    'lines': [{"date", "amount", "description", "external_id"}].
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            bank_account = BankAccount.objects.get(id=request.data.get('bank_account_id'), company=request.user.company)
+        except (BankAccount.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Conta bancária não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            upload = request.FILES.get('file')
+            if upload is not None:
+                rows = parse_statement_csv(upload.read())
+            else:
+                rows = [
+                    {
+                        'date': parse_date(line['date']),
+                        'amount': parse_amount(line['amount']),
+                        'description': str(line.get('description') or '')[:255],
+                        'external_id': line.get('external_id') or None,
+                    }
+                    for line in request.data.get('lines') or []
+                ]
+        except (StatementImportError, KeyError) as exc:
+            return Response({'error': f'Extrato inválido: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not rows:
+            return Response({'error': 'Nenhuma linha encontrada no extrato.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        imported, skipped = import_statement_lines(request.user.company, bank_account, rows)
+        return Response({'imported': imported, 'skipped': skipped}, status=status.HTTP_201_CREATED)
+
+
+class ReconciliationRunView(APIView):
+    """
+    Concilia automaticamente as linhas de extrato abertas de uma conta no período.
+    Corpo: bank_account_id, start_date, end_date e, opcionais, date_window (dias) e min_score (0 a 1).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            bank_account = BankAccount.objects.get(id=request.data.get('bank_account_id'), company=request.user.company)
+        except (BankAccount.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Conta bancária não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            start_date = parse_date(request.data.get('start_date'))
+            end_date = parse_date(request.data.get('end_date'))
+            date_window = int(request.data.get('date_window', DEFAULT_DATE_WINDOW))
+            min_score = float(request.data.get('min_score', DEFAULT_MIN_SCORE))
+        except (StatementImportError, ValueError, TypeError):
+            return Response({'error': 'Dados inválidos fornecidos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if start_date > end_date or not 0 <= date_window <= 30 or not 0 <= min_score <= 1:
+            return Response({'error': 'Período, janela (0 a 30 dias) ou score mínimo inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = reconcile(request.user.company, bank_account, start_date, end_date, date_window, min_score)
+        return Response(result, status=status.HTTP_200_OK)
+
+
+class ChangeFeedView(APIView):
+    """
+    Sincronização incremental: alterações da empresa depois do cursor `since`.
+    Sem `since`, devolve apenas o cursor atual (pegue-o antes da carga
+    completa das listas). Criações/alterações vêm com o registro serializado
+    em `data`; exclusões vêm só com entidade e id (tombstones).
+    Cursor anterior ao horizonte da compactação: 410 com reset=true e o
+    cursor atual, e o cliente recarrega as listas.
+    Ex: /api/finance/changes/?since=1520&limit=500
+    """
+    permission_classes = [IsAuthenticated]
+
+    # entidade -> (queryset base, serializer)
+    FEED_SERIALIZERS = {
+        'transaction': (Transaction.objects.select_related('category', 'bank_account'), TransactionSerializer),
+        'payable': (
+            Payable.objects.select_related('category', 'transaction__category', 'transaction__bank_account'),
+            PayableSerializer,
+        ),
+        'receivable': (Receivable.objects.select_related('customer__address'), ReceivableSerializer),
+        'category': (Category.objects.all(), CategorySerializer),
+        'bank_account': (BankAccount.objects.all(), BankAccountSerializer),
+        'credit_card': (CreditCard.objects.select_related('associated_account'), CreditCardSerializer),
+        'customer': (Customer.objects.select_related('address'), CustomerSerializer),
+        'supplier': (Supplier.objects.select_related('address', 'bank_account'), SupplierSerializer),
+    }
+
+    def get(self, request, *args, **kwargs):
+        company = request.user.company
+        since = request.query_params.get('since')
+        if since in (None, ''):
+            return Response({'cursor': current_version(company.id), 'has_more': False, 'changes': []})
+
+        try:
+            since = int(since)
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            return Response({'error': 'Parâmetros since e limit devem ser números inteiros.'}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or (limit is not None and limit < 0):
+            return Response({'error': 'Parâmetros since e limit devem ser números inteiros.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            cursor, has_more, changes = read_changes(company.id, since, limit)
+        except ChangeFeedReset as reset:
+            return Response({'reset': True, 'cursor': reset.version}, status=status.HTTP_410_GONE)
+
+        # Uma consulta por entidade para os registros criados/alterados
+        upserts = {}
+        for entity, object_id, op, version in changes:
+            if op == 'upsert':
+                upserts.setdefault(entity, []).append(object_id)
+        records = {}
+        for entity, ids in upserts.items():
+            queryset, serializer_class = self.FEED_SERIALIZERS[entity]
+            objects = list(queryset.filter(company=company, pk__in=ids))
+            data = serializer_class(objects, many=True, context={'request': request}).data
+            records.update({(entity, obj.pk): item for obj, item in zip(objects, data)})
+
+        items = []
+        for entity, object_id, op, version in changes:
+            data = records.get((entity, object_id))
+            if op == 'upsert' and data is None:
+                # Excluído depois desta entrada (a exclusão vem numa página seguinte)
+                op = 'delete'
+            item = {'entity': entity, 'id': object_id, 'op': op, 'version': version}
+            if op == 'upsert':
+                item['data'] = data
+            items.append(item)
+
+        return Response({'cursor': cursor, 'has_more': has_more, 'changes': items})
+
+
+def _stream_company(request):
+    """Autentica pelo cookie e devolve (empresa, versão atual do log), ou None."""
+    try:
+        auth = CookieJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    if auth is None or auth[0].company_id is None:
+        return None
+    company_id = auth[0].company_id
+    # Lida aqui, com o shard ativado pela autenticação (que não vale durante o streaming)
+    return company_id, current_version(company_id)
+
+
+@require_GET
+async def event_stream_view(request):
+    """
+    Eventos em tempo real da empresa (server-sent events), servidos pelo app
+    ASGI: 'balance', 'bill', 'receivable' e 'changes', todos com o cursor do
+    log de alterações (use GET changes/?since= para buscar os dados).
+    Autentica pelo cookie do JWT, que o EventSource do navegador envia.
+    Ao reconectar com Last-Event-ID atrasado, recebe um 'changes' imediato.
+    """
+    result = await sync_to_async(_stream_company)(request)
+    if result is None:
+        return JsonResponse({'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401)
+    company_id, version = result
+
+    initial = []
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    if last_event_id.isdigit() and version > int(last_event_id):
+        initial.append(encode_event('changes', {'cursor': version}, event_id=version))
+
+    response = StreamingHttpResponse(event_stream(company_id, initial), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Desliga o buffer do nginx para os eventos saírem na hora
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,33 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from jobs.metrics import queue_stats
+
+
+class Command(BaseCommand):
+    help = 'Mostra a profundidade da fila de tarefas e a vazão e as latências por tarefa na janela.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=60, help='Janela em minutos (padrão: 60).')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON.')
+
+    def handle(self, *args, **options):
+        stats = queue_stats(options['window'])
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+
+        counts = stats['counts']
+        self.stdout.write(
+            f"Fila: {stats['ready']} pronta(s) de {counts['pendente']} pendente(s), {counts['executando']} em execução, "
+            f"{counts['concluido']} concluída(s), {counts['falhou']} com falha. "
+            f"Pronta mais antiga esperando há {stats['oldest_ready_seconds']} s."
+        )
+        self.stdout.write(f"Últimos {stats['window_minutes']} minutos:")
+        for task, item in stats['tasks'].items():
+            wait, run = item['wait'], item['run']
+            self.stdout.write(
+                f"{task:<40} {item['done']:>7} ok {item['failed']:>5} falha(s) {item['per_minute']:>8}/min  "
+                f"espera p50 {wait['p50_ms']} p95 {wait['p95_ms']} ms  execução p50 {run['p50_ms']} p95 {run['p95_ms']} ms"
+            )
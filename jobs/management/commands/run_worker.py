@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker, default_worker_name
+
+
+def _run(options, number):
+    name = options['name'] or default_worker_name()
+    if options['processes'] > 1:
+        name = f'{name}/{number}'
+    worker = Worker(
+        name=name, batch_size=options['batch_size'], burst=options['burst'],
+        max_jobs=options['max_jobs'], stats_interval=options['stats_interval'],
+    )
+    worker.install_signal_handlers()
+    return worker.run()
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas em segundo plano da fila no banco. Vários processos (--processes ou '
+        'vários comandos) podem rodar ao mesmo tempo: no PostgreSQL eles usam SKIP LOCKED.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Processos worker (padrão: 1).')
+        parser.add_argument('--batch-size', type=int, help='Tarefas pegas por vez (padrão: JOBS["BATCH_SIZE"]).')
+        parser.add_argument('--burst', action='store_true', help='Encerra quando a fila ficar vazia.')
+        parser.add_argument('--max-jobs', type=int, help='Encerra depois de executar esta quantidade de tarefas.')
+        parser.add_argument('--name', help='Nome do worker (padrão: host:pid).')
+        parser.add_argument('--stats-interval', type=int, default=60, help='Segundos entre os relatórios de vazão.')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            processed = _run(options, 1)
+            self.stdout.write(self.style.SUCCESS(f'{processed} tarefa(s) executada(s).'))
+            return
+
+        # As conexões abertas não podem ser herdadas pelos processos filhos
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_run, args=(options, number), name=f'worker-{number}')
+            for number in range(1, options['processes'] + 1)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def forward(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS(f"{options['processes']} worker(s) encerrado(s)."))
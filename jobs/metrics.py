@@ -0,0 +1,92 @@
+"""
+Métricas da fila calculadas a partir da tabela de Jobs, então valem para
+todos os workers (os histogramas de core.instrumentation são por processo).
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from core.instrumentation import _format_labels
+from .queue import DONE, FAILED, QUEUED, RUNNING, jobs
+
+# Máximo de tarefas da janela usadas no cálculo dos percentis
+MAX_SAMPLE = 50000
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(values):
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+    return {
+        'p50_ms': round(percentile(values, 0.5), 1),
+        'p95_ms': round(percentile(values, 0.95), 1),
+        'max_ms': round(max(values), 1),
+    }
+
+
+def queue_stats(window_minutes=60, now=None):
+    """
+    Profundidade da fila por status, atraso da tarefa pronta mais antiga e,
+    por tarefa, vazão e latências (espera e execução) das terminadas na janela.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(minutes=window_minutes)
+
+    counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+    for row in jobs().order_by().values('status').annotate(total=Count('id')):
+        counts[row['status']] = row['total']
+    ready = jobs().filter(status=QUEUED, run_at__lte=now)
+    oldest = ready.aggregate(oldest=Min('run_at'))['oldest']
+
+    by_task = defaultdict(lambda: {'done': 0, 'failed': 0, 'wait': [], 'run': []})
+    finished = (
+        jobs().filter(status__in=[DONE, FAILED], finished_at__gte=since)
+        .order_by('-finished_at')
+        .values_list('task', 'status', 'run_at', 'started_at', 'finished_at')[:MAX_SAMPLE]
+    )
+    for task, status, run_at, started_at, finished_at in finished:
+        item = by_task[task]
+        item['done' if status == DONE else 'failed'] += 1
+        if started_at:
+            item['wait'].append(max((started_at - run_at).total_seconds() * 1000, 0.0))
+            item['run'].append(max((finished_at - started_at).total_seconds() * 1000, 0.0))
+
+    tasks = {}
+    for task, item in sorted(by_task.items()):
+        total = item['done'] + item['failed']
+        tasks[task] = {
+            'done': item['done'],
+            'failed': item['failed'],
+            'per_minute': round(total / window_minutes, 2),
+            'wait': _summary(item['wait']),
+            'run': _summary(item['run']),
+        }
+
+    return {
+        'window_minutes': window_minutes,
+        'counts': counts,
+        'ready': ready.count(),
+        'oldest_ready_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'tasks': tasks,
+    }
+
+
+def render_prometheus():
+    """Profundidade e atraso da fila como gauges no formato texto do Prometheus."""
+    stats = queue_stats(window_minutes=5)
+    lines = ['# HELP finaplus_jobs Tarefas na fila por status', '# TYPE finaplus_jobs gauge']
+    for status, total in sorted(stats['counts'].items()):
+        lines.append(f'finaplus_jobs{_format_labels((), status=status)} {total}')
+    lines += [
+        '# HELP finaplus_jobs_oldest_ready_seconds Há quanto tempo a tarefa pronta mais antiga espera',
+        '# TYPE finaplus_jobs_oldest_ready_seconds gauge',
+        f"finaplus_jobs_oldest_ready_seconds {stats['oldest_ready_seconds']}",
+    ]
+    return '\n'.join(lines) + '\n'
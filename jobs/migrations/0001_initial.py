@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0004_companyshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=100, verbose_name='Tarefa')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluido', 'Concluído'), ('falhou', 'Falhou')], default='pendente', max_length=20, verbose_name='Status')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Prioridade')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar a partir de')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de tentativas')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último erro')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='accounts.company')),
+            ],
+            options={
+                'verbose_name': 'Tarefa em segundo plano',
+                'verbose_name_plural': 'Tarefas em segundo plano',
+                'ordering': ['priority', 'run_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pendente')), fields=['priority', 'run_at', 'id'], name='job_ready_idx'), models.Index(condition=models.Q(('status', 'executando')), fields=['locked_at'], name='job_running_idx'), models.Index(fields=['status', 'finished_at'], name='job_finished_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils import timezone
+
+from accounts.models import Company
+
+
+class Job(models.Model):
+    """
+    Tarefa em segundo plano guardada no banco 'default' e executada pelo
+    comando run_worker (ver jobs/queue.py).
+    """
+    class StatusChoices(models.TextChoices):
+        QUEUED = 'pendente', 'Pendente'
+        RUNNING = 'executando', 'Executando'
+        DONE = 'concluido', 'Concluído'
+        FAILED = 'falhou', 'Falhou'
+
+    task = models.CharField(max_length=100, verbose_name="Tarefa")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Parâmetros")
+    # Empresa cujo shard é ativado durante a execução (opcional)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.QUEUED, verbose_name="Status")
+    # Menor valor executa primeiro
+    priority = models.SmallIntegerField(default=0, verbose_name="Prioridade")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Executar a partir de")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    max_attempts = models.PositiveSmallIntegerField(default=3, verbose_name="Máximo de tentativas")
+    last_error = models.TextField(blank=True, verbose_name="Último erro")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Tarefa em segundo plano"
+        verbose_name_plural = "Tarefas em segundo plano"
+        ordering = ['priority', 'run_at', 'id']
+        indexes = [
+            # Fila: só as pendentes, na ordem em que os workers as pegam
+            models.Index(
+                fields=['priority', 'run_at', 'id'], name='job_ready_idx',
+                condition=models.Q(status='pendente'),
+            ),
+            # Tarefas presas de workers que morreram
+            models.Index(
+                fields=['locked_at'], name='job_running_idx',
+                condition=models.Q(status='executando'),
+            ),
+            models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ]
@@ -0,0 +1,221 @@
+"""
+Fila de tarefas no banco de dados, sem broker externo.
+
+enqueue() grava um Job; os workers (comando run_worker, quantos processos
+forem necessários) pegam lotes de tarefas prontas com claim() e as executam
+com run_job().
+
+No PostgreSQL o claim (claim_rows, também usado por outras filas) usa
+SELECT ... FOR UPDATE SKIP LOCKED: cada worker trava só as linhas que vai
+pegar e pula as travadas pelos outros, então N workers disputam a fila sem
+esperar uns pelos outros. Sem SKIP LOCKED (SQLite) o claim é otimista: o
+UPDATE só vale para as linhas ainda pendentes, e as que outro worker levou
+antes simplesmente não voltam.
+
+Falhas voltam para a fila com espera exponencial até max_attempts; tarefas
+de workers que morreram (executando há mais que TIMEOUT_SECONDS) são
+devolvidas por requeue_stale().
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.instrumentation import registry
+from core.sharding import for_company, tenant_database
+from .models import Job
+from .registry import Task, UnknownTask, get_task
+
+logger = logging.getLogger('finaplus.jobs')
+
+# A fila fica sempre no banco principal, fora dos shards
+DATABASE = DEFAULT_DB_ALIAS
+
+QUEUED = Job.StatusChoices.QUEUED
+RUNNING = Job.StatusChoices.RUNNING
+DONE = Job.StatusChoices.DONE
+FAILED = Job.StatusChoices.FAILED
+
+DEFAULTS = {
+    # Tarefas pegas por vez por um worker
+    'BATCH_SIZE': 10,
+    # Intervalo de consulta com a fila vazia (cresce até MAX_POLL_SECONDS)
+    'POLL_SECONDS': 1.0,
+    'MAX_POLL_SECONDS': 10.0,
+    # Tempo depois do qual uma tarefa em execução é considerada abandonada
+    'TIMEOUT_SECONDS': 900,
+    # Espera antes da nova tentativa: RETRY_BACKOFF_SECONDS * 2^(tentativa - 1), até MAX_BACKOFF_SECONDS
+    'RETRY_BACKOFF_SECONDS': 30,
+    'MAX_BACKOFF_SECONDS': 3600,
+    # Tarefas concluídas são removidas depois deste prazo
+    'KEEP_DONE_DAYS': 7,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+def jobs():
+    return Job.objects.using(DATABASE)
+
+
+def enqueue(task, payload=None, company=None, priority=None, run_at=None, delay=None, max_attempts=None):
+    """
+    Enfileira a tarefa (objeto Task ou nome registrado). `payload` vira os
+    argumentos nomeados da função e precisa ser serializável em JSON.
+
+    Dentro de uma transação aberta em um shard, o Job só é gravado depois do
+    commit, para a tarefa não rodar antes de os dados que ela vai ler existirem
+    (nesse caso o Job retornado ainda não tem pk).
+    """
+    if not isinstance(task, Task):
+        task = get_task(task)
+    payload = payload or {}
+    json.dumps(payload)
+
+    if run_at is None:
+        run_at = timezone.now()
+    if delay is not None:
+        run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    job = Job(
+        task=task.name,
+        payload=payload,
+        company_id=getattr(company, 'pk', company),
+        priority=task.priority if priority is None else priority,
+        run_at=run_at,
+        max_attempts=task.max_attempts if max_attempts is None else max_attempts,
+    )
+
+    shard = tenant_database()
+    if shard != DATABASE and connections[shard].in_atomic_block:
+        transaction.on_commit(lambda: job.save(using=DATABASE), using=shard)
+    else:
+        job.save(using=DATABASE)
+    return job
+
+
+def claim_rows(queryset, limit, **changes):
+    """
+    Aplica `changes` a até `limit` linhas do queryset (já filtrado pelo estado
+    "pronto") sem disputar com outros workers e retorna os ids pegos. Com
+    SKIP LOCKED, as linhas travadas por outro worker são puladas; sem ele, o
+    UPDATE repete o filtro e as linhas que outro worker já mudou ficam de fora
+    (confira o resultado pelos valores gravados).
+    """
+    database = queryset.db
+    if connections[database].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=database):
+            ids = list(queryset.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            if ids:
+                queryset.model._base_manager.using(database).filter(id__in=ids).update(**changes)
+    else:
+        ids = list(queryset.values_list('id', flat=True)[:limit])
+        if ids:
+            queryset.filter(id__in=ids).update(**changes)
+    return ids
+
+
+def claim(worker, limit=1, now=None):
+    """Marca até `limit` tarefas prontas como em execução por `worker` e as retorna."""
+    now = now or timezone.now()
+    ready = jobs().filter(status=QUEUED, run_at__lte=now).order_by('priority', 'run_at', 'id')
+    ids = claim_rows(
+        ready, limit,
+        status=RUNNING, locked_by=worker, locked_at=now, started_at=now, attempts=F('attempts') + 1,
+    )
+    if not ids:
+        return []
+    return list(jobs().filter(id__in=ids, status=RUNNING, locked_by=worker, locked_at=now).order_by('priority', 'run_at', 'id'))
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        get_setting('RETRY_BACKOFF_SECONDS') * 2 ** max(attempts - 1, 0), get_setting('MAX_BACKOFF_SECONDS'),
+    ))
+
+
+def run_job(job):
+    """Executa uma tarefa já pega por claim() e grava o resultado. Retorna o status final."""
+    started = time.perf_counter()
+    try:
+        task = get_task(job.task)
+        if job.company_id:
+            with for_company(job.company_id):
+                task(**job.payload)
+        else:
+            task(**job.payload)
+    except Exception as exc:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts and not isinstance(exc, UnknownTask):
+            status = QUEUED
+            changes = {'run_at': now + retry_delay(job.attempts), 'locked_by': '', 'locked_at': None}
+            logger.warning('Tarefa %s #%s falhou (tentativa %s de %s)', job.task, job.pk, job.attempts, job.max_attempts)
+        else:
+            status = FAILED
+            changes = {'finished_at': now}
+            logger.error('Tarefa %s #%s falhou definitivamente:\n%s', job.task, job.pk, error)
+        changes['last_error'] = error
+    else:
+        status = DONE
+        changes = {'finished_at': timezone.now(), 'last_error': ''}
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # Só grava se a tarefa ainda for deste worker (requeue_stale pode tê-la devolvido à fila)
+    updated = jobs().filter(pk=job.pk, status=RUNNING, locked_by=job.locked_by, locked_at=job.locked_at).update(
+        status=status, **changes,
+    )
+    if not updated:
+        logger.warning('Tarefa %s #%s terminou depois de ser devolvida à fila', job.task, job.pk)
+
+    registry.observe(
+        'finaplus_job_duration_ms', elapsed_ms,
+        help_text='Tempo de execução das tarefas em segundo plano (ms)', task=job.task, status=status,
+    )
+    return status
+
+
+def observe_wait(job):
+    """Espera na fila: do momento em que a tarefa ficou pronta até ser pega (ms)."""
+    wait_ms = max((job.started_at - job.run_at).total_seconds() * 1000, 0.0)
+    registry.observe(
+        'finaplus_job_wait_ms', wait_ms,
+        help_text='Espera das tarefas na fila depois de prontas (ms)', task=job.task,
+    )
+    return wait_ms
+
+
+def release(job_ids):
+    """Devolve à fila tarefas pegas e não iniciadas (worker encerrando), sem gastar tentativa."""
+    if job_ids:
+        jobs().filter(id__in=job_ids, status=RUNNING).update(
+            status=QUEUED, locked_by='', locked_at=None, started_at=None, attempts=F('attempts') - 1,
+        )
+
+
+def requeue_stale(timeout=None, now=None):
+    """Devolve à fila (ou marca como falha) as tarefas em execução há mais que o timeout. Retorna quantas."""
+    now = now or timezone.now()
+    timeout = get_setting('TIMEOUT_SECONDS') if timeout is None else timeout
+    stale = jobs().filter(status=RUNNING, locked_at__lt=now - timedelta(seconds=timeout))
+    error = 'Tempo limite excedido: o worker foi interrompido ou a tarefa travou.'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(status=FAILED, finished_at=now, last_error=error)
+    requeued = stale.update(status=QUEUED, locked_by='', locked_at=None, run_at=now, last_error=error)
+    if failed or requeued:
+        logger.warning('%s tarefa(s) abandonada(s) devolvida(s) à fila, %s marcada(s) como falha', requeued, failed)
+    return requeued + failed
+
+
+def purge_done(days=None, now=None):
+    """Remove as tarefas concluídas há mais que `days` dias. As que falharam ficam para análise."""
+    days = get_setting('KEEP_DONE_DAYS') if days is None else days
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    deleted, _ = jobs().filter(status=DONE, finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,59 @@
+"""
+Registro das tarefas que podem ser enfileiradas.
+
+Cada app declara as suas em um módulo jobs.py (carregado pelo JobsConfig):
+
+    from jobs.registry import task
+
+    @task('finance.recalcular_saldos', max_attempts=5)
+    def recalcular_saldos(company_id):
+        ...
+
+A função recebe o payload do Job como argumentos nomeados, então ele precisa
+ser serializável em JSON.
+"""
+from dataclasses import dataclass
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: object
+    priority: int = 0
+    max_attempts: int = 3
+
+    def __call__(self, **payload):
+        return self.func(**payload)
+
+    def enqueue(self, **kwargs):
+        from .queue import enqueue
+        return enqueue(self, **kwargs)
+
+
+_tasks = {}
+
+
+def task(name=None, priority=0, max_attempts=3):
+    """Decorador que registra a função como tarefa; o nome padrão é módulo.função."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        if task_name in _tasks and _tasks[task_name].func is not func:
+            raise ValueError(f'Tarefa {task_name} registrada duas vezes.')
+        registered = _tasks[task_name] = Task(task_name, func, priority, max_attempts)
+        return registered
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _tasks[name]
+    except KeyError:
+        raise UnknownTask(f'Tarefa não registrada: {name}')
+
+
+def registered_tasks():
+    return dict(_tasks)
@@ -0,0 +1,132 @@
+"""
+Loop de um processo worker: pega lotes de tarefas, executa, e de tempos em
+tempos devolve as tarefas abandonadas e limpa as concluídas. Encerra com
+SIGTERM/SIGINT depois da tarefa em andamento, devolvendo o resto do lote.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import statistics
+import threading
+import time
+
+from django.db import close_old_connections, connections
+
+from .queue import DONE, claim, get_setting, observe_wait, purge_done, release, requeue_stale, run_job
+
+logger = logging.getLogger('finaplus.jobs')
+
+# Intervalo entre as rotinas de manutenção (abandonadas e limpeza)
+MAINTENANCE_SECONDS = 60
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class WorkerStats:
+    """Vazão e latências do worker desde o último relatório."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.monotonic()
+        self.done = 0
+        self.failed = 0
+        self.wait_ms = []
+        self.run_ms = []
+
+    def add(self, status, wait_ms, run_ms):
+        if status == DONE:
+            self.done += 1
+        else:
+            self.failed += 1
+        self.wait_ms.append(wait_ms)
+        self.run_ms.append(run_ms)
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        total = self.done + self.failed
+        return {
+            'processed': total,
+            'failed': self.failed,
+            'jobs_per_second': round(total / elapsed, 3),
+            'wait_p50_ms': round(statistics.median(self.wait_ms), 1) if self.wait_ms else None,
+            'wait_max_ms': round(max(self.wait_ms), 1) if self.wait_ms else None,
+            'run_p50_ms': round(statistics.median(self.run_ms), 1) if self.run_ms else None,
+            'run_max_ms': round(max(self.run_ms), 1) if self.run_ms else None,
+        }
+
+
+class Worker:
+    def __init__(self, name=None, batch_size=None, burst=False, max_jobs=None, stats_interval=60, log=None):
+        self.name = name or default_worker_name()
+        self.batch_size = batch_size or get_setting('BATCH_SIZE')
+        self.burst = burst
+        self.max_jobs = max_jobs
+        self.stats_interval = stats_interval
+        self.log = log or logger.info
+        self.stats = WorkerStats()
+        self.processed = 0
+        self._stop = threading.Event()
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def run(self):
+        poll = get_setting('POLL_SECONDS')
+        idle = poll
+        last_maintenance = last_report = 0.0
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                now = time.monotonic()
+                if now - last_maintenance >= MAINTENANCE_SECONDS:
+                    requeue_stale()
+                    purge_done()
+                    last_maintenance = now
+                if self.stats_interval and now - last_report >= self.stats_interval:
+                    if last_report:
+                        self._report()
+                    last_report = now
+
+                limit = self.batch_size
+                if self.max_jobs:
+                    limit = min(limit, self.max_jobs - self.processed)
+                batch = claim(self.name, limit)
+                if not batch:
+                    if self.burst:
+                        break
+                    # Fila vazia: consulta com intervalo crescente para não martelar o banco
+                    self._stop.wait(idle)
+                    idle = min(idle * 2, get_setting('MAX_POLL_SECONDS'))
+                    continue
+                idle = poll
+
+                for index, job in enumerate(batch):
+                    if self._stop.is_set():
+                        release([pending.pk for pending in batch[index:]])
+                        break
+                    wait_ms = observe_wait(job)
+                    started = time.perf_counter()
+                    status = run_job(job)
+                    self.stats.add(status, wait_ms, (time.perf_counter() - started) * 1000)
+                    self.processed += 1
+                if self.max_jobs and self.processed >= self.max_jobs:
+                    break
+        finally:
+            self._report()
+            connections.close_all()
+        return self.processed
+
+    def _report(self):
+        if self.stats.done or self.stats.failed:
+            self.log(json.dumps({'event': 'worker_stats', 'worker': self.name, **self.stats.report()}))
+        self.stats.reset()
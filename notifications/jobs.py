@@ -0,0 +1,10 @@
+"""Tarefas em segundo plano do app notifications (ver jobs/registry.py)."""
+from jobs.registry import task
+
+from .outbox import SEND_TASK, send_pending
+
+
+# As novas tentativas são por e-mail (a própria caixa de saída as agenda)
+@task(SEND_TASK, priority=-10, max_attempts=1)
+def send_outbox():
+    send_pending()
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Envia agora os e-mails prontos da caixa de saída, em lotes por uma única conexão.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Padrão: EMAIL_OUTBOX["BATCH_SIZE"].')
+        parser.add_argument('--rate', type=float, help='E-mails por segundo (padrão: EMAIL_OUTBOX["RATE_PER_SECOND"]).')
+        parser.add_argument('--max-seconds', type=int, help='Padrão: EMAIL_OUTBOX["MAX_RUN_SECONDS"].')
+
+    def handle(self, *args, **options):
+        sent, failed = send_pending(
+            batch_size=options['batch_size'], rate=options['rate'], max_seconds=options['max_seconds'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{sent} e-mail(s) enviado(s), {failed} falha(s).'))
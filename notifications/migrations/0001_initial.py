@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='Destinatário')),
+                ('from_email', models.CharField(blank=True, max_length=255, verbose_name='Remetente')),
+                ('subject', models.CharField(max_length=255, verbose_name='Assunto')),
+                ('body', models.TextField(verbose_name='Mensagem')),
+                ('html_body', models.TextField(blank=True, verbose_name='Mensagem em HTML')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('falhou', 'Falhou')], default='pendente', max_length=20, verbose_name='Status')),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Enviar a partir de')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último erro')),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado em')),
+            ],
+            options={
+                'verbose_name': 'E-mail de saída',
+                'verbose_name_plural': 'E-mails de saída',
+                'ordering': ['send_after', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pendente')), fields=['send_after', 'id'], name='outbox_ready_idx'), models.Index(condition=models.Q(('status', 'enviando')), fields=['locked_at'], name='outbox_sending_idx'), models.Index(fields=['status', 'sent_at'], name='outbox_sent_idx')],
+            },
+        ),
+    ]
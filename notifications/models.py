@@ -0,0 +1,38 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboundEmail(models.Model):
+    """E-mail na caixa de saída, entregue em lotes pelo worker (ver notifications/outbox.py)."""
+    class StatusChoices(models.TextChoices):
+        QUEUED = 'pendente', 'Pendente'
+        SENDING = 'enviando', 'Enviando'
+        SENT = 'enviado', 'Enviado'
+        FAILED = 'falhou', 'Falhou'
+
+    recipient = models.EmailField(verbose_name="Destinatário")
+    from_email = models.CharField(max_length=255, blank=True, verbose_name="Remetente")
+    subject = models.CharField(max_length=255, verbose_name="Assunto")
+    body = models.TextField(verbose_name="Mensagem")
+    html_body = models.TextField(blank=True, verbose_name="Mensagem em HTML")
+    status = models.CharField(max_length=20, choices=StatusChoices.choices, default=StatusChoices.QUEUED, verbose_name="Status")
+    send_after = models.DateTimeField(default=timezone.now, verbose_name="Enviar a partir de")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    last_error = models.TextField(blank=True, verbose_name="Último erro")
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Enviado em")
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "E-mail de saída"
+        verbose_name_plural = "E-mails de saída"
+        ordering = ['send_after', 'id']
+        indexes = [
+            models.Index(fields=['send_after', 'id'], name='outbox_ready_idx', condition=models.Q(status='pendente')),
+            models.Index(fields=['locked_at'], name='outbox_sending_idx', condition=models.Q(status='enviando')),
+            models.Index(fields=['status', 'sent_at'], name='outbox_sent_idx'),
+        ]
@@ -0,0 +1,205 @@
+"""
+Caixa de saída de e-mails.
+
+queue_email()/queue_emails() só gravam OutboundEmail e agendam a tarefa
+'notifications.send_outbox' (uma por vez na fila); a requisição não espera o
+SMTP. O worker esvazia a caixa em lotes por uma única conexão com o servidor
+de e-mail, reaberta só se cair, respeitando RATE_PER_SECOND (por processo).
+Falhas voltam para a caixa com espera exponencial até MAX_ATTEMPTS.
+
+Os lotes são pegos com jobs.queue.claim_rows (SKIP LOCKED no PostgreSQL),
+então vários workers podem enviar ao mesmo tempo sem duplicar e-mails.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from jobs.queue import QUEUED as JOB_QUEUED, claim_rows, enqueue, jobs
+from .models import OutboundEmail
+
+logger = logging.getLogger('finaplus.notifications')
+
+DATABASE = DEFAULT_DB_ALIAS
+SEND_TASK = 'notifications.send_outbox'
+
+QUEUED = OutboundEmail.StatusChoices.QUEUED
+SENDING = OutboundEmail.StatusChoices.SENDING
+SENT = OutboundEmail.StatusChoices.SENT
+FAILED = OutboundEmail.StatusChoices.FAILED
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    # Limite de envio por processo (0 = sem limite)
+    'RATE_PER_SECOND': 10,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF_SECONDS': 60,
+    'MAX_BACKOFF_SECONDS': 3600,
+    # Tempo máximo de uma execução da tarefa; o que sobrar vai para a próxima
+    'MAX_RUN_SECONDS': 300,
+    # E-mails "enviando" há mais tempo que isso voltam para a caixa (worker interrompido)
+    'TIMEOUT_SECONDS': 600,
+    'KEEP_SENT_DAYS': 30,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'EMAIL_OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+def outbox():
+    return OutboundEmail.objects.using(DATABASE)
+
+
+def queue_email(recipient, subject, body, html_body='', from_email=None, send_after=None):
+    """Coloca um e-mail na caixa de saída e agenda o envio."""
+    email = outbox().create(
+        recipient=recipient, subject=subject, body=body, html_body=html_body,
+        from_email=from_email or '', send_after=send_after or timezone.now(),
+    )
+    schedule_delivery()
+    return email
+
+
+def queue_emails(emails, batch_size=1000):
+    """Coloca vários OutboundEmail (não salvos) na caixa com bulk_create e agenda um único envio."""
+    created = outbox().bulk_create(emails, batch_size=batch_size)
+    if created:
+        schedule_delivery()
+    return len(created)
+
+
+def schedule_delivery(run_at=None):
+    """Agenda a tarefa de envio, a menos que já haja uma na fila para até `run_at`."""
+    run_at = run_at or timezone.now()
+
+    def schedule():
+        if not jobs().filter(task=SEND_TASK, status=JOB_QUEUED, run_at__lte=run_at).exists():
+            enqueue(SEND_TASK, run_at=run_at)
+    # Dentro de uma transação, os e-mails só ficam visíveis para o worker depois do commit
+    transaction.on_commit(schedule, using=DATABASE)
+
+
+class RateLimiter:
+    """Espaça as chamadas de wait() para no máximo `rate` por segundo."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1 / rate if rate else 0
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = self.clock()
+        if self._next > now:
+            self.sleep(self._next - now)
+            now = self._next
+        self._next = now + self.interval
+
+
+def build_message(email, connection=None):
+    message = EmailMultiAlternatives(
+        email.subject, email.body, email.from_email or settings.DEFAULT_FROM_EMAIL, [email.recipient],
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(
+        get_setting('RETRY_BACKOFF_SECONDS') * 2 ** max(attempts - 1, 0), get_setting('MAX_BACKOFF_SECONDS'),
+    ))
+
+
+def claim_emails(worker, limit, now=None):
+    now = now or timezone.now()
+    ready = outbox().filter(status=QUEUED, send_after__lte=now).order_by('send_after', 'id')
+    ids = claim_rows(ready, limit, status=SENDING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1)
+    if not ids:
+        return []
+    return list(outbox().filter(id__in=ids, status=SENDING, locked_by=worker, locked_at=now).order_by('send_after', 'id'))
+
+
+def release_stale(now=None):
+    now = now or timezone.now()
+    return outbox().filter(
+        status=SENDING, locked_at__lt=now - timedelta(seconds=get_setting('TIMEOUT_SECONDS')),
+    ).update(status=QUEUED, locked_by='', locked_at=None)
+
+
+def purge_sent(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=get_setting('KEEP_SENT_DAYS'))
+    deleted, _ = outbox().filter(status=SENT, sent_at__lt=cutoff).delete()
+    return deleted
+
+
+def _mark_failed(email, error):
+    now = timezone.now()
+    if email.attempts < get_setting('MAX_ATTEMPTS'):
+        changes = {'status': QUEUED, 'send_after': now + retry_delay(email.attempts), 'locked_by': '', 'locked_at': None}
+    else:
+        changes = {'status': FAILED}
+        logger.error('E-mail #%s para %s descartado depois de %s tentativas: %s', email.pk, email.recipient, email.attempts, error)
+    outbox().filter(pk=email.pk, status=SENDING).update(last_error=error, **changes)
+
+
+def send_pending(worker='outbox', batch_size=None, rate=None, max_seconds=None, connection=None):
+    """
+    Envia os e-mails prontos em lotes pela mesma conexão até a caixa esvaziar
+    ou o tempo acabar. Retorna (enviados, falhas).
+    """
+    batch_size = batch_size or get_setting('BATCH_SIZE')
+    limiter = RateLimiter(get_setting('RATE_PER_SECOND') if rate is None else rate)
+    deadline = time.monotonic() + (max_seconds or get_setting('MAX_RUN_SECONDS'))
+    connection = connection or get_connection()
+
+    release_stale()
+    purge_sent()
+    sent = failed = 0
+    is_open = False
+    try:
+        while time.monotonic() < deadline:
+            batch = claim_emails(worker, batch_size)
+            if not batch:
+                break
+            delivered = []
+            for email in batch:
+                limiter.wait()
+                try:
+                    if not is_open:
+                        connection.open()
+                        is_open = True
+                    connection.send_messages([build_message(email, connection)])
+                except Exception as exc:
+                    failed += 1
+                    _mark_failed(email, f'{type(exc).__name__}: {exc}')
+                    # A conexão pode ter caído: fecha e reabre no próximo e-mail
+                    connection.close()
+                    is_open = False
+                else:
+                    delivered.append(email.pk)
+            if delivered:
+                outbox().filter(id__in=delivered, status=SENDING).update(
+                    status=SENT, sent_at=timezone.now(), locked_by='', locked_at=None, last_error='',
+                )
+                sent += len(delivered)
+    finally:
+        if is_open:
+            connection.close()
+
+    # Sobrou algo (tempo esgotado ou novas tentativas agendadas): agenda a próxima execução
+    next_at = outbox().filter(status=QUEUED).aggregate(next_at=Min('send_after'))['next_at']
+    if next_at is not None:
+        schedule_delivery(max(next_at, timezone.now()))
+    if sent or failed:
+        logger.info('Caixa de saída: %s e-mail(s) enviado(s), %s falha(s)', sent, failed)
+    return sent, failed
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Company, User
+from jobs.queue import jobs
+from .models import OutboundEmail
+from .outbox import FAILED, QUEUED, SEND_TASK, SENT, get_setting, queue_email, send_pending
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class SendPendingTests(TestCase):
+
+    def queue(self, total=1):
+        return [queue_email(f'cliente{n}@exemplo.com', f'Assunto {n}', 'Corpo') for n in range(total)]
+
+    def test_batch_is_sent_over_one_connection(self):
+        self.queue(3)
+        with mock.patch('notifications.outbox.get_connection', wraps=get_connection) as factory, \
+                mock.patch.object(EmailBackend, 'open', autospec=True, side_effect=lambda backend: True) as opened:
+            sent, failed = send_pending(rate=0)
+
+        self.assertEqual((sent, failed), (3, 0))
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboundEmail.objects.filter(status=SENT).count(), 3)
+
+    def test_failure_is_retried_with_backoff(self):
+        email, = self.queue()
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPServerDisconnected('caiu')):
+            before = timezone.now()
+            sent, failed = send_pending(rate=0)
+
+        self.assertEqual((sent, failed), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('SMTPServerDisconnected', email.last_error)
+        self.assertGreaterEqual(email.send_after, before + timedelta(seconds=get_setting('RETRY_BACKOFF_SECONDS')))
+        self.assertEqual(mail.outbox, [])
+
+        # Antes do fim da espera o e-mail não é pego de novo
+        self.assertEqual(send_pending(rate=0), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(EMAIL_OUTBOX={'MAX_ATTEMPTS': 2})
+    def test_email_fails_after_max_attempts(self):
+        email, = self.queue()
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=SMTPServerDisconnected('caiu')):
+            for attempt in range(2):
+                OutboundEmail.objects.filter(pk=email.pk).update(send_after=timezone.now())
+                send_pending(rate=0)
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, FAILED)
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(send_pending(rate=0), (0, 0))
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class PasswordResetEmailTests(TestCase):
+
+    def test_reset_request_queues_email_instead_of_sending(self):
+        company = Company.objects.create(name='ACME')
+        User.objects.create_user('ana', 'ana@exemplo.com', 'senha-forte-123', company=company)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().post('/api/accounts/password_reset/', {'email': 'ana@exemplo.com'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.recipient, email.status), ('ana@exemplo.com', QUEUED))
+        self.assertTrue(jobs().filter(task=SEND_TASK).exists())
+
+        send_pending(rate=0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('token=', mail.outbox[0].body)